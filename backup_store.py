@@ -0,0 +1,190 @@
+from __future__ import annotations
+
+import json
+import os
+import shutil
+import sys
+import time
+import uuid
+from dataclasses import asdict, dataclass
+from datetime import datetime
+from typing import IO, Iterator, List, Optional, Tuple
+
+from fs import atomic_replace, file_digest
+
+# Content-addressed backup store. Layout under the backup root:
+#
+#   objects/ab/cdef...   one blob per distinct pre-image, named by its hash
+#   runs/<run id>.jsonl  manifest: header, then one line per modified note
+#
+# Blobs are shared across notes and runs, so backing up an unchanged note a
+# second time costs a hash and no extra disk space.
+
+FICLONE = 0x40049409  # linux/fs.h: clone a whole file (reflink)
+
+
+@dataclass
+class RunEntry:
+    path: str  # relative to the vault root, '/'-separated
+    digest: str  # blob holding the note as it was before the run
+    mtime_ns: int  # stat of the note right after the run wrote it
+    size: int
+    before_mtime_ns: int  # restored along with the content on undo
+
+
+def _reflink(src: str, dst: str) -> bool:
+    if not sys.platform.startswith("linux"):
+        return False
+    import fcntl
+
+    try:
+        with open(src, "rb") as s, open(dst, "wb") as d:
+            fcntl.ioctl(d.fileno(), FICLONE, s.fileno())
+        return True
+    except OSError:
+        try:
+            os.unlink(dst)
+        except OSError:
+            pass
+        return False
+
+
+class BackupStore:
+    def __init__(self, root: str):
+        self.root = root
+        self.objects = os.path.join(root, "objects")
+        self.runs_dir = os.path.join(root, "runs")
+
+    def object_path(self, digest: str) -> str:
+        return os.path.join(self.objects, digest[:2], digest[2:])
+
+    def put(self, path: str, link: bool = True) -> str:
+        """
+        Store the current content of path and return its digest.
+        The blob is cloned (reflink) where the file system supports it, else
+        hard-linked if link=True, else copied. Hard links are only safe
+        because notes are always replaced by rename, never rewritten in
+        place; undo() re-verifies each blob's hash regardless.
+        """
+        os.makedirs(self.objects, exist_ok=True)
+        tmp = os.path.join(self.objects, f".tmp-{uuid.uuid4().hex}")
+        if not _reflink(path, tmp):
+            try:
+                if not link:
+                    raise OSError
+                os.link(path, tmp)
+            except OSError:
+                shutil.copyfile(path, tmp)
+        try:
+            digest = file_digest(tmp)
+            obj = self.object_path(digest)
+            if os.path.exists(obj):
+                os.unlink(tmp)  # deduplicated
+            else:
+                os.makedirs(os.path.dirname(obj), exist_ok=True)
+                os.replace(tmp, obj)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.unlink(tmp)
+            raise
+        return digest
+
+    def begin_run(self, vault_root: str, fsync: bool = False) -> "RunWriter":
+        os.makedirs(self.runs_dir, exist_ok=True)
+        # sortable: runs() lists runs oldest first
+        run_id = datetime.now().strftime("%Y%m%d-%H%M%S-%f")
+        return RunWriter(self, run_id, vault_root, fsync)
+
+    def runs(self) -> List[str]:
+        if not os.path.isdir(self.runs_dir):
+            return []
+        names = os.listdir(self.runs_dir)
+        return sorted(n[: -len(".jsonl")] for n in names if n.endswith(".jsonl"))
+
+    def read_run(self, run_id: str) -> Tuple[str, Iterator[RunEntry]]:
+        """Return (vault_root, entries) for a run; entries are read lazily."""
+        f = open(os.path.join(self.runs_dir, run_id + ".jsonl"), encoding="utf-8")
+        header = json.loads(f.readline())
+
+        def entries() -> Iterator[RunEntry]:
+            with f:
+                for line in f:
+                    if line.strip():
+                        yield RunEntry(**json.loads(line))
+
+        return header["vault"], entries()
+
+    def undo(
+        self, run_id: str, force: bool = False, vault_root: Optional[str] = None
+    ) -> Tuple[int, int]:
+        """
+        Restore every note of a run to its pre-run content and mtime in one
+        pass, so older runs can be undone after newer ones. Notes edited
+        since the run (stat differs from what the run wrote) are skipped
+        unless force=True. Returns (restored, refused).
+        """
+        planned_root, entries = self.read_run(run_id)
+        root = vault_root or planned_root
+        restored = refused = 0
+        for entry in entries:
+            path = os.path.join(root, *entry.path.split("/"))
+            blob = self.object_path(entry.digest)
+            try:
+                st = os.stat(path)
+                current = (st.st_mtime_ns, st.st_size)
+            except FileNotFoundError:
+                current = None
+            if not force and current != (entry.mtime_ns, entry.size):
+                refused += 1
+                print(f"Skipped (changed since run): {path}")
+                continue
+            if not os.path.exists(blob) or file_digest(blob) != entry.digest:
+                refused += 1
+                print(f"Skipped (backup blob missing or damaged): {path}")
+                continue
+
+            def fill(out, blob=blob):
+                with open(blob, "rb") as src:
+                    shutil.copyfileobj(src, out, 1 << 20)
+
+            atomic_replace(path, fill, fsync=False)
+            os.utime(path, ns=(time.time_ns(), entry.before_mtime_ns))
+            restored += 1
+            print(f"Restored: {path}")
+        return restored, refused
+
+
+class RunWriter:
+    """Appends one manifest line per note backed up during a run. Each line
+    is flushed (and fsynced with 'fsync') as it is added, so a killed run
+    can still be undone up to its last written note."""
+
+    def __init__(
+        self, store: BackupStore, run_id: str, vault_root: str, fsync: bool = False
+    ):
+        self.store = store
+        self.run_id = run_id
+        self.count = 0
+        self.fsync = fsync
+        self.manifest_path = os.path.join(store.runs_dir, run_id + ".jsonl")
+        self._f: IO[str] = open(
+            self.manifest_path, "x", encoding="utf-8", newline="\n"
+        )
+        header = {
+            "run_id": run_id,
+            "vault": os.path.abspath(vault_root),
+            "created": time.strftime("%Y-%m-%dT%H:%M:%S%z"),
+        }
+        self._f.write(json.dumps(header) + "\n")
+
+    def add(self, entry: RunEntry) -> None:
+        self._f.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+        self._f.flush()
+        if self.fsync:
+            os.fsync(self._f.fileno())
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+        if self.count == 0:
+            os.unlink(self.manifest_path)
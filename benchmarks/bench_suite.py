@@ -0,0 +1,279 @@
+"""
+Throughput benchmarks for each processing stage and for whole runs, on a
+seeded synthetic vault (see vaultgen.py).
+
+    python benchmarks/bench_suite.py [--files N] [--seed S] [--repeat R]
+                                     [--only NAME ...] [--save FILE]
+                                     [--compare FILE] [--tolerance 0.1]
+
+Each benchmark runs in a fresh process so its peak RSS is its own. Reports
+notes per second (best of --repeat) and peak RSS. --save writes the results
+as JSON; --compare prints the change against such a file and exits with
+status 1 if any benchmark got slower than the tolerance allows.
+"""
+from __future__ import annotations
+
+import argparse
+import contextlib
+import json
+import multiprocessing
+import os
+import shutil
+import sys
+import tempfile
+import time
+from concurrent.futures import ProcessPoolExecutor
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+sys.path.insert(0, ROOT)
+sys.path.insert(0, os.path.dirname(os.path.abspath(__file__)))
+
+from vaultgen import VaultSpec, generate_vault  # noqa: E402
+
+TAGS = ["bench", "inbox"]
+
+
+def _texts(vault):
+    from fs import iter_markdown_files, read_text
+
+    return [read_text(p) for p in iter_markdown_files(vault, True, "*.md")]
+
+
+def _best(fn, setup, repeat):
+    best = float("inf")
+    for _ in range(repeat):
+        arg = setup()
+        start = time.perf_counter()
+        fn(arg)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+# Stage benchmarks: (setup() -> arg, run(arg), notes per run), plus the
+# bytes per run for stages measured in MB/s.
+
+
+def _stage_split(texts):
+    from fm_yaml import split_frontmatter
+
+    return lambda: texts, lambda ts: [split_frontmatter(t) for t in ts], len(texts)
+
+
+def _yaml_parts(texts):
+    from fm_yaml import split_frontmatter
+
+    return [y for y in (split_frontmatter(t)[0] for t in texts) if y is not None]
+
+
+def _stage_load(texts):
+    from fm_yaml import load_frontmatter
+
+    parts = _yaml_parts(texts)
+    return lambda: parts, lambda ps: [load_frontmatter(y) for y in ps], len(parts)
+
+
+def _stage_dump(texts):
+    from fm_yaml import dump_frontmatter, load_frontmatter
+
+    metas = [load_frontmatter(y) for y in _yaml_parts(texts)]
+    return lambda: metas, lambda ms: [dump_frontmatter(m) for m in ms], len(metas)
+
+
+def _stage_detect(texts):
+    from fm_yaml import detect_tags
+
+    parts = _yaml_parts(texts)
+    return lambda: parts, lambda ps: [detect_tags(y) for y in ps], len(parts)
+
+
+def _stage_tag_ops(texts):
+    from fm_yaml import load_frontmatter
+    from tag_ops import apply_tag_changes
+
+    parts = _yaml_parts(texts)
+
+    def setup():  # apply_tag_changes mutates, so load fresh maps untimed
+        return [load_frontmatter(y) for y in parts]
+
+    def run(metas):
+        for meta in metas:
+            apply_tag_changes(meta, add=TAGS[:1], remove=TAGS[1:])
+
+    return setup, run, len(parts)
+
+
+def _stage_process_text(texts):
+    from main import process_file_text
+
+    def run(ts):
+        for t in ts:
+            process_file_text(t, TAGS, "add", "preserve")
+
+    return lambda: texts, run, len(texts)
+
+
+def _stage_inline(texts):
+    from fm_yaml import split_frontmatter
+    from inline_tags import find_inline_tags
+
+    bodies = [split_frontmatter(t)[1] for t in texts]
+    size = sum(len(b.encode("utf-8")) for b in bodies)
+
+    def run(bs):
+        for b in bs:
+            find_inline_tags(b)
+
+    return lambda: bodies, run, len(bodies), size
+
+
+STAGES = {
+    "split_frontmatter": _stage_split,
+    "load_frontmatter": _stage_load,
+    "dump_frontmatter": _stage_dump,
+    "detect_tags": _stage_detect,
+    "apply_tag_changes": _stage_tag_ops,
+    "process_file_text": _stage_process_text,
+    "inline_tags": _stage_inline,
+}
+
+# End-to-end runs of process_path on a fresh copy of the vault:
+# (mode, dry_run, prepare-with-add-first)
+RUNS = {
+    "e2e_add": ("add", False, False),
+    "e2e_remove": ("remove", False, True),
+    "e2e_dry_run": ("add", True, False),
+}
+
+
+def _peak_rss_kb():
+    try:
+        import resource
+    except ImportError:
+        return None
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    return rss // 1024 if sys.platform == "darwin" else rss
+
+
+def _run_e2e(name, vault, repeat):
+    from main import Options, process_path
+
+    mode, dry_run, prepare = RUNS[name]
+    work = tempfile.mkdtemp(prefix="tm-bench-")
+
+    def opts(path, mode, dry_run):
+        return Options(
+            path=path,
+            tag=TAGS[0],
+            tags=TAGS,
+            mode=mode,
+            recursive=True,
+            dry_run=dry_run,
+            backup=False,
+            order="preserve",
+            include_glob="*.md",
+            backup_dir=os.path.join(work, "Backups"),
+        )
+
+    def setup():
+        copy = os.path.join(work, "vault")
+        shutil.rmtree(copy, ignore_errors=True)
+        shutil.copytree(vault, copy)
+        if prepare:
+            with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+                process_path(opts(copy, "add", False))
+        return copy
+
+    def run(copy):
+        with open(os.devnull, "w") as null, contextlib.redirect_stdout(null):
+            process_path(opts(copy, mode, dry_run))
+
+    try:
+        return _best(run, setup, repeat)
+    finally:
+        shutil.rmtree(work, ignore_errors=True)
+
+
+def run_benchmark(name, vault, files, repeat):
+    """Run one benchmark in the current process; returns its result dict."""
+    size = None
+    if name in STAGES:
+        setup, run, files, *size = STAGES[name](_texts(vault))
+        seconds = _best(run, setup, repeat)
+    else:
+        seconds = _run_e2e(name, vault, repeat)
+    result = {
+        "files_per_sec": round(files / seconds, 1),
+        "seconds": round(seconds, 6),
+        "peak_rss_kb": _peak_rss_kb(),
+    }
+    if size:
+        result["mb_per_sec"] = round(size[0] / seconds / 1e6, 1)
+    return result
+
+
+def compare(results, baseline, tolerance):
+    """Return (lines, regressed) comparing files/sec against a baseline."""
+    lines, regressed = [], False
+    for name, res in results.items():
+        old = baseline.get("results", {}).get(name)
+        if not old:
+            lines.append(f"{name:20s} (no baseline)")
+            continue
+        change = res["files_per_sec"] / old["files_per_sec"] - 1
+        flag = ""
+        if change < -tolerance:
+            flag, regressed = "  REGRESSION", True
+        lines.append(f"{name:20s} {change:+7.1%} files/sec{flag}")
+    return lines, regressed
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description="Obsidian Tag Manager benchmarks")
+    parser.add_argument("--files", type=int, default=2000)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--only", action="append", choices=[*STAGES, *RUNS])
+    parser.add_argument("--save", help="write results as JSON to this file")
+    parser.add_argument("--compare", help="compare against a saved result file")
+    parser.add_argument("--tolerance", type=float, default=0.10)
+    args = parser.parse_args(argv)
+
+    spec = VaultSpec(files=args.files, seed=args.seed)
+    names = args.only or [*STAGES, *RUNS]
+    results = {}
+    with tempfile.TemporaryDirectory(prefix="tm-vault-") as tmp:
+        vault = os.path.join(tmp, "vault")
+        generate_vault(vault, spec)
+        ctx = multiprocessing.get_context("spawn")
+        for name in names:
+            with ProcessPoolExecutor(max_workers=1, mp_context=ctx) as pool:
+                res = pool.submit(
+                    run_benchmark, name, vault, args.files, args.repeat
+                ).result()
+            results[name] = res
+            rss = f"{res['peak_rss_kb'] / 1024:7.1f} MiB" if res["peak_rss_kb"] else ""
+            mbps = f"  {res['mb_per_sec']:,.1f} MB/s" if "mb_per_sec" in res else ""
+            print(f"{name:20s} {res['files_per_sec']:12,.0f} files/sec {rss}{mbps}")
+
+    report = {
+        "spec": {"files": spec.files, "seed": spec.seed},
+        "python": sys.version.split()[0],
+        "results": results,
+    }
+    if args.save:
+        with open(args.save, "w", encoding="utf-8") as f:
+            json.dump(report, f, indent=2)
+            f.write("\n")
+    if args.compare:
+        with open(args.compare, encoding="utf-8") as f:
+            baseline = json.load(f)
+        if baseline.get("spec") != report["spec"]:
+            print("warning: baseline was recorded with a different vault spec")
+        lines, regressed = compare(results, baseline, args.tolerance)
+        print("\n".join(lines))
+        if regressed:
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
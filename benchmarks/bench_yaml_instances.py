@@ -0,0 +1,61 @@
+"""
+Micro-benchmark: per-note cost of building YAML instances vs reusing them.
+
+    python benchmarks/bench_yaml_instances.py [iterations]
+"""
+from __future__ import annotations
+
+import os
+import sys
+import timeit
+from io import StringIO
+
+sys.path.insert(0, os.path.abspath(os.path.join(os.path.dirname(__file__), "..")))
+
+import fm_yaml  # noqa: E402
+
+YAML_TEXT = "title: Meeting notes\naliases:\n  - standup\ntags:\n  - work\n  - daily\n"
+
+
+DATA = fm_yaml.load_frontmatter(YAML_TEXT)
+
+
+def fresh_load():
+    fm_yaml._new_rt_yaml().load(YAML_TEXT)
+
+
+def cached_load():
+    fm_yaml._yaml_loader().load(YAML_TEXT)
+
+
+def fresh_dump():
+    fm_yaml._new_rt_yaml().dump(DATA, StringIO())
+
+
+def cached_dump():
+    fm_yaml._yaml_dumper().dump(DATA, StringIO())
+
+
+def best(fn, n):
+    return min(timeit.repeat(fn, number=n, repeat=5)) / n
+
+
+def main(argv=None):
+    argv = sys.argv[1:] if argv is None else argv
+    n = int(argv[0]) if argv else 1000
+    total = 0.0
+    for stage, fresh, cached in (
+        ("load", fresh_load, cached_load),
+        ("dump", fresh_dump, cached_dump),
+    ):
+        t_fresh, t_cached = best(fresh, n), best(cached, n)
+        total += t_fresh - t_cached
+        print(
+            f"{stage}: fresh {t_fresh * 1e6:7.1f} us  cached {t_cached * 1e6:7.1f} us"
+            f"  saved {(t_fresh - t_cached) * 1e6:6.1f} us"
+        )
+    print(f"saved per changed note: {total * 1e6:.1f} us")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,156 @@
+from __future__ import annotations
+
+import os
+from datetime import datetime, timezone
+from typing import Iterable, Iterator, List, Optional
+
+from fs import DEFAULT_EXCLUDE_DIRS, compile_globs
+from vault_index import INDEX_DIR
+
+# Incremental runs: only notes changed since a point in time (--since) or
+# a git revision (--git-changed) are processed.
+#
+# --since WHEN takes an ISO 8601 time ('2025-06-01', '2025-06-01T08:00',
+# naive times are local), epoch seconds, or 'last-run'. A note counts as
+# changed if its mtime or ctime is at or after WHEN; ctime catches notes
+# moved or copied in with an old mtime. The walk still lists every folder,
+# but notes older than WHEN are only stat'ed from the directory scan, never
+# opened. 'last-run' reads the time the previous completed '--since
+# last-run' run started (MARKER_NAME, next to the index); with no marker
+# yet the whole vault is processed. Dry runs and plans do not move it.
+#
+# --git-changed REV asks the vault's git repository for the notes that
+# differ from REV in the working tree, plus untracked ones, so the vault is
+# not walked at all. The include/exclude rules still apply.
+
+MARKER_NAME = "tag_manager_last_run"
+# Subtracted from the stored start time: coarse mtime resolution (1-2 s on
+# some file systems) could otherwise hide a save made just as the previous
+# run passed the note. Re-visiting a few notes is cheap.
+MARKER_SLACK = 2.0
+
+
+def _marker_path(vault_root: str) -> str:
+    return os.path.join(vault_root, INDEX_DIR, MARKER_NAME)
+
+
+def read_marker(vault_root: str) -> Optional[float]:
+    """Start time (epoch seconds) of the last completed run, if recorded."""
+    try:
+        with open(_marker_path(vault_root), encoding="utf-8") as f:
+            return parse_time(f.read().strip())
+    except (OSError, ValueError):
+        return None
+
+
+def write_marker(vault_root: str, started: float) -> None:
+    from fs import atomic_replace
+
+    path = _marker_path(vault_root)
+    os.makedirs(os.path.dirname(path), exist_ok=True)
+    text = datetime.fromtimestamp(started, timezone.utc).isoformat() + "\n"
+    atomic_replace(path, lambda f: f.write(text.encode("utf-8")), fsync=False)
+
+
+def parse_time(value: str) -> float:
+    """Epoch seconds from an ISO 8601 time or a number of epoch seconds."""
+    value = value.strip()
+    try:
+        return float(value)
+    except ValueError:
+        pass
+    if value.endswith(("Z", "z")):  # fromisoformat() accepts it from 3.11 only
+        value = value[:-1] + "+00:00"
+    try:
+        return datetime.fromisoformat(value).timestamp()
+    except ValueError:
+        raise ValueError(
+            f"since: expected an ISO 8601 time, epoch seconds or 'last-run', "
+            f"got {value!r}"
+        ) from None
+
+
+def since_time(vault_root: str, since: str) -> Optional[float]:
+    """The cutoff for --since, or None to process every note."""
+    if since == "last-run":
+        marker = read_marker(vault_root)
+        return None if marker is None else marker - MARKER_SLACK
+    return parse_time(since)
+
+
+def changed_since(entries: Iterable, cutoff: float) -> Iterator:
+    """The os.DirEntry-like entries modified or created at or after cutoff."""
+    for entry in entries:
+        try:
+            st = entry.stat()
+        except OSError:
+            continue
+        if st.st_mtime >= cutoff or st.st_ctime >= cutoff:
+            yield entry
+
+
+def _git(vault_root: str, *args: str) -> List[str]:
+    import subprocess
+
+    try:
+        out = subprocess.run(
+            ["git", "-C", vault_root, *args],
+            stdin=subprocess.DEVNULL,
+            capture_output=True,
+            check=True,
+        ).stdout
+    except FileNotFoundError:
+        raise RuntimeError("git-changed: git is not installed") from None
+    except subprocess.CalledProcessError as e:
+        message = e.stderr.decode("utf-8", "replace").strip().splitlines()
+        raise RuntimeError(
+            "git-changed: " + (message[-1] if message else f"git {args[0]} failed")
+        ) from None
+    return [os.fsdecode(p) for p in out.split(b"\0") if p]
+
+
+def verify_rev(vault_root: str, rev: str) -> None:
+    """Raise RuntimeError unless vault_root is in a git repo that has rev."""
+    _git(vault_root, "rev-parse", "--verify", "--end-of-options", rev)
+
+
+def git_changed_paths(opts) -> List[str]:
+    """
+    Notes under opts.path that differ from opts.git_changed in the working
+    tree, or are untracked, filtered like a walk of the vault would be.
+    Deleted notes are left out.
+    """
+    root = opts.path
+    # --relative: paths relative to (and limited to) the vault folder,
+    # which may be a subfolder of the repository
+    rels = set(
+        _git(root, "diff", "--name-only", "--relative", "-z", opts.git_changed, "--")
+    )
+    rels.update(_git(root, "ls-files", "--others", "--exclude-standard", "-z"))
+
+    include = compile_globs(opts.include_glob)
+    exclude = compile_globs(opts.exclude_glob)
+    prune = compile_globs(
+        DEFAULT_EXCLUDE_DIRS if opts.exclude_dirs is None else opts.exclude_dirs
+    )
+    skip = [
+        os.path.normcase(os.path.abspath(p)) + os.sep for p in [opts.backup_dir] if p
+    ]
+    paths = []
+    for rel in sorted(rels):
+        *dirs, name = rel.split("/")
+        if dirs and not opts.recursive:
+            continue
+        if prune and any(prune.match(d) for d in dirs):
+            continue
+        if include is not None and not include.match(name):
+            continue
+        if exclude and exclude.match(name):
+            continue
+        path = os.path.join(root, *dirs, name)
+        if any(os.path.normcase(os.path.abspath(path)).startswith(s) for s in skip):
+            continue
+        if os.path.isfile(path):
+            paths.append(path)
+    return paths
+
@@ -0,0 +1,417 @@
+from __future__ import annotations
+
+import re
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
+
+from stats import timed
+
+if TYPE_CHECKING:
+    from tag_ops import TagRenamer
+
+# Textual fast path for the `tags:` entry of a frontmatter block.
+#
+# The ruamel round-trip in fm_yaml re-emits the whole mapping for every changed
+# note. For the common shapes of `tags` (block list, single-line flow list,
+# single scalar) we can splice the entry in place instead and leave every other
+# line byte-for-byte untouched. Anything the scanner cannot prove it
+# understands makes the functions here return None, and callers fall back to
+# the ruamel path.
+
+# A top-level key line: `key:` or `key: value`, key plain or simply quoted.
+_KEY_RE = re.compile(
+    r"^(?P<key>[^\s#'\"\-?:,\[\]{}&*!|>%@`][^:#]*?|\"[^\"\\]*\"|'[^']*')"
+    r"[ \t]*:(?:[ \t]+(?P<value>.*?))?[ \t]*$"
+)
+_ITEM_RE = re.compile(r"^(?P<prefix>[ ]*-[ ]+)(?P<value>\S.*?)[ \t]*$")
+_COMMENT_OR_BLANK_RE = re.compile(r"^[ \t]*(?:#.*)?$")
+
+# Plain scalars that the YAML resolver would not load as a string, or that
+# would need quoting when written back.
+_NON_STRING_RE = re.compile(
+    r"""^(?:
+        ~|null|Null|NULL
+       |true|True|TRUE|false|False|FALSE
+       |yes|Yes|YES|no|No|NO|on|On|ON|off|Off|OFF|y|Y|n|N
+       |[-+]?(?:\d[\d_]*)?\.?\d[\d_]*(?:[eE][-+]?\d+)?
+       |0x[0-9a-fA-F_]+|0o[0-7_]+|0b[01_]+
+       |[-+]?\.(?:inf|Inf|INF)|\.(?:nan|NaN|NAN)
+       |\d{4}-\d\d?-\d\d?(?:[Tt ].*)?
+    )$""",
+    re.X,
+)
+_PLAIN_FIRST = set("-?:,[]{}#&*!|>'\"%@`")
+_PLAIN_FORBIDDEN = set("[]{},\\")
+
+
+def _plain_ok(s: str) -> bool:
+    """True if s can be read and written as a plain YAML string unchanged."""
+    if not s or s != s.strip() or s[0] in _PLAIN_FIRST:
+        return False
+    if any(c in _PLAIN_FORBIDDEN for c in s):
+        return False
+    if ": " in s or " #" in s or s.endswith(":") or "\t" in s:
+        return False
+    if not s.isprintable():
+        return False
+    return _NON_STRING_RE.match(s) is None
+
+
+def _parse_scalar(raw: str) -> Optional[str]:
+    """Decode a single-line scalar, or None if it is not a simple string."""
+    raw = raw.strip()
+    if len(raw) >= 2 and raw[0] == raw[-1] == '"':
+        inner = raw[1:-1]
+        if '"' in inner or "\\" in inner:
+            return None
+        return inner
+    if len(raw) >= 2 and raw[0] == raw[-1] == "'":
+        inner = raw[1:-1]
+        if "'" in inner:
+            return None
+        return inner
+    return raw if _plain_ok(raw) else None
+
+
+def _closed_on_line(value: str) -> bool:
+    """Reject values that may continue onto the next line at column 0."""
+    if not value:
+        return True
+    first = value[0]
+    if first in "\"'":
+        i = 1
+        while i < len(value):
+            c = value[i]
+            if first == '"' and c == "\\":
+                i += 2
+                continue
+            if c == first:
+                if first == "'" and value[i + 1 : i + 2] == "'":
+                    i += 2
+                    continue
+                rest = value[i + 1 :].strip()
+                return not rest or rest.startswith("#")
+            i += 1
+        return False
+    if first in "[{":
+        return value.count(first) == value.count("]" if first == "[" else "}")
+    return True
+
+
+class _Entry:
+    __slots__ = ("key", "value", "lines")
+
+    def __init__(self, key: str, value: str, line: str):
+        self.key = key
+        self.value = value
+        self.lines = [line]
+
+
+def _scan(yaml_text: str) -> Optional[Tuple[List[str], List[_Entry]]]:
+    """Split frontmatter text into (leading lines, top-level entries).
+
+    Every line after the first key belongs to the entry above it. Returns None
+    for anything other than a plain block mapping.
+    """
+    head: List[str] = []
+    entries: List[_Entry] = []
+    seen = set()
+    for line in yaml_text.splitlines(True):
+        content = line.rstrip("\r\n")
+        if _COMMENT_OR_BLANK_RE.match(content) or content[:1] == " ":
+            if entries:
+                entries[-1].lines.append(line)
+            elif content.strip() and not content.lstrip().startswith("#"):
+                return None  # indented content before any key
+            else:
+                head.append(line)
+            continue
+        if content.startswith("- ") or content == "-":
+            # indentless sequence item belonging to the previous key
+            if not entries or entries[-1].value:
+                return None
+            entries[-1].lines.append(line)
+            continue
+        m = _KEY_RE.match(content)
+        if not m:
+            return None
+        key = m.group("key")
+        if key[:1] in "\"'":
+            key = key[1:-1]
+        value = m.group("value") or ""
+        if key in seen or not _closed_on_line(value):
+            return None
+        seen.add(key)
+        entries.append(_Entry(key, value, line))
+    return head, entries
+
+
+class _Seq:
+    """The items of a parsed sequence entry, with their original spelling."""
+
+    __slots__ = ("style", "values", "raws", "prefix", "trailer")
+
+    def __init__(self, style: str):
+        self.style = style  # 'block', 'flow', 'scalar' or 'null'
+        self.values: List[str] = []
+        self.raws: List[str] = []
+        self.prefix = "  - "
+        self.trailer: List[str] = []  # blank/comment lines after the items
+
+
+def _parse_seq(entry: _Entry) -> Optional[_Seq]:
+    value = entry.value
+    rest = entry.lines[1:]
+    if value:
+        if value.startswith("["):
+            if not value.endswith("]") or value.count("[") != 1:
+                return None
+            seq = _Seq("flow")
+            inner = value[1:-1].strip()
+            if inner:
+                for raw in inner.split(","):
+                    raw = raw.strip()
+                    parsed = _parse_scalar(raw)
+                    if parsed is None:
+                        return None
+                    seq.values.append(parsed)
+                    seq.raws.append(raw)
+        else:
+            parsed = _parse_scalar(value)
+            if parsed is None:
+                return None
+            seq = _Seq("scalar")
+            seq.values.append(parsed)
+            seq.raws.append(value)
+        items: List[str] = []
+    else:
+        seq = _Seq("null")
+        items = []
+        while rest and _ITEM_RE.match(rest[0].rstrip("\r\n")):
+            items.append(rest.pop(0))
+        if items:
+            seq.style = "block"
+    for i, line in enumerate(items):
+        m = _ITEM_RE.match(line.rstrip("\r\n"))
+        if i == 0:
+            seq.prefix = m.group("prefix")
+        elif m.group("prefix") != seq.prefix:
+            return None
+        parsed = _parse_scalar(m.group("value"))
+        if parsed is None:
+            return None
+        seq.values.append(parsed)
+        seq.raws.append(m.group("value"))
+    if any(not _COMMENT_OR_BLANK_RE.match(line.rstrip("\r\n")) for line in rest):
+        return None
+    seq.trailer = rest
+    return seq
+
+
+def _normalize(seq: _Seq) -> Tuple[List[str], List[str], bool]:
+    """Mirror tag_ops.normalize_tags: strip one '#', dedupe in order.
+
+    Returns (values, raws, changed), where raws holds the original spelling
+    for values that survived untouched and None for rewritten ones.
+    """
+    values: List[str] = []
+    raws: List[Optional[str]] = []
+    seen = set()
+    for v, raw in zip(seq.values, seq.raws):
+        s = v[1:] if v.startswith("#") else v
+        if s in seen:
+            continue
+        seen.add(s)
+        values.append(s)
+        raws.append(raw if s == v else None)
+    changed = seq.style not in ("block", "flow") or values != seq.values
+    return values, raws, changed
+
+
+def _emit(
+    key_line: str, seq: _Seq, values: List[str], raws: List[Optional[str]], nl: str
+) -> Optional[List[str]]:
+    out_items = []
+    for v, raw in zip(values, raws):
+        if raw is None:
+            if not _plain_ok(v):
+                return None
+            raw = v
+        out_items.append(raw)
+    key = key_line.split(":", 1)[0].rstrip()
+    if seq.style == "flow":
+        return [f"{key}: [{', '.join(out_items)}]{nl}"] + seq.trailer
+    lines = [f"{key}:{nl}"]
+    lines.extend(f"{seq.prefix}{raw}{nl}" for raw in out_items)
+    return lines + seq.trailer
+
+
+def _renamed_raws(
+    values: List[str], raws: List[Optional[str]], renamed: List[str]
+) -> List[Optional[str]]:
+    # Keep the original spelling of tags that a rename left alone
+    spelled = dict(zip(values, raws))
+    return [spelled.get(v) for v in renamed]
+
+
+def _aliases_ok(entries: List[_Entry]) -> bool:
+    """tag_ops.normalize_aliases turns scalar/null aliases into a list.
+
+    Only leave aliases alone if they already are one, so the textual result
+    matches what the round-trip path would write.
+    """
+    for entry in entries:
+        if entry.key == "aliases":
+            seq = _parse_seq(entry)
+            return seq is not None and seq.style in ("block", "flow")
+    return True
+
+
+def patch_tags(
+    yaml_text: Optional[str], tags: Sequence[str], mode: str, nl: str = "\n"
+) -> Optional[Tuple[str, bool, bool]]:
+    """Add or remove tags by editing the frontmatter text in place.
+
+    Returns (yaml_text, changed, frontmatter_empty_after) with the same
+    change semantics as tag_ops.add_tag / remove_tag in 'preserve' order, or
+    None if the frontmatter has a shape this module does not handle.
+    """
+    if mode == "add":
+        return patch_tag_changes(yaml_text, add=tags, nl=nl)
+    if mode == "remove":
+        return patch_tag_changes(yaml_text, remove=tags, nl=nl)
+    raise ValueError("mode must be 'add' or 'remove'")
+
+
+@timed("patch")
+def patch_tag_changes(
+    yaml_text: Optional[str],
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+    nl: str = "\n",
+    rename: Optional[TagRenamer] = None,
+) -> Optional[Tuple[str, bool, bool]]:
+    """Textual counterpart of tag_ops.apply_tag_changes in 'preserve' order."""
+    add = [t.lstrip("#") for t in add]
+    drop = {t.lstrip("#") for t in remove}
+    if not add and not drop and rename is None:
+        return yaml_text or "", False, False
+    scanned = _scan(yaml_text or "")
+    if scanned is None:
+        return None
+    head, entries = scanned
+    if not _aliases_ok(entries):
+        return None
+
+    idx = next((i for i, e in enumerate(entries) if e.key == "tags"), None)
+    if idx is None:
+        seq = _Seq("null")
+        values, raws, norm_changed = [], [], True
+    else:
+        seq = _parse_seq(entries[idx])
+        if seq is None:
+            return None
+        values, raws, norm_changed = _normalize(seq)
+
+    if idx is None and not add:
+        return yaml_text or "", False, False
+    changed = bool(add) and norm_changed
+    if rename is not None:
+        renamed, hit = rename.apply(values)
+        if hit:
+            changed = True
+            raws = _renamed_raws(values, raws, renamed)
+            values = renamed
+    if drop:
+        kept = [(v, r) for v, r in zip(values, raws) if v not in drop]
+        changed = changed or len(kept) != len(values)
+        values = [v for v, _ in kept]
+        raws = [r for _, r in kept]
+    present = set(values)
+    for tag in add:
+        if tag not in present:
+            present.add(tag)
+            values.append(tag)
+            raws.append(None)
+            changed = True
+
+    if not changed:
+        return yaml_text or "", False, False
+
+    if values:
+        key_line = entries[idx].lines[0] if idx is not None else "tags:"
+        new_lines = _emit(key_line, seq, values, raws, nl)
+        if new_lines is None:
+            return None
+    else:
+        new_lines = seq.trailer
+
+    lines = list(head)
+    for i, entry in enumerate(entries):
+        lines.extend(new_lines if i == idx else entry.lines)
+    if idx is None:
+        if lines and not lines[-1].endswith("\n"):
+            lines[-1] += nl
+        lines.extend(new_lines)
+
+    remaining = len(entries) + (1 if idx is None else 0) - (0 if values else 1)
+    out = "".join(lines)
+    if out and not out.endswith("\n"):
+        out += nl
+    return out, True, remaining == 0
+
+
+def read_tags(yaml_text: Optional[str]) -> Optional[Tuple[List[str], bool]]:
+    """Return (tags, normalized) without a YAML parse, or None if unsure.
+
+    tags is the list as tag_ops.normalize_tags would leave it; normalized is
+    False if normalizing would rewrite the entry (scalar, '#' prefix, dupes).
+    """
+    scanned = _scan(yaml_text or "")
+    if scanned is None:
+        return None
+    for entry in scanned[1]:
+        if entry.key == "tags":
+            seq = _parse_seq(entry)
+            if seq is None:
+                return None
+            values, _, norm_changed = _normalize(seq)
+            return values, not norm_changed
+    return [], True
+
+
+def read_fields(
+    yaml_text: Optional[str], keys: Iterable[str]
+) -> Optional[Dict[str, Union[str, List[str], None]]]:
+    """Return {key: value} for the top-level keys asked for, without a YAML
+    parse, or None if unsure.
+
+    Values are strings, lists of strings, or None for a null entry; keys
+    that are not present are left out.
+    """
+    scanned = _scan(yaml_text or "")
+    if scanned is None:
+        return None
+    wanted = set(keys)
+    fields: Dict[str, Union[str, List[str], None]] = {}
+    for entry in scanned[1]:
+        if entry.key not in wanted:
+            continue
+        seq = _parse_seq(entry)
+        if seq is None:
+            return None
+        if seq.style == "scalar":
+            fields[entry.key] = seq.values[0]
+        elif seq.style == "null":
+            fields[entry.key] = None
+        else:
+            fields[entry.key] = list(seq.values)
+    return fields
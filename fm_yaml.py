@@ -1,11 +1,19 @@
 from __future__ import annotations
 
 import re
+import threading
 from io import StringIO
-from typing import Optional, Tuple
+from typing import TYPE_CHECKING, List, Optional, Tuple
 
-from ruamel.yaml import YAML
-from ruamel.yaml.comments import CommentedMap
+from fm_patch import read_tags
+from stats import timed
+from tag_ops import clean_tags
+
+if TYPE_CHECKING:
+    from ruamel.yaml import YAML
+
+# ruamel.yaml is imported on first use: runs that never need a YAML parser
+# (--help, empty folders, index hits, notes handled by fm_patch) skip it.
 
 YAML_START = re.compile(r"^---\s*(?:\r?\n)", re.M)
 
@@ -17,13 +25,48 @@ _FM_RE = re.compile(
 )
 
 
-def _yaml_loader() -> YAML:
+# YAML instances are expensive to build but not thread-safe, so each thread
+# (and each worker process) keeps its own, created on first use.
+_local = threading.local()
+
+
+def _new_rt_yaml() -> YAML:
+    from ruamel.yaml import YAML
+
     yaml = YAML(typ="rt")  # round-trip
     yaml.default_flow_style = False
     yaml.indent(mapping=2, sequence=2, offset=2)
     return yaml
 
 
+def _cached(name: str, factory) -> YAML:
+    yaml = getattr(_local, name, None)
+    if yaml is None:
+        yaml = factory()
+        setattr(_local, name, yaml)
+    return yaml
+
+
+def _yaml_loader() -> YAML:
+    return _cached("loader", _new_rt_yaml)
+
+
+def _yaml_dumper() -> YAML:
+    return _cached("dumper", _new_rt_yaml)
+
+
+def _safe_loader() -> YAML:
+    # Read-only loader; uses the C parser when ruamel.yaml.clib is installed
+    return _cached("safe", _new_safe_yaml)
+
+
+def _new_safe_yaml() -> YAML:
+    from ruamel.yaml import YAML
+
+    return YAML(typ="safe")
+
+
+@timed("split")
 def split_frontmatter(text: str) -> Tuple[Optional[str], str, str]:
     """
     Return (yaml_text, body, newline).
@@ -39,7 +82,10 @@ def split_frontmatter(text: str) -> Tuple[Optional[str], str, str]:
     return yaml_text, body, nl
 
 
+@timed("yaml_load")
 def load_frontmatter(yaml_text: Optional[str]):
+    from ruamel.yaml.comments import CommentedMap
+
     yaml = _yaml_loader()
     if yaml_text is None:
         data = CommentedMap()
@@ -55,8 +101,51 @@ def load_frontmatter(yaml_text: Optional[str]):
     return data
 
 
+def yaml_error() -> type:
+    """ruamel's base exception (parser, scanner, duplicate key errors), for
+    except clauses; imported on demand like the rest of ruamel."""
+    from ruamel.yaml import YAMLError
+
+    return YAMLError
+
+
+def safe_load(yaml_text: Optional[str]):
+    """Parse read-only into plain dicts and lists; raises on invalid YAML."""
+    return _safe_loader().load(yaml_text)
+
+
+@timed("detect")
+def detect_tags(yaml_text: Optional[str]) -> Optional[Tuple[List[str], bool]]:
+    """
+    Cheap read-only pass: return (tags, normalized) as tag_ops.clean_tags
+    would see them, without building a round-trip CommentedMap.
+    Tries the textual scanner first, then the safe loader. Returns None if
+    neither can tell (e.g. the YAML does not parse).
+    """
+    found = read_tags(yaml_text)
+    if found is not None:
+        return found
+    try:
+        data = safe_load(yaml_text)
+    except Exception:
+        return None  # let the round-trip loader report the error
+    if data is None:
+        return [], True
+    if not isinstance(data, dict):
+        return None
+    if "tags" not in data:
+        return [], True
+    value = data["tags"]
+    items = value if isinstance(value, list) else [value]
+    if not all(t is None or isinstance(t, (str, int)) for t in items):
+        return None  # e.g. dates/floats stringify differently from round-trip
+    cleaned, changed = clean_tags(value)
+    return cleaned, not changed
+
+
+@timed("yaml_dump")
 def dump_frontmatter(data) -> str:
-    yaml = _yaml_loader()
+    yaml = _yaml_dumper()
     buf = StringIO()
     yaml.dump(data, buf)
     out = buf.getvalue()
@@ -2,26 +2,90 @@ from __future__ import annotations
 
 import fnmatch
 import os
-from typing import Iterable
+import re
+from typing import Iterable, Iterator, Optional, Pattern, Sequence, Tuple, Union
 
+import stats
 
-def iter_markdown_files(path: str, recursive: bool, include_glob: str) -> Iterable[str]:
-    if not recursive:
-        for name in os.listdir(path):
-            p = os.path.join(path, name)
-            if os.path.isfile(p) and fnmatch.fnmatch(name, include_glob):
-                yield p
-        return
+# Directory names never worth descending into inside a vault.
+DEFAULT_EXCLUDE_DIRS = (".obsidian", ".git", ".trash")
 
-    for dirpath, dirnames, filenames in os.walk(path):
-        for name in filenames:
-            if fnmatch.fnmatch(name, include_glob):
-                yield os.path.join(dirpath, name)
+Globs = Union[str, Sequence[str], None]
 
 
-def read_text(path: str) -> str:
-    with open(path, "rb") as f:
-        data = f.read()
+def compile_globs(globs: Globs) -> Optional[Pattern[str]]:
+    """Compile one or more fnmatch-style globs into a single regex.
+    Matching is case-insensitive where the platform's paths are.
+    """
+    if isinstance(globs, str):
+        globs = [globs]
+    globs = [g for g in (globs or ()) if g]
+    if not globs:
+        return None
+    flags = re.IGNORECASE if os.path.normcase("A") == "a" else 0
+    return re.compile("|".join(f"(?:{fnmatch.translate(g)})" for g in globs), flags)
+
+
+def iter_markdown_entries(
+    path: str,
+    recursive: bool,
+    include_glob: Globs,
+    *,
+    exclude_glob: Globs = None,
+    exclude_dirs: Globs = DEFAULT_EXCLUDE_DIRS,
+    exclude_paths: Sequence[str] = (),
+) -> Iterator[os.DirEntry]:
+    """
+    Yield os.DirEntry objects for matching files, in sorted top-down order.
+    Directories whose name matches exclude_dirs, or whose path is in
+    exclude_paths (e.g. a backup folder inside the vault), are not entered.
+    Entries carry the stat info from the directory scan, so callers can use
+    entry.stat() without another system call on most platforms.
+    """
+    include = compile_globs(include_glob)
+    exclude = compile_globs(exclude_glob)
+    prune = compile_globs(exclude_dirs)
+    skip = {os.path.normcase(os.path.abspath(p)) for p in exclude_paths}
+
+    stack = [path]
+    while stack:
+        top = stack.pop()
+        try:
+            with os.scandir(top) as it:
+                entries = sorted(it, key=lambda e: e.name)
+        except OSError:
+            if top is path and not recursive:
+                raise
+            continue  # like os.walk, skip unreadable directories
+
+        subdirs = []
+        for entry in entries:
+            name = entry.name
+            if entry.is_dir():
+                if (
+                    recursive
+                    and not entry.is_symlink()
+                    and not (prune and prune.match(name))
+                    and os.path.normcase(os.path.abspath(entry.path)) not in skip
+                ):
+                    subdirs.append(entry.path)
+            elif (
+                entry.is_file()
+                and (include is None or include.match(name))
+                and not (exclude and exclude.match(name))
+            ):
+                yield entry
+        stack.extend(reversed(subdirs))
+
+
+def iter_markdown_files(
+    path: str, recursive: bool, include_glob: Globs, **kwargs
+) -> Iterable[str]:
+    for entry in iter_markdown_entries(path, recursive, include_glob, **kwargs):
+        yield entry.path
+
+
+def _decode(data: bytes) -> str:
     # Try to preserve encoding; assume utf-8 with fallback
     try:
         return data.decode("utf-8")
@@ -29,6 +93,230 @@ def read_text(path: str) -> str:
         return data.decode("utf-8", errors="replace")
 
 
+def read_text(path: str) -> str:
+    with open(path, "rb") as f:
+        data = f.read()
+    return _decode(data)
+
+
+# Same fences as fm_yaml._FM_RE, matched one line at a time
+_OPEN_FENCE = re.compile(rb"(?:\xef\xbb\xbf)?---[ \t]*\r?\n\Z")
+_CLOSE_FENCE = re.compile(rb"---[ \t]*\r?\n\Z")
+
+
+@stats.timed("read")
+def read_head(path: str) -> Tuple[str, int]:
+    """
+    Read only the start of a note: the frontmatter block (if any), any blank
+    lines after it and the first non-blank body line. Returns (text, offset),
+    where offset is the byte position at which the untouched rest begins.
+    Everything process_file_text needs is in 'text'; the rest of the file can
+    be copied through as bytes with write_head.
+    """
+    with open(path, "rb") as f:
+        head = _read_head_bytes(f)
+    stats.count("bytes_read", len(head))
+    return _decode(head), len(head)
+
+
+def _blake2b(data: bytes = b""):
+    import hashlib  # loads OpenSSL; only runs that hash pay for it
+
+    return hashlib.blake2b(data, digest_size=20)
+
+
+@stats.timed("read")
+def read_head_digest(path: str) -> Tuple[str, int, str]:
+    """Like read_head, but also hash the whole file through the same handle,
+    so the digest is guaranteed to describe the bytes the head came from.
+    """
+    with open(path, "rb") as f:
+        head = _read_head_bytes(f)
+        h = _blake2b(head)
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+        stats.count("bytes_read", f.tell())
+    return _decode(head), len(head), h.hexdigest()
+
+
+def file_digest(path: str) -> str:
+    """Content hash of a whole file, as recorded by read_head_digest."""
+    h = _blake2b()
+    with open(path, "rb") as f:
+        for chunk in iter(lambda: f.read(1 << 20), b""):
+            h.update(chunk)
+    return h.hexdigest()
+
+
+def _read_head_bytes(f) -> bytes:
+    head = bytearray()
+    line = f.readline()
+    if _OPEN_FENCE.match(line):
+        head += line
+        first = True
+        while True:
+            line = f.readline()
+            if not line:
+                break
+            head += line
+            # the fence right after the opening one does not close it
+            if not first and _CLOSE_FENCE.match(line):
+                break
+            first = False
+        line = f.readline()
+    while line:
+        head += line
+        if line.strip(b"\r\n"):
+            break
+        line = f.readline()
+    return bytes(head)
+
+
+def _backup(path: str, vault_root: str, backup_root: str) -> str:
+    # Compute path inside backup_root mirroring relative path from vault_root
+    import shutil
+
+    rel_path = os.path.relpath(path, start=vault_root)
+    backup_path = os.path.join(backup_root, rel_path) + ".bak"
+    os.makedirs(os.path.dirname(backup_path), exist_ok=True)
+    shutil.copyfile(path, backup_path)
+    return backup_path
+
+
+def _copy_rest(src, dst, offset: int) -> None:
+    """Copy src from byte offset to EOF into dst, zero-copy where possible."""
+    import shutil
+
+    size = os.fstat(src.fileno()).st_size
+    dst.flush()
+    if hasattr(os, "sendfile"):
+        try:
+            while offset < size:
+                sent = os.sendfile(dst.fileno(), src.fileno(), offset, size - offset)
+                if sent == 0:
+                    break
+                offset += sent
+            return
+        except OSError:
+            pass  # e.g. unsupported file system; fall back to a buffered copy
+    src.seek(offset)
+    shutil.copyfileobj(src, dst, 1 << 20)
+
+
+# Durability policies for writes:
+#   none  - rely on the OS to flush eventually (fastest)
+#   file  - fsync each file and its directory before moving on
+#   batch - no per-file fsync; call sync_written() once at the end of a run
+DURABILITY = ("none", "file", "batch")
+
+
+def _fsync_dir(dirname: str) -> None:
+    try:
+        fd = os.open(dirname or ".", os.O_RDONLY)
+    except OSError:
+        return  # e.g. Windows, where directories cannot be opened
+    try:
+        os.fsync(fd)
+    except OSError:
+        pass
+    finally:
+        os.close(fd)
+
+
+def atomic_replace(path: str, fill, fsync: bool) -> None:
+    """
+    Create path's new content in a sibling temp file via fill(file), then
+    rename it over path, so readers see either the old or the new note and
+    never a truncated one. Keeps the original's permission bits. A symlink
+    is written through: the file it points to gets the new content.
+    """
+    import shutil
+    import tempfile
+
+    path = os.path.realpath(path)
+    dirname, name = os.path.split(path)
+    fd, tmp = tempfile.mkstemp(dir=dirname or ".", prefix=f".{name}.", suffix=".tmp")
+    try:
+        with os.fdopen(fd, "wb") as out:
+            fill(out)
+            if fsync:
+                out.flush()
+                os.fsync(out.fileno())
+        if os.path.exists(path):
+            shutil.copymode(path, tmp)
+        else:
+            umask = os.umask(0)
+            os.umask(umask)
+            os.chmod(tmp, 0o666 & ~umask)
+        os.replace(tmp, path)
+    except BaseException:
+        try:
+            os.unlink(tmp)
+        except OSError:
+            pass
+        raise
+    if fsync:
+        _fsync_dir(dirname)
+
+
+def _fsync_file(path: str) -> None:
+    # Windows only flushes handles opened for writing
+    try:
+        fd = os.open(path, os.O_RDWR if os.name == "nt" else os.O_RDONLY)
+    except FileNotFoundError:
+        return  # replaced or removed since it was written
+    try:
+        os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def sync_written(paths: Iterable[str]) -> None:
+    """Flush a batch of files written with durability 'batch': an fsync of
+    each file, then one per distinct parent directory. Unlike os.sync(),
+    this only waits for the vault's own files, not every mounted file
+    system (which on network storage can take minutes).
+    """
+    paths = list(paths)
+    for path in paths:
+        _fsync_file(path)
+    # the renames happened next to the files symlinks point to
+    for dirname in {os.path.dirname(os.path.realpath(p)) for p in paths}:
+        _fsync_dir(dirname)
+
+
+@stats.timed("write")
+def write_head(
+    path: str,
+    head: str,
+    offset: int,
+    backup: bool,
+    *,
+    vault_root: str | None = None,
+    backup_root: str | None = None,
+    fsync: bool = False,
+):
+    """
+    Replace the first 'offset' bytes of path with 'head', copying the rest of
+    the file through untouched. The write is atomic (temp file + rename);
+    fsync=True also makes it durable before returning. Backups as in
+    write_text. Returns the backup path if created, else None.
+    """
+    backup_path = None
+    if backup and os.path.exists(path) and vault_root and backup_root:
+        backup_path = _backup(path, vault_root, backup_root)
+
+    def fill(out):
+        with open(path, "rb") as src:
+            out.write(head.encode("utf-8"))
+            _copy_rest(src, out, offset)
+            if stats.enabled():
+                stats.count("bytes_written", os.fstat(out.fileno()).st_size)
+
+    atomic_replace(path, fill, fsync)
+    return backup_path
+
+
 def write_text(
     path: str,
     text: str,
@@ -36,27 +324,19 @@ def write_text(
     *,
     vault_root: str | None = None,
     backup_root: str | None = None,
+    fsync: bool = False,
 ):
     """
     Write file and, if backup=True, save a single centralized backup alongside
     the 'backup_root' folder, mirroring the relative path from 'vault_root'.
-    Returns the backup path if created, else None.
+    The write is atomic (temp file + rename). Returns the backup path if
+    created, else None.
     """
     backup_path = None
 
     if backup and os.path.exists(path) and vault_root and backup_root:
-        # Compute path inside backup_root mirroring relative path from vault_root
-        rel_path = os.path.relpath(path, start=vault_root)
-        backup_path = os.path.join(backup_root, rel_path) + ".bak"
-
-        os.makedirs(os.path.dirname(backup_path), exist_ok=True)
-
-        with open(path, "rb") as f:
-            original = f.read()
-        with open(backup_path, "wb") as f:
-            f.write(original)
+        backup_path = _backup(path, vault_root, backup_root)
 
-    with open(path, "wb") as f:
-        f.write(text.encode("utf-8"))
+    atomic_replace(path, lambda out: out.write(text.encode("utf-8")), fsync)
 
     return backup_path
@@ -0,0 +1,115 @@
+from __future__ import annotations
+
+import re
+from functools import lru_cache
+from typing import List, Pattern, Tuple
+
+# Inline '#tags' in a note body, found the way Obsidian reads them.
+#
+# A tag is '#' followed by letters, digits, '_', '-' or '/', with at least
+# one character that is not a digit, and it must start a line or follow
+# whitespace. That rule alone excludes headings ('# Title', '## Title'),
+# escaped '\#', and '#' inside URLs and links ('example.com/#top',
+# '[[Note#Heading]]'). Fenced code blocks, inline code spans and comments
+# ('<!-- -->', '%% %%') are skipped as a whole.
+#
+# Speed: each kind of marker is found with its own literal-prefixed regex
+# or str.find, which the regex engine and CPython run at memchr speed. A
+# combined alternation would be tried branch by branch at every character
+# and is about 50x slower. The few markers found are then walked in order
+# in Python to work out which stretches of the body are code or comments,
+# and the '#' matches in those stretches are dropped.
+
+_TAG = re.compile(r"#([\w/-]+)")
+# Written as a literal then a repeat ('``*', not '`+') so the regex engine
+# sees the literal prefix and uses its fast search.
+_TICKS = re.compile(r"``*")
+_TILDES = re.compile(r"~~~~*")
+_BLANK_LINE = re.compile(r"\n[ \t]*\r?\n")
+
+
+@lru_cache(maxsize=None)
+def _closing_fence(fence: str) -> Pattern[str]:
+    # A closing fence: the same character, at least as long, alone on a line
+    return re.compile(r"^[ ]{0,3}%s+[ \t]*\r?$" % re.escape(fence), re.M)
+
+
+@lru_cache(maxsize=None)
+def _closing_ticks(ticks: str) -> Pattern[str]:
+    return re.compile(r"(?<!`)%s(?!`)" % ticks)
+
+
+def _opens_line(text: str, pos: int) -> bool:
+    start = text.rfind("\n", 0, pos) + 1
+    return pos - start <= 3 and not text[start:pos].strip(" ")
+
+
+def _markers(body: str) -> List[Tuple[int, int]]:
+    found: List[Tuple[int, int]] = []
+    if "`" in body:
+        found.extend(m.span() for m in _TICKS.finditer(body))
+    if "~~~" in body:
+        found.extend(m.span() for m in _TILDES.finditer(body))
+    for opener in ("<!--", "%%"):
+        i = body.find(opener)
+        while i >= 0:
+            found.append((i, i + len(opener)))
+            i = body.find(opener, i + len(opener))
+    found.sort()
+    return found
+
+
+def _skipped(body: str) -> List[Tuple[int, int]]:
+    """Sorted, disjoint (start, end) spans of code blocks, code spans and
+    comments."""
+    spans: List[Tuple[int, int]] = []
+    end = len(body)
+    pos = 0
+    for start, stop in _markers(body):
+        if start < pos:
+            continue  # inside a span already skipped (e.g. its closer)
+        c = body[start]
+        if c in "`~" and stop - start >= 3 and _opens_line(body, start):
+            # fenced block: up to the closing fence, or to the end
+            line_end = body.find("\n", stop)
+            close = None
+            if line_end >= 0:
+                close = _closing_fence(body[start:stop]).search(body, line_end + 1)
+            pos = end if close is None else close.end()
+        elif c == "`":
+            # code span: up to the same run of backticks in this paragraph
+            close = _closing_ticks(body[start:stop]).search(body, stop)
+            if close is None or _BLANK_LINE.search(body, stop, close.start()):
+                continue
+            pos = close.end()
+        elif c == "~":
+            continue  # '~~~' that does not open a line is plain text
+        else:
+            closer = "-->" if c == "<" else "%%"
+            close = body.find(closer, stop)
+            pos = end if close < 0 else close + len(closer)
+        spans.append((start, pos))
+    return spans
+
+
+def find_inline_tags(body: str) -> List[str]:
+    """Inline tags in a note body (no leading '#'), first occurrence order."""
+    if "#" not in body:
+        return []
+    spans = _skipped(body)
+    k = 0
+    tags: List[str] = []
+    seen = set()
+    for m in _TAG.finditer(body):
+        start = m.start()
+        if start and not body[start - 1].isspace():
+            continue
+        while k < len(spans) and spans[k][1] <= start:
+            k += 1
+        if k < len(spans) and spans[k][0] <= start:
+            continue
+        name = m.group(1)
+        if name not in seen and not name.isdigit():
+            seen.add(name)
+            tags.append(name)
+    return tags
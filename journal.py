@@ -0,0 +1,209 @@
+from __future__ import annotations
+
+import json
+import os
+import time
+from typing import Dict, List, Set
+
+from fs import read_head
+from vault_index import INDEX_DIR, content_digest
+
+# Progress journal of a sweep, so an interrupted run (OOM kill, dropped SSH
+# session, Ctrl-C) can be resumed with --resume instead of starting over.
+#
+# The journal is an append-only JSON-lines file next to the index:
+#
+#   {"run": "<key>", "started": 1718000000.0}      header: what the run does
+#   {"path": "a/b.md", "intent": "<digest>"}       about to write this head
+#   {"path": "a/b.md", "done": "modified"}         finished ('unchanged' too)
+#
+# 'done' lines are buffered and written BATCH at a time; losing the last
+# batch only means re-checking those notes, which writes nothing twice
+# because a note already changed is a no-op. A rename chain ('a' -> 'b',
+# 'b' -> 'c') is not idempotent, though, so every write is preceded by an
+# 'intent' line with the digest of the head about to be written, appended
+# by the process doing the write before it writes. On resume, a note with
+# an intent but no 'done' whose head now has that digest was written, and
+# is skipped. The journal is deleted when the run completes.
+
+JOURNAL_NAME = "tag_manager_journal.jsonl"
+BATCH = 1000
+
+
+def journal_path(vault_root: str) -> str:
+    return os.path.join(vault_root, INDEX_DIR, JOURNAL_NAME)
+
+
+def run_key(opts) -> str:
+    """Digest of what a run changes and which notes it covers, so --resume
+    does not continue a journal written by a different run."""
+    import hashlib
+
+    parts = (
+        os.path.abspath(opts.path),
+        opts.mode,
+        opts.tags or [opts.tag],
+        opts.order,
+        sorted(opts.rename.rules.items()) if opts.rename is not None else None,
+        opts.rules.rules if opts.rules is not None else None,
+        opts.where,
+        opts.recursive,
+        opts.include_glob,
+        opts.exclude_glob,
+        opts.exclude_dirs,
+        opts.since,
+        opts.git_changed,
+    )
+    return hashlib.blake2b(repr(parts).encode("utf-8"), digest_size=16).hexdigest()
+
+
+def _rel(path: str, vault_root: str) -> str:
+    return os.path.relpath(path, start=vault_root).replace(os.sep, "/")
+
+
+def _append(fd: int, data: bytes) -> None:
+    # One write() per record or batch on an O_APPEND descriptor, so lines
+    # from worker processes and the parent never interleave
+    while data:
+        data = data[os.write(fd, data) :]
+
+
+_quote = json.encoder.encode_basestring  # the C string escaper json uses
+
+
+def _line(record: dict) -> str:
+    return json.dumps(record, ensure_ascii=False) + "\n"
+
+
+def record_intent(
+    journal: str, vault_root: str, path: str, digest: str, fsync: bool
+) -> None:
+    """Append an intent line for 'path' before it is written. Called by the
+    process that writes the note, which may be a worker."""
+    fd = os.open(journal, os.O_WRONLY | os.O_APPEND)
+    try:
+        line = _line({"path": _rel(path, vault_root), "intent": digest})
+        _append(fd, line.encode("utf-8"))
+        if fsync:
+            os.fsync(fd)
+    finally:
+        os.close(fd)
+
+
+def _header(f, path: str, key: str) -> dict:
+    try:
+        header = json.loads(f.readline())
+    except ValueError:
+        header = None
+    if not isinstance(header, dict) or header.get("run") != key:
+        raise ValueError(
+            f"resume: {path} is from a different run; "
+            "run without --resume to start over"
+        )
+    return header
+
+
+def check_resume(opts) -> None:
+    """Raise ValueError if the vault's journal was written by a different
+    run than opts describes. No journal is fine: everything is processed."""
+    path = journal_path(opts.path)
+    try:
+        f = open(path, encoding="utf-8")
+    except FileNotFoundError:
+        return
+    with f:
+        _header(f, path, run_key(opts))
+
+
+class Journal:
+    """The journal of one run: what an interrupted run already finished
+    (when resuming), and the outcomes of this one, appended in batches."""
+
+    def __init__(self, vault_root: str, key: str, resume: bool, fsync: bool):
+        self.vault_root = vault_root
+        self.path = journal_path(vault_root)
+        self.fsync = fsync
+        self.started = time.time()
+        self.done: Set[str] = set()
+        self.intents: Dict[str, str] = {}
+        self._pending: List[str] = []
+        self._prefix = os.path.join(vault_root, "")
+        if resume and os.path.exists(self.path):
+            self._load(key)
+            self._fd = os.open(self.path, os.O_WRONLY | os.O_APPEND)
+        else:
+            os.makedirs(os.path.dirname(self.path), exist_ok=True)
+            flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT | os.O_TRUNC
+            self._fd = os.open(self.path, flags, 0o666)
+            header = _line({"run": key, "started": self.started})
+            _append(self._fd, header.encode("utf-8"))
+
+    def _load(self, key: str) -> None:
+        with open(self.path, encoding="utf-8") as f:
+            header = _header(f, self.path, key)
+            # keep the original start, e.g. for '--since last-run'
+            self.started = header.get("started", self.started)
+            for line in f:
+                try:
+                    record = json.loads(line)
+                except ValueError:
+                    continue  # a line cut short by the interruption
+                if "done" in record:
+                    self.done.add(record["path"])
+                elif "intent" in record:
+                    self.intents[record["path"]] = record["intent"]
+
+    def _rel(self, path: str) -> str:
+        # walked paths start with the vault root; relpath is much slower
+        if path.startswith(self._prefix):
+            return path[len(self._prefix) :].replace(os.sep, "/")
+        return _rel(path, self.vault_root)
+
+    def already_done(self, path: str) -> bool:
+        """True if the interrupted run finished 'path', or wrote it and was
+        stopped before it could record that."""
+        if not self.done and not self.intents:
+            return False
+        rel = self._rel(path)
+        if rel in self.done:
+            return True
+        digest = self.intents.get(rel)
+        if digest is None:
+            return False
+        try:
+            head, _ = read_head(path)
+        except OSError:
+            return False
+        if content_digest(head) != digest:
+            return False  # not written yet, or edited since: process it
+        self.finished(path, "modified")
+        return True
+
+    def finished(self, path: str, outcome: str) -> None:
+        # the same line _line() writes; json.dumps per note was a fifth of a
+        # no-op sweep's time
+        rel = _quote(self._rel(path))
+        self._pending.append(f'{{"path": {rel}, "done": "{outcome}"}}\n')
+        if len(self._pending) >= BATCH:
+            self.flush()
+
+    def flush(self) -> None:
+        if self._pending:
+            _append(self._fd, "".join(self._pending).encode("utf-8"))
+            self._pending.clear()
+            if self.fsync:
+                os.fsync(self._fd)
+
+    def close(self) -> None:
+        """Write what is still buffered."""
+        self.flush()
+        os.close(self._fd)
+
+    def remove(self) -> None:
+        """Delete the journal of a completed run, and its folder if nothing
+        else is in it (a plain folder of notes rather than a vault)."""
+        os.unlink(self.path)
+        try:
+            os.rmdir(os.path.dirname(self.path))
+        except OSError:
+            pass  # not empty: Obsidian's settings, the index, the run marker
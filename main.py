@@ -1,14 +1,53 @@
 from __future__ import annotations
 
 import argparse
-import difflib
-from dataclasses import dataclass
-from typing import List, Optional, Sequence, Union
+import os
+import sys
+import time
+from collections import deque
+from dataclasses import dataclass, replace
+from functools import partial
+from itertools import islice
+from typing import (
+    TYPE_CHECKING,
+    Deque,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Tuple,
+    Union,
+)
 
-from config import Settings, settings
-from fm_yaml import build_file_text, load_frontmatter, split_frontmatter
-from fs import iter_markdown_files, read_text, write_text
-from tag_ops import add_tag, remove_tag
+import stats
+from fm_patch import patch_tag_changes
+from fm_yaml import build_file_text, detect_tags, load_frontmatter, split_frontmatter
+from fs import (
+    DEFAULT_EXCLUDE_DIRS,
+    DURABILITY,
+    iter_markdown_entries,
+    read_head,
+    read_head_digest,
+    read_text,
+    sync_written,
+    write_head,
+)
+from tag_ops import TagRenamer, apply_tag_changes, would_apply_change
+from report import REPORTS, make_report
+from vault_index import IndexEntry, VaultIndex, content_digest, make_entry, tag_state
+from where import compile_where
+
+if TYPE_CHECKING:
+    from backup_store import RunEntry
+    from rules import RuleSet
+    from config import Settings
+    from plan import PlanEntry
+
+# Modules only some runs need (config, difflib, plan, backup_store, the
+# process pool, and ruamel.yaml inside fm_yaml/tag_ops) are imported where
+# they are first used, so --help, empty folders and index hits start fast.
+# tests/test_startup.py keeps an import-time budget on this.
 
 
 @dataclass
@@ -16,13 +55,29 @@ class Options:
     path: str
     tag: str
     tags: Optional[List[str]]
-    mode: str  # 'add' or 'remove'
+    mode: str  # 'add', 'remove', 'rename' or 'promote'
     recursive: bool
     dry_run: bool
     backup: bool
     order: str  # 'preserve' or 'alpha'
-    include_glob: str
+    include_glob: Union[str, List[str]]
     backup_dir: str
+    jobs: int = 1  # worker processes; 0 means one per CPU
+    index: bool = False  # use the persistent vault index to skip no-op files
+    rebuild_index: bool = False
+    exclude_glob: Optional[List[str]] = None  # file names to skip
+    exclude_dirs: Optional[List[str]] = None  # dir names to prune; None = defaults
+    plan_file: Optional[str] = None  # write a change plan here instead of files
+    report: str = "diff"  # 'diff', 'summary' or 'json'
+    durability: str = "none"  # 'none', 'file' or 'batch'; see fs.DURABILITY
+    backup_format: str = "mirror"  # 'mirror' (.bak copies) or 'store' (backup_store)
+    stats: bool = False  # print per-stage timings and counters to stderr
+    where: Optional[List[str]] = None  # frontmatter conditions; see where.py
+    rename: Optional[TagRenamer] = None  # the renames for mode 'rename'
+    rules: Optional[RuleSet] = None  # per-note changes from a rules file
+    since: Optional[str] = None  # a time or 'last-run'; see changed.py
+    git_changed: Optional[str] = None  # git revision; only notes changed since
+    resume: bool = False  # skip notes an interrupted run finished; see journal.py
 
 
 def from_settings(cfg: Settings) -> Options:
@@ -37,14 +92,42 @@ def from_settings(cfg: Settings) -> Options:
         order=cfg.order,
         include_glob=cfg.include_glob,
         backup_dir=cfg.backup_dir,
+        jobs=getattr(cfg, "jobs", 1),
+        index=getattr(cfg, "index", False),
+        rebuild_index=getattr(cfg, "rebuild_index", False),
+        exclude_glob=getattr(cfg, "exclude_glob", None),
+        exclude_dirs=getattr(cfg, "exclude_dirs", None),
+        plan_file=getattr(cfg, "plan_file", None),
+        report=getattr(cfg, "report", "diff"),
+        durability=getattr(cfg, "durability", "none"),
+        backup_format=getattr(cfg, "backup_format", "mirror"),
+        stats=getattr(cfg, "stats", False),
+        where=getattr(cfg, "where", None),
+        rename=TagRenamer(cfg.rename) if getattr(cfg, "rename", None) else None,
+        rules=_load_rules(getattr(cfg, "rules_file", None)),
+        since=getattr(cfg, "since", None),
+        git_changed=getattr(cfg, "git_changed", None),
+        resume=getattr(cfg, "resume", False),
     )
 
 
+def _load_rules(path: Optional[str]) -> Optional[RuleSet]:
+    if not path:
+        return None
+    from rules import load_rules
+
+    return load_rules(path)
+
+
 # main.py
 
 
 def process_file_text(
-    text: str, tags_or_tag: Union[str, Sequence[str]], mode: str, order: str
+    text: str,
+    tags_or_tag: Union[str, Sequence[str]],
+    mode: str,
+    order: str,
+    rename: Optional[TagRenamer] = None,
 ) -> str:
     # Normalize to list[str]
     if isinstance(tags_or_tag, str):
@@ -52,77 +135,542 @@ def process_file_text(
     else:
         tags = [t for t in tags_or_tag if t is not None]
 
+    if mode == "add":
+        return apply_text_changes(text, add=tags, order=order)
+    elif mode == "remove":
+        return apply_text_changes(text, remove=tags, order=order)
+    elif mode == "rename" and rename is not None:
+        return apply_text_changes(text, order=order, rename=rename)
+    else:
+        raise ValueError("mode must be 'add', 'remove' or 'rename' (with renames)")
+
+
+def apply_text_changes(
+    text: str,
+    add: Sequence[str] = (),
+    remove: Sequence[str] = (),
+    order: str = "preserve",
+    rename: Optional[TagRenamer] = None,
+) -> str:
+    """Rename, remove, then add any number of tags with a single parse and
+    emit. Returns the original text object when nothing changes.
+    """
     yaml_text, body, nl = split_frontmatter(text)
+
+    # Fast path: splice the tags entry textually when its shape allows it.
+    if order == "preserve":
+        patched = patch_tag_changes(yaml_text, add, remove, nl, rename)
+        if patched is not None:
+            new_yaml, changed, fm_empty = patched
+            if not changed:
+                return text
+            if fm_empty:
+                return body.lstrip("\r\n")
+            return f"---{nl}{new_yaml}---{nl}{body}"
+
+    # Only notes that will actually change pay for the round-trip loader
+    detected = detect_tags(yaml_text)
+    if detected is not None and not would_apply_change(
+        *detected, add, remove, rename
+    ):
+        return text
+
     meta = load_frontmatter(yaml_text)
+    meta, changed, fm_empty = apply_tag_changes(meta, add, remove, order, rename)
+    if not changed:
+        return text
+    if fm_empty:
+        return body.lstrip("\r\n")
+    return build_file_text(meta, body, nl)
 
-    if mode == "add":
-        any_change = False
-        for t in tags:
-            meta, changed = add_tag(meta, t, order)
-            any_change = any_change or changed
-        if not any_change and yaml_text is not None:
-            return text
-        return build_file_text(meta, body, nl)
 
-    elif mode == "remove":
-        any_change = False
-        fm_empty = False
-        for i, t in enumerate(tags):
-            meta, changed, fm_empty = remove_tag(meta, t, order)
-            any_change = any_change or changed
-            # If FM emptied before finishing, remaining removes are no-ops
-            if fm_empty:
-                break
-        if not any_change:
-            return text
-        if fm_empty:
-            return body.lstrip("\r\n")
-        return build_file_text(meta, body, nl)
+@dataclass
+class FileResult:
+    path: str
+    changed: bool
+    diff: Optional[str] = None  # frontmatter-only, on dry-run
+    backup_path: Optional[str] = None
+    index_entry: Optional[IndexEntry] = None  # only when opts.index is set
+    plan_entry: Optional[PlanEntry] = None  # only when opts.plan_file is set
+    head_before: Optional[str] = None  # set for changed files
+    head_after: Optional[str] = None
+    backup_entry: Optional[RunEntry] = None  # only with backup_format 'store'
+    bytes_written: int = 0
+    elapsed: Optional[float] = None  # seconds in process_one, with opts.stats
+    stats: Optional[dict] = None  # stats.drain() snapshot, with opts.stats
+
+    # Tags are derived from the heads on demand; the default report never
+    # asks, so it never pays for parsing them.
+    @property
+    def tags_before(self) -> Optional[Tuple[str, ...]]:
+        return None if self.head_before is None else tag_state(self.head_before)[0]
+
+    @property
+    def tags_after(self) -> Optional[Tuple[str, ...]]:
+        return None if self.head_after is None else tag_state(self.head_after)[0]
+
+
+def _file_changes(
+    path: str, opts: Options, head: Optional[str] = None
+) -> Optional[Tuple[Sequence[str], Sequence[str], Optional[TagRenamer]]]:
+    """
+    (add, remove, rename) for one note. Rules files make this depend on the
+    note's path, and 'head' decides their --where conditions (without it,
+    all of them count). Mode 'promote' adds the note's inline body tags; it
+    reads the whole note, so without 'head' this returns None (not known
+    until the note is processed).
+    """
+    if opts.rules is not None:
+        rel = os.path.relpath(path, start=opts.path).replace(os.sep, "/")
+        add, remove = opts.rules.changes(rel, head)
+        return add, remove, None
+    if opts.mode == "promote":
+        if head is None:
+            return None
+        from inline_tags import find_inline_tags
+
+        _, body, _ = split_frontmatter(read_text(path))
+        return find_inline_tags(body), (), None
+    tags = [t for t in (opts.tags if opts.tags else [opts.tag]) if t is not None]
+    if opts.mode == "add":
+        return tags, (), None
+    if opts.mode == "remove":
+        return (), tags, None
+    if opts.mode == "rename" and opts.rename is not None:
+        return (), (), opts.rename
+    raise ValueError("mode must be 'add', 'remove' or 'rename' (with renames)")
+
+
+def process_one(
+    path: str,
+    opts: Options,
+    known: Optional[IndexEntry] = None,
+    journal: Optional[str] = None,
+) -> FileResult:
+    """Process a single file according to opts.
+    'known' is the file's previous index entry, if any; when the hash of the
+    note's head still matches it, the file is not parsed again. With a
+    'journal' path, an intent line is appended before the note is written.
+    Runs in worker processes when opts.jobs != 1, so it must not print.
+    """
+    st = os.stat(path) if opts.index else None
+    # Only the frontmatter and first body line are decoded; the rest of the
+    # note is never read unless a dry-run needs it for the diff.
+    head, offset = read_head(path)
+    if opts.where and not compile_where(tuple(opts.where)).matches(head):
+        entry = make_entry(path, opts.path, head, st) if opts.index else None
+        return FileResult(path, False, index_entry=entry)
+    changes = _file_changes(path, opts, head)
+
+    if known is not None and known.digest == content_digest(head):
+        if not known.matches(st):
+            # Only the head is hashed: the body, and its tags, may differ
+            known.inline = None
+        known.mtime_ns, known.size = st.st_mtime_ns, st.st_size
+        if not would_apply_change(known.tags, known.normalized, *changes):
+            return FileResult(path, False, index_entry=known)
+
+    updated = apply_text_changes(head, *changes[:2], opts.order, changes[2])
+
+    if updated == head:
+        entry = make_entry(path, opts.path, head, st) if opts.index else None
+        return FileResult(path, False, index_entry=entry)
+    if opts.plan_file:
+        from plan import PlanEntry
+
+        # Re-read with a whole-file hash so apply can detect later edits
+        planned, offset, digest = read_head_digest(path)
+        if planned != head:
+            head = planned
+            changes = _file_changes(path, opts, head)
+            updated = apply_text_changes(head, *changes[:2], opts.order, changes[2])
+            if updated == head:
+                return FileResult(path, False)
+        rel = os.path.relpath(path, start=opts.path).replace(os.sep, "/")
+        entry = make_entry(path, opts.path, head, st) if opts.index else None
+        return _changed(
+            path,
+            head,
+            updated,
+            index_entry=entry,
+            plan_entry=PlanEntry(rel, digest, offset, updated),
+        )
+    if opts.dry_run:
+        diff = _head_diff(path, head, updated, offset)
+        entry = make_entry(path, opts.path, head, st) if opts.index else None
+        return _changed(path, head, updated, diff=diff, index_entry=entry)
+    use_store = opts.backup and opts.backup_format == "store"
+    if use_store:
+        from backup_store import BackupStore, RunEntry
+
+        before = os.stat(path)
+        digest = BackupStore(opts.backup_dir).put(path)
+    if journal is not None:
+        from journal import record_intent
+
+        fsync = opts.durability != "none"
+        record_intent(journal, opts.path, path, content_digest(updated), fsync)
+    backup_path = write_head(
+        path,
+        updated,
+        offset,
+        backup=opts.backup and not use_store,
+        vault_root=opts.path,
+        backup_root=opts.backup_dir,
+        fsync=opts.durability == "file",
+    )
+    after = os.stat(path)
+    backup_entry = None
+    if use_store:
+        rel = os.path.relpath(path, start=opts.path).replace(os.sep, "/")
+        backup_entry = RunEntry(
+            rel, digest, after.st_mtime_ns, after.st_size, before.st_mtime_ns
+        )
+    entry = make_entry(path, opts.path, updated, after) if opts.index else None
+    return _changed(
+        path,
+        head,
+        updated,
+        backup_path=backup_path,
+        backup_entry=backup_entry,
+        index_entry=entry,
+        bytes_written=after.st_size,
+    )
+
+
+@stats.timed("diff")
+def _head_diff(path: str, head: str, updated: str, offset: int) -> str:
+    import difflib
+
+    # Diff the heads only; the body past the first line is identical
+    diff = difflib.unified_diff(
+        head.splitlines(True),
+        updated.splitlines(True),
+        fromfile=path + " (old)",
+        tofile=path + " (new)",
+    )
+    diff = "".join(diff)
+    if not diff.endswith("\n"):
+        diff += "\n"
+    if offset < os.path.getsize(path):
+        diff += "@@ rest of body unchanged @@\n"
+    return diff
+
+
+def _changed(path: str, before: str, after: str, **kwargs) -> FileResult:
+    return FileResult(path, True, head_before=before, head_after=after, **kwargs)
+
+
+def _process_candidate(
+    candidate: Tuple[str, Optional[IndexEntry]],
+    opts: Options,
+    journal: Optional[str] = None,
+) -> FileResult:
+    path, known = candidate
+    if opts.stats:
+        stats.enable()  # also in worker processes
+    start = time.perf_counter()
+    result = process_one(path, opts, known, journal)
+    result.elapsed = time.perf_counter() - start
+    if opts.stats:
+        result.stats = stats.drain()
+    return result
+
+
+def _process_chunk(
+    chunk: List[Tuple[str, Optional[IndexEntry]]],
+    opts: Options,
+    journal: Optional[str] = None,
+) -> List[FileResult]:
+    return [_process_candidate(candidate, opts, journal) for candidate in chunk]
+
+
+def parallel_results(executor, work, items, jobs: int, chunksize: int = 8):
+    """
+    Like executor.map over chunks of items, flattened: work(chunk) must
+    return one result per item, and results come in submission order. Items
+    are taken lazily and at most jobs * 4 chunks are in flight, so memory
+    stays flat however large the vault or slow the consumer.
+    """
+    items = iter(items)
+    pending: Deque = deque()
+
+    def submit() -> None:
+        chunk = list(islice(items, chunksize))
+        if chunk:
+            pending.append(executor.submit(work, chunk))
+
+    for _ in range(jobs * 4):
+        submit()
+    while pending:
+        results = pending.popleft().result()
+        submit()
+        yield from results
+
+
+class _PathEntry:
+    """The parts of os.DirEntry that iter_changes uses, for explicit paths."""
+
+    __slots__ = ("path",)
+
+    def __init__(self, path: str):
+        self.path = path
+
+    def stat(self) -> os.stat_result:
+        return os.stat(self.path)
+
+
+def iter_entries(opts: Options, paths: Optional[Iterable[str]] = None):
+    """
+    The notes a run covers, as os.DirEntry-like objects: every note under
+    opts.path that passes the include/exclude rules, or just 'paths' (already
+    filtered by the caller) when given. opts.git_changed and opts.since
+    narrow either down to recently changed notes.
+    """
+    if paths is None and opts.git_changed:
+        from changed import git_changed_paths
+
+        paths = git_changed_paths(opts)
+    if paths is None:
+        entries = iter_markdown_entries(
+            opts.path,
+            opts.recursive,
+            opts.include_glob,
+            exclude_glob=opts.exclude_glob,
+            exclude_dirs=(
+                DEFAULT_EXCLUDE_DIRS if opts.exclude_dirs is None else opts.exclude_dirs
+            ),
+            exclude_paths=[opts.backup_dir] if opts.backup_dir else (),
+        )
     else:
-        raise ValueError("mode must be 'add' or 'remove'")
-
-
-# main.py (inside process_path)
-def process_path(opts: Options) -> int:
-    total = 0
-    changed = 0
-    backups_made = False
-
-    for path in iter_markdown_files(opts.path, opts.recursive, opts.include_glob):
-        total += 1
-        original = read_text(path)
-        tags_to_use = opts.tags if opts.tags else [opts.tag]
-        updated = process_file_text(original, tags_to_use, opts.mode, opts.order)
-
-        if updated != original:
-            changed += 1
-            if opts.dry_run:
-                print(f"[DRY-RUN] Would modify: {path}")
-                diff = difflib.unified_diff(
-                    original.splitlines(True),
-                    updated.splitlines(True),
-                    fromfile=path + " (old)",
-                    tofile=path + " (new)",
-                )
-                print("".join(diff))
-            else:
-                backup_path = write_text(
-                    path,
-                    updated,
-                    backup=opts.backup,
-                    vault_root=opts.path,
-                    backup_root=opts.backup_dir,
-                )
-                print(f"Modified: {path}")
-                if backup_path:
-                    backups_made = True
+        # may have been deleted or renamed since
+        entries = (_PathEntry(path) for path in paths if os.path.isfile(path))
+    if opts.since is not None:
+        from changed import changed_since, since_time
+
+        cutoff = since_time(opts.path, opts.since)
+        if cutoff is not None:
+            entries = changed_since(entries, cutoff)
+    yield from entries
+
 
-    print(
-        f"Processed {total} file(s). {'Changed ' + str(changed) if changed else 'No changes.'}"
+class ChangeRecord:
+    """
+    One changed note, as yielded by iter_changes. action is 'modified',
+    'would_modify' (dry-run) or 'planned'. diff is set on dry-run.
+    tags_before/tags_after are parsed from the note's head on each access.
+    """
+
+    __slots__ = (
+        "path",
+        "action",
+        "diff",
+        "backup_path",
+        "bytes_written",
+        "elapsed",
+        "_head_before",
+        "_head_after",
     )
-    if backups_made and opts.backup:
-        print(f"Backups saved under: {opts.backup_dir}")
-    return changed
+
+    def __init__(self, result: FileResult, action: str):
+        self.path = result.path
+        self.action = action
+        self.diff = result.diff
+        self.backup_path = result.backup_path
+        self.bytes_written = result.bytes_written
+        self.elapsed = result.elapsed  # seconds spent processing the note
+        self._head_before = result.head_before
+        self._head_after = result.head_after
+
+    @property
+    def tags_before(self) -> Tuple[str, ...]:
+        return tag_state(self._head_before)[0]
+
+    @property
+    def tags_after(self) -> Tuple[str, ...]:
+        return tag_state(self._head_after)[0]
+
+    def __repr__(self) -> str:
+        return f"ChangeRecord({self.path!r}, {self.action!r})"
+
+
+@dataclass
+class RunSummary:
+    """Totals of an iter_changes run; complete once iteration has finished."""
+
+    total: int = 0  # matching notes seen, including index-skipped ones
+    changed: int = 0
+    backups_made: bool = False
+    plan_count: Optional[int] = None  # changes written, when planning
+    resumed: int = 0  # notes an interrupted run already finished (--resume)
+    run_id: Optional[str] = None  # backup store run, if one was recorded
+    stats: Optional[stats.StatsReport] = None  # with opts.stats
+    wall: float = 0.0  # seconds
+
+
+def iter_changes(
+    opts: Options,
+    paths: Optional[Iterable[str]] = None,
+    summary: Optional[RunSummary] = None,
+) -> Iterator[ChangeRecord]:
+    """
+    Process every matching note under opts.path, or only 'paths' (already
+    filtered by the caller, e.g. the watcher) when given, and yield a
+    ChangeRecord per changed note as soon as it is done. Nothing is printed.
+    Stopping early (break, or close() on the generator) finishes cleanly:
+    notes already written stay written and their backups, plan entries and
+    index rows are kept. Pass a RunSummary to collect the totals.
+    Sweeps over the whole vault that write notes keep a journal, so an
+    interrupted one can be continued with opts.resume (see journal.py).
+    """
+    summary = summary if summary is not None else RunSummary()
+    started = time.perf_counter()
+    started_at = time.time()  # the next '--since last-run' starts from here
+    where = compile_where(tuple(opts.where)) if opts.where else None
+    journal = None
+    if paths is None and not (opts.plan_file or opts.dry_run):
+        from journal import Journal, run_key
+
+        journal = Journal(
+            opts.path, run_key(opts), opts.resume, opts.durability != "none"
+        )
+        started_at = journal.started  # a resumed run counts from the first
+    index = None
+    if opts.index or opts.rebuild_index:
+        if not opts.index:
+            opts = replace(opts, index=True)  # a copy; workers read opts.index
+        index = VaultIndex.open(opts.path, rebuild=opts.rebuild_index)
+    plan = None
+    if opts.plan_file:
+        from plan import PlanWriter
+
+        plan = PlanWriter(opts.plan_file, opts.path)
+    if plan is not None:
+        action = "planned"
+    elif opts.dry_run:
+        action = "would_modify"
+    else:
+        action = "modified"
+    batch_sync = opts.durability == "batch" and action == "modified"
+    run = None
+    if opts.backup and opts.backup_format == "store" and action == "modified":
+        from backup_store import BackupStore
+
+        fsync = opts.durability != "none"
+        run = BackupStore(opts.backup_dir).begin_run(opts.path, fsync)
+    written: List[str] = []
+    run_stats = None
+    if opts.stats:
+        stats.enable()
+        stats.drain()
+        run_stats = summary.stats = stats.StatsReport()
+
+    def candidates():
+        # Yield (path, known index entry); files the index proves to be
+        # no-ops are counted but never opened.
+        entries = iter_entries(opts, paths)
+        if run_stats is not None:
+            entries = stats.timed_iter("walk", entries)
+        for entry in entries:
+            summary.total += 1
+            path = entry.path
+            if journal is not None and journal.already_done(path):
+                summary.resumed += 1
+                continue
+            changes = _file_changes(path, opts)
+            if changes is not None and not any(changes):
+                continue  # no rule covers this note
+            known = index.get(path) if index is not None else None
+            if known is not None and known.matches(entry.stat()):
+                if changes is None and known.inline is not None:
+                    changes = known.inline, (), None  # promote: body tags known
+                if changes is not None and not would_apply_change(
+                    known.tags, known.normalized, *changes
+                ):
+                    continue
+                if where is not None and where.tags_only:
+                    if not where.match_tags(known.tags):
+                        continue
+            yield path, known
+
+    jobs = opts.jobs or os.cpu_count() or 1
+    executor = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        journal_path = journal.path if journal is not None else None
+        if executor is None:
+            process = partial(_process_candidate, opts=opts, journal=journal_path)
+            results = map(process, candidates())
+        else:
+            work = partial(_process_chunk, opts=opts, journal=journal_path)
+            results = parallel_results(executor, work, candidates(), jobs)
+
+        for result in results:
+            if run_stats is not None:
+                run_stats.merge(result.stats)
+                run_stats.file(result.path, result.elapsed)
+            if result.index_entry is not None:
+                index.put(result.index_entry)
+            if journal is not None:
+                journal.finished(
+                    result.path, "modified" if result.changed else "unchanged"
+                )
+            if not result.changed:
+                continue
+            summary.changed += 1
+            if plan is not None:
+                plan.add(result.plan_entry)
+            if result.backup_path:
+                summary.backups_made = True
+            if result.backup_entry is not None:
+                run.add(result.backup_entry)
+                summary.backups_made = True
+            if batch_sync:
+                written.append(result.path)
+            yield ChangeRecord(result, action)
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if written:
+            sync_written(written)
+        if journal is not None:
+            journal.close()
+        if index is not None:
+            index.close()
+        if plan is not None:
+            plan.close()
+            summary.plan_count = plan.count
+        if run is not None:
+            run.close()
+            summary.run_id = run.run_id if run.count else None
+        if run_stats is not None:
+            run_stats.merge(stats.drain())
+            stats.enable(False)
+        summary.wall = time.perf_counter() - started
+    # Only reached when every note was processed
+    if journal is not None:
+        journal.remove()  # nothing left to resume
+    if opts.since == "last-run" and action == "modified" and paths is None:
+        from changed import write_marker
+
+        write_marker(opts.path, started_at)
+
+
+def process_path(opts: Options, paths: Optional[Iterable[str]] = None) -> int:
+    """CLI consumer of iter_changes: report each change, then the totals.
+    Returns the number of changed notes.
+    """
+    summary = RunSummary()
+    report = make_report(opts)
+    for record in iter_changes(opts, paths, summary):
+        report.file(record)
+    report.finish(summary)
+    if summary.stats is not None:
+        print(summary.stats.format(summary.wall), file=sys.stderr)
+    return summary.changed
 
 
 def parse_bool(s: Optional[str]) -> Optional[bool]:
@@ -131,18 +679,166 @@ def parse_bool(s: Optional[str]) -> Optional[bool]:
     return s.lower() in ("1", "true", "t", "yes", "y")
 
 
+def _split_list(entries: List[str]) -> List[str]:
+    # Repeated and comma-separated values, e.g. --tag a,b --tag c
+    flat = []
+    for entry in entries:
+        flat.extend([t.strip() for t in str(entry).split(",") if t.strip()])
+    return flat
+
+
+def _read_renames(pairs: List[str], path: Optional[str]) -> dict:
+    """Rename rules from a YAML mapping file (old: new), then OLD=NEW pairs."""
+    mapping = {}
+    if path:
+        from fm_yaml import safe_load, yaml_error
+
+        with open(path, encoding="utf-8") as f:
+            try:
+                data = safe_load(f.read())
+            except yaml_error() as e:
+                raise ValueError(f"{path}: {e}") from None
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a mapping of old: new tags")
+        mapping.update((str(k), str(v)) for k, v in data.items())
+    for pair in pairs:
+        old, sep, new = pair.partition("=")
+        if not sep:
+            raise ValueError(f"rename: expected OLD=NEW, got {pair!r}")
+        mapping[old.strip()] = new.strip()
+    return mapping
+
+
 def main():
     parser = argparse.ArgumentParser(description="Obsidian Tag Manager")
     parser.add_argument("--path")
     parser.add_argument("--tag", action="append")
-    parser.add_argument("--mode", choices=["add", "remove"])
+    parser.add_argument("--mode", choices=["add", "remove", "rename", "promote"])
+    parser.add_argument(
+        "--rename",
+        action="append",
+        metavar="OLD=NEW",
+        help="rename a tag (OLD/*=NEW/* for a whole subtree); repeatable",
+    )
+    parser.add_argument(
+        "--rules",
+        metavar="PATH",
+        help="YAML/TOML file of match -> add/remove rules, applied in one pass",
+    )
+    parser.add_argument(
+        "--rename-file",
+        dest="rename_file",
+        metavar="PATH",
+        help="YAML mapping of renames, applied together with --rename",
+    )
     parser.add_argument("--recursive", choices=["true", "false"])
     parser.add_argument("--dry-run", dest="dry_run", choices=["true", "false"])
     parser.add_argument("--backup", choices=["true", "false"])
     parser.add_argument("--order", choices=["preserve", "alpha"])
-    parser.add_argument("--include-glob")
+    parser.add_argument("--include-glob", action="append")
+    parser.add_argument("--exclude-glob", action="append")
+    parser.add_argument("--exclude-dir", dest="exclude_dir", action="append")
+    parser.add_argument(
+        "--where",
+        action="append",
+        metavar="COND",
+        help="only notes whose frontmatter matches, e.g. type=meeting; repeatable",
+    )
+    parser.add_argument(
+        "--since",
+        metavar="WHEN",
+        help="only notes changed since WHEN (ISO time, epoch seconds or last-run)",
+    )
+    parser.add_argument(
+        "--git-changed",
+        dest="git_changed",
+        metavar="REV",
+        help="only notes git reports as changed since REV, plus untracked ones",
+    )
+    parser.add_argument(
+        "--resume",
+        action="store_true",
+        help="continue an interrupted run, skipping the notes it finished",
+    )
+    parser.add_argument("--jobs", type=int, help="worker processes (0 = all CPUs)")
+    parser.add_argument("--index", choices=["true", "false"])
+    parser.add_argument(
+        "--rebuild-index",
+        dest="rebuild_index",
+        action="store_true",
+        help="discard the vault index and rebuild it during this run",
+    )
+    parser.add_argument("--report", choices=list(REPORTS))
+    parser.add_argument("--durability", choices=list(DURABILITY))
+    parser.add_argument(
+        "--plan", dest="plan_file", help="write a change plan, do not modify files"
+    )
+    parser.add_argument(
+        "--apply-plan", dest="apply_plan", help="apply a plan written by --plan"
+    )
+    parser.add_argument(
+        "--backup-format", dest="backup_format", choices=["mirror", "store"]
+    )
+    parser.add_argument(
+        "--undo", metavar="RUN_ID", help="restore a backup run ('last' = latest)"
+    )
+    parser.add_argument("--list-runs", dest="list_runs", action="store_true")
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="after one sweep, keep processing notes as they are saved",
+    )
+    parser.add_argument(
+        "--list-tags",
+        dest="list_tags",
+        action="store_true",
+        help="print how many notes carry each tag (read-only)",
+    )
+    parser.add_argument(
+        "--query", metavar="EXPR", help="list notes whose tags match EXPR"
+    )
+    parser.add_argument(
+        "--count", metavar="EXPR", help="count notes whose tags match EXPR"
+    )
+    parser.add_argument(
+        "--inline",
+        action="store_true",
+        help="with --list-tags/--query/--count, include #tags in note bodies",
+    )
+    parser.add_argument(
+        "--format",
+        choices=["text", "csv", "json"],
+        help="output of --list-tags/--query/--count",
+    )
+    parser.add_argument(
+        "--stats",
+        action="store_true",
+        help="print per-stage timings, latency percentiles and byte counts",
+    )
+    parser.add_argument(
+        "--profile",
+        metavar="PATH",
+        help="save a cProfile profile (pyinstrument HTML if PATH ends in .html)",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="answer JSON-lines requests on stdin (or --socket) until EOF",
+    )
+    parser.add_argument("--socket", help="with --serve, listen on this Unix socket")
+    parser.add_argument(
+        "--debounce", type=float, help="seconds of quiet before a watch batch runs"
+    )
+    parser.add_argument(
+        "--watch-backend", dest="watch_backend", choices=["auto", "inotify", "poll"]
+    )
+    parser.add_argument(
+        "--force", action="store_true", help="with --undo, also restore edited notes"
+    )
     args = parser.parse_args()
 
+    from config import settings
+
     cfg = settings
 
     # CLI overrides
@@ -152,6 +848,18 @@ def main():
         cfg.tag = args.tag
     if args.mode is not None:
         cfg.mode = args.mode
+    if args.rename or args.rename_file:
+        if args.mode not in (None, "rename"):
+            parser.error("--rename cannot be combined with --mode " + args.mode)
+        try:
+            cfg.rename = _read_renames(args.rename or [], args.rename_file)
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        cfg.mode = "rename"
+    if args.rules is not None:
+        if args.tag or args.mode or args.rename or args.rename_file:
+            parser.error("--rules cannot be combined with --tag, --mode or --rename")
+        cfg.rules_file = args.rules
     if args.recursive is not None:
         cfg.recursive = args.recursive == "true"
     if args.dry_run is not None:
@@ -161,16 +869,139 @@ def main():
     if args.order is not None:
         cfg.order = args.order
     if args.include_glob is not None:
-        cfg.include_glob = args.include_glob
+        cfg.include_glob = _split_list(args.include_glob)
+    if args.exclude_glob is not None:
+        cfg.exclude_glob = _split_list(args.exclude_glob)
+    if args.exclude_dir is not None:
+        cfg.exclude_dirs = _split_list(args.exclude_dir)
+    if args.where is not None:
+        cfg.where = args.where
+    if args.since is not None:
+        cfg.since = args.since
+    if args.git_changed is not None:
+        cfg.git_changed = args.git_changed
+    if args.jobs is not None:
+        cfg.jobs = args.jobs
+    if args.resume:
+        cfg.resume = True
+    if args.index is not None:
+        cfg.index = args.index == "true"
+    if args.rebuild_index:
+        cfg.rebuild_index = True
+    if args.plan_file is not None:
+        cfg.plan_file = args.plan_file
+    if args.report is not None:
+        cfg.report = args.report
+    if args.durability is not None:
+        cfg.durability = args.durability
+    if args.backup_format is not None:
+        cfg.backup_format = args.backup_format
+    if args.stats:
+        cfg.stats = True
 
     # handle multiple tags
     if args.tag is not None:
-        flat = []
-        for entry in args.tag:
-            flat.extend([t.strip() for t in str(entry).split(",") if t.strip()])
-        cfg.tags = flat
+        cfg.tags = _split_list(args.tag)
+
+    try:
+        opts = from_settings(cfg)
+    except (OSError, RuntimeError, ValueError) as e:
+        parser.error(str(e))
+    if opts.mode == "rename" and opts.rename is None and opts.rules is None:
+        parser.error("--mode rename needs --rename or --rename-file")
+    if opts.where:
+        try:
+            compile_where(tuple(opts.where))
+        except ValueError as e:
+            parser.error(str(e))
+    if opts.resume:
+        from journal import check_resume
+
+        try:
+            check_resume(opts)
+        except ValueError as e:
+            parser.error(str(e))
+    if opts.since is not None or opts.git_changed:
+        from changed import since_time, verify_rev
+
+        try:
+            if opts.since is not None:
+                since_time(opts.path, opts.since)
+            if opts.git_changed:
+                verify_rev(opts.path, opts.git_changed)
+        except (RuntimeError, ValueError) as e:
+            parser.error(str(e))
+    if args.list_runs or args.undo:
+        from backup_store import BackupStore
+
+        store = BackupStore(opts.backup_dir)
+        runs = store.runs()
+        if args.list_runs:
+            print("\n".join(runs) if runs else "No backup runs.")
+            return
+        run_id = runs[-1] if args.undo == "last" and runs else args.undo
+        if run_id not in runs:
+            if not runs:
+                parser.error(f"undo: no backup runs in {opts.backup_dir}")
+            parser.error(f"undo: no run {run_id!r} (see --list-runs)")
+        restored, refused = store.undo(run_id, force=args.force)
+        print(f"Restored {restored} file(s) from run {run_id}. Skipped {refused}.")
+        return
+    if args.apply_plan:
+        from plan import apply_plan
+
+        try:
+            applied, refused = apply_plan(
+                args.apply_plan,
+                backup=opts.backup,
+                backup_dir=opts.backup_dir,
+                vault_root=args.path,
+                durability=opts.durability,
+                backup_format=opts.backup_format,
+            )
+        except (OSError, ValueError) as e:
+            parser.error(str(e))
+        print(f"Applied {applied} change(s). Refused {refused} changed file(s).")
+        return
+    if args.list_tags or args.query or args.count:
+        from query import compile_query, run_query
+
+        if args.count or args.query:
+            try:
+                compile_query(args.count or args.query)
+            except ValueError as e:
+                parser.error(str(e))
+
+        command = "tags" if args.list_tags else ("count" if args.count else "list")
+        run_query(
+            opts,
+            command,
+            args.count or args.query,
+            fmt=args.format or "text",
+            inline=args.inline,
+        )
+        return
+    if args.serve:
+        from server import serve
+
+        serve(opts, socket_path=args.socket)
+        return
+    if args.watch:
+        from watch import watch
 
-    opts = from_settings(cfg)
+        watch(
+            opts,
+            debounce=0.2 if args.debounce is None else args.debounce,
+            backend=args.watch_backend or "auto",
+        )
+        return
+    if args.profile:
+        try:
+            stats.check_profiler(args.profile)
+        except RuntimeError as e:
+            parser.error(str(e))
+        stats.run_profiled(lambda: process_path(opts), args.profile)
+        return
     process_path(opts)
 
 
@@ -0,0 +1,143 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import asdict, dataclass
+from typing import IO, TYPE_CHECKING, Iterator, Optional, Tuple
+
+from fs import file_digest, sync_written, write_head
+
+if TYPE_CHECKING:
+    from backup_store import RunWriter
+
+# A change plan is a JSON-lines file: one header object, then one object per
+# file to modify with its pre-image hash and the new head (frontmatter plus
+# first body line) that replaces its first 'offset' bytes.
+PLAN_VERSION = 1
+
+
+@dataclass
+class PlanEntry:
+    path: str  # relative to the vault root, '/'-separated
+    digest: str  # fs.file_digest of the file when planned
+    offset: int  # byte length of the head being replaced
+    head: str
+
+
+class PlanWriter:
+    def __init__(self, plan_path: str, vault_root: str):
+        self.plan_path = plan_path
+        self.vault_root = vault_root
+        self.count = 0
+        self._f: IO[str] = open(plan_path, "w", encoding="utf-8", newline="\n")
+        header = {"version": PLAN_VERSION, "vault": os.path.abspath(vault_root)}
+        self._f.write(json.dumps(header) + "\n")
+
+    def add(self, entry: PlanEntry) -> None:
+        self._f.write(json.dumps(asdict(entry), ensure_ascii=False) + "\n")
+        self.count += 1
+
+    def close(self) -> None:
+        self._f.close()
+
+
+def read_plan(plan_path: str) -> Tuple[str, Iterator[PlanEntry]]:
+    """Return (vault_root, entries); entries are read lazily."""
+    f = open(plan_path, "r", encoding="utf-8")
+    try:
+        header = json.loads(f.readline() or "{}")
+    except ValueError:
+        header = None  # e.g. not a plan at all
+    if not isinstance(header, dict) or header.get("version") != PLAN_VERSION:
+        f.close()
+        raise ValueError(f"{plan_path}: not a version {PLAN_VERSION} change plan")
+
+    def entries() -> Iterator[PlanEntry]:
+        with f:
+            for line in f:
+                if line.strip():
+                    yield PlanEntry(**json.loads(line))
+
+    return header["vault"], entries()
+
+
+def apply_plan(
+    plan_path: str,
+    backup: bool = False,
+    backup_dir: Optional[str] = None,
+    vault_root: Optional[str] = None,
+    durability: str = "none",
+    backup_format: str = "mirror",
+) -> Tuple[int, int]:
+    """
+    Write every planned head whose file still hashes to its planned digest.
+    Files that changed (or vanished) since planning are left alone.
+    With backup_format 'store', backups go to a backup_store run that
+    --undo can restore. Returns (applied, refused).
+    """
+    planned_root, entries = read_plan(plan_path)
+    root = vault_root or planned_root
+    applied = refused = 0
+    written = []
+    run = None
+    if backup and backup_format == "store":
+        from backup_store import BackupStore
+
+        run = BackupStore(backup_dir).begin_run(root, fsync=durability != "none")
+    try:
+        for entry in entries:
+            if _apply_entry(entry, root, backup, backup_dir, durability, run):
+                applied += 1
+                if durability == "batch":
+                    written.append(os.path.join(root, *entry.path.split("/")))
+            else:
+                refused += 1
+    finally:
+        if run is not None:
+            run.close()
+    if written:
+        sync_written(written)
+    if run is not None and run.count:
+        print(f"Undo with: --undo {run.run_id}")
+    return applied, refused
+
+
+def _apply_entry(
+    entry: PlanEntry,
+    root: str,
+    backup: bool,
+    backup_dir: Optional[str],
+    durability: str,
+    run: Optional[RunWriter],
+) -> bool:
+    path = os.path.join(root, *entry.path.split("/"))
+    try:
+        current = file_digest(path)
+    except FileNotFoundError:
+        current = None
+    if current != entry.digest:
+        print(f"Skipped (changed since plan): {path}")
+        return False
+    if run is not None:
+        from backup_store import RunEntry
+
+        before = os.stat(path)
+        digest = run.store.put(path)
+    write_head(
+        path,
+        entry.head,
+        entry.offset,
+        backup=backup and run is None,
+        vault_root=root,
+        backup_root=backup_dir,
+        fsync=durability == "file",
+    )
+    if run is not None:
+        after = os.stat(path)
+        run.add(
+            RunEntry(
+                entry.path, digest, after.st_mtime_ns, after.st_size, before.st_mtime_ns
+            )
+        )
+    print(f"Modified: {path}")
+    return True
@@ -0,0 +1,293 @@
+from __future__ import annotations
+
+import csv
+import fnmatch
+import json
+import os
+import re
+import sys
+from collections import Counter
+from functools import partial
+from typing import IO, Callable, FrozenSet, Iterator, List, Optional, Tuple
+
+from fm_yaml import split_frontmatter
+from fs import read_head, read_text
+from inline_tags import find_inline_tags
+from main import Options, iter_entries, parallel_results
+from vault_index import IndexEntry, VaultIndex, make_entry, tag_state
+
+# Read-only tag inventory and queries. Tags are read the way tag_ops sees
+# them (no leading '#', deduplicated) from the head of each note only, via
+# the fm_patch scanner or the safe loader; the round-trip loader is only
+# used for frontmatter neither can read. With a vault index, notes whose
+# stat is unchanged are not opened at all.
+#
+# With inline=True (--inline), '#tags' in the note body count too (see
+# inline_tags), after the frontmatter ones. That needs the whole note, so
+# the index also keeps each note's body tags once they have been scanned.
+#
+# Query expressions combine tag terms with and/or/not (also &, |, !),
+# parentheses, and implicit 'and' between adjacent terms:
+#
+#   project and not archive
+#   (todo | inbox) !someday
+#   area/*            glob: any tag below 'area/'
+#   "and"             quoted: a tag literally named 'and'
+
+TagPredicate = Callable[[FrozenSet[str]], bool]
+
+FORMATS = ("text", "csv", "json")
+
+_TOKEN = re.compile(
+    r'\s*(?:(?P<op>\(|\)|&&?|\|\|?|!)|"(?P<quoted>[^"]*)"|(?P<word>[^\s()&|!"]+))'
+)
+_KEYWORDS = {"and": "&", "or": "|", "not": "!"}
+
+
+def _tokenize(expr: str) -> List[Tuple[str, str]]:
+    tokens = []
+    pos = 0
+    expr = expr.rstrip()
+    while pos < len(expr):
+        m = _TOKEN.match(expr, pos)
+        if not m:
+            raise ValueError(f"query: unexpected {expr[pos:].strip()[:10]!r}")
+        pos = m.end()
+        if m.group("op"):
+            tokens.append(("op", m.group("op")[0]))
+        elif m.group("quoted") is not None:
+            tokens.append(("tag", m.group("quoted")))
+        elif m.group("word").lower() in _KEYWORDS:
+            tokens.append(("op", _KEYWORDS[m.group("word").lower()]))
+        else:
+            tokens.append(("tag", m.group("word")))
+    return tokens
+
+
+def _term(tag: str) -> TagPredicate:
+    tag = tag.lstrip("#")
+    if not tag:
+        raise ValueError("query: empty tag")
+    if any(c in tag for c in "*?["):
+        match = re.compile(fnmatch.translate(tag)).match
+        return lambda tags: any(match(t) for t in tags)
+    return lambda tags: tag in tags
+
+
+def compile_query(expr: str) -> TagPredicate:
+    """Compile a tag expression into a predicate over a note's tag set."""
+    tokens = _tokenize(expr)
+    pos = 0
+
+    def peek() -> Optional[Tuple[str, str]]:
+        return tokens[pos] if pos < len(tokens) else None
+
+    def take() -> Tuple[str, str]:
+        nonlocal pos
+        if pos >= len(tokens):
+            raise ValueError("query: unexpected end of expression")
+        pos += 1
+        return tokens[pos - 1]
+
+    def parse_or() -> TagPredicate:
+        preds = [parse_and()]
+        while peek() == ("op", "|"):
+            take()
+            preds.append(parse_and())
+        if len(preds) == 1:
+            return preds[0]
+        return lambda tags: any(p(tags) for p in preds)
+
+    def parse_and() -> TagPredicate:
+        preds = [parse_not()]
+        while peek() is not None and peek() not in (("op", "|"), ("op", ")")):
+            if peek() == ("op", "&"):
+                take()
+            preds.append(parse_not())
+        if len(preds) == 1:
+            return preds[0]
+        return lambda tags: all(p(tags) for p in preds)
+
+    def parse_not() -> TagPredicate:
+        kind, value = take()
+        if (kind, value) == ("op", "!"):
+            inner = parse_not()
+            return lambda tags: not inner(tags)
+        if (kind, value) == ("op", "("):
+            inner = parse_or()
+            if take() != ("op", ")"):
+                raise ValueError("query: expected ')'")
+            return inner
+        if kind == "tag":
+            return _term(value)
+        raise ValueError(f"query: unexpected {value!r}")
+
+    if not tokens:
+        raise ValueError("query: empty expression")
+    pred = parse_or()
+    if pos != len(tokens):
+        raise ValueError(f"query: unexpected {tokens[pos][1]!r}")
+    return pred
+
+
+def _with_inline(tags: Tuple[str, ...], inline: Tuple[str, ...]) -> Tuple[str, ...]:
+    return tags + tuple(t for t in inline if t not in tags)
+
+
+def _scan_chunk(
+    chunk: List[str], vault_root: str, with_entry: bool, inline: bool = False
+) -> List[Tuple[str, Tuple[str, ...], Optional[IndexEntry]]]:
+    out = []
+    for path in chunk:
+        head, _ = read_head(path)
+        entry = make_entry(path, vault_root, head) if with_entry else None
+        tags = entry.tags if entry is not None else tag_state(head)[0]
+        if inline:
+            _, body, _ = split_frontmatter(read_text(path))
+            body_tags = tuple(find_inline_tags(body))
+            tags = _with_inline(tags, body_tags)
+            if entry is not None:
+                entry.inline = body_tags
+        out.append((path, tags, entry))
+    return out
+
+
+def iter_note_tags(
+    opts: Options, inline: bool = False
+) -> Iterator[Tuple[str, Tuple[str, ...]]]:
+    """
+    Yield (path, tags) for every note a run would cover, in walk order.
+    Uses the vault index when opts.index is set or an index already exists,
+    and opts.jobs worker processes for the notes that must be read. With
+    'inline', tags in the note bodies are included.
+    """
+    index = None
+    if opts.index or opts.rebuild_index or VaultIndex.exists(opts.path):
+        index = VaultIndex.open(opts.path, rebuild=opts.rebuild_index)
+    known = index.all() if index is not None else {}
+
+    def pending():
+        # (path, tags or None): tags are known when the index entry is fresh
+        for entry in iter_entries(opts):
+            cached = known.get(entry.path)
+            if cached is None or not cached.matches(entry.stat()):
+                yield entry.path, None
+            elif not inline:
+                yield entry.path, cached.tags
+            elif cached.inline is not None:
+                yield entry.path, _with_inline(cached.tags, cached.inline)
+            else:
+                yield entry.path, None
+
+    scan = partial(
+        _scan_chunk, vault_root=opts.path, with_entry=index is not None, inline=inline
+    )
+    jobs = opts.jobs or os.cpu_count() or 1
+    executor = None
+    if jobs > 1:
+        from concurrent.futures import ProcessPoolExecutor
+
+        executor = ProcessPoolExecutor(max_workers=jobs)
+    try:
+        resolve = partial(_resolve_chunk, scan=scan)
+        if executor is None:
+            results = (resolve([item])[0] for item in pending())
+        else:
+            results = parallel_results(executor, resolve, pending(), jobs)
+        for path, tags, entry in results:
+            if entry is not None:
+                index.put(entry)
+            yield path, tags
+    finally:
+        if executor is not None:
+            executor.shutdown(cancel_futures=True)
+        if index is not None:
+            index.close()
+
+
+def _resolve_chunk(chunk, scan):
+    # Index hits travel with the chunk unchanged, so results keep walk order
+    todo = [path for path, tags in chunk if tags is None]
+    scanned = iter(scan(todo))
+    return [
+        next(scanned) if tags is None else (path, tags, None) for path, tags in chunk
+    ]
+
+
+def tag_counts(notes) -> Counter:
+    """Number of notes carrying each tag."""
+    counts: Counter = Counter()
+    for _, tags in notes:
+        counts.update(tags)
+    return counts
+
+
+def write_tag_counts(counts: Counter, fmt: str, out: IO[str]) -> None:
+    rows = sorted(counts.items(), key=lambda kv: (-kv[1], kv[0]))
+    if fmt == "csv":
+        w = csv.writer(out, lineterminator="\n")
+        w.writerow(["tag", "notes"])
+        w.writerows(rows)
+    elif fmt == "json":
+        for tag, n in rows:
+            out.write(json.dumps({"tag": tag, "notes": n}, ensure_ascii=False) + "\n")
+    else:
+        for tag, n in rows:
+            out.write(f"{n:8d}  {tag}\n")
+
+
+def write_matches(notes, fmt: str, out: IO[str]) -> int:
+    """Write each (path, tags) pair as it arrives; returns the count."""
+    n = 0
+    w = None
+    if fmt == "csv":
+        w = csv.writer(out, lineterminator="\n")
+        w.writerow(["path", "tags"])
+    for path, tags in notes:
+        n += 1
+        if w is not None:
+            w.writerow([path, " ".join(tags)])
+        elif fmt == "json":
+            record = {"path": path, "tags": list(tags)}
+            out.write(json.dumps(record, ensure_ascii=False) + "\n")
+        else:
+            out.write(path + "\n")
+    return n
+
+
+def run_query(
+    opts: Options,
+    command: str,
+    expr: Optional[str] = None,
+    fmt: str = "text",
+    out: IO[str] = sys.stdout,
+    inline: bool = False,
+) -> int:
+    """
+    command is 'tags' (inventory: notes per tag), 'list' (notes matching
+    expr) or 'count' (number of notes matching expr). Returns the number of
+    matching notes (for 'tags', the number of distinct tags). With 'inline',
+    tags in the note bodies count as well.
+    """
+    if fmt not in FORMATS:
+        raise ValueError(f"format must be one of {', '.join(FORMATS)}")
+    pred = compile_query(expr) if expr else None
+    notes = iter_note_tags(opts, inline)
+    if pred is not None:
+        notes = ((p, t) for p, t in notes if pred(frozenset(t)))
+    if command == "tags":
+        counts = tag_counts(notes)
+        write_tag_counts(counts, fmt, out)
+        return len(counts)
+    if command == "list":
+        return write_matches(notes, fmt, out)
+    if command == "count":
+        n = sum(1 for _ in notes)
+        if fmt == "json":
+            out.write(json.dumps({"count": n}) + "\n")
+        elif fmt == "csv":
+            out.write(f"count\n{n}\n")
+        else:
+            out.write(f"{n}\n")
+        return n
+    raise ValueError("command must be 'tags', 'list' or 'count'")
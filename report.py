@@ -0,0 +1,121 @@
+from __future__ import annotations
+
+import json
+import os
+from collections import Counter
+from typing import Optional
+
+
+class TextReport:
+    """Default output: one line per changed file, plus a frontmatter-only
+    diff on dry-run, and a closing summary line.
+    Reports consume main.iter_changes: file() gets each ChangeRecord and
+    finish() the RunSummary.
+    """
+
+    def __init__(self, opts):
+        self.opts = opts
+
+    def file(self, record) -> None:
+        if record.action == "planned":
+            print(f"[PLAN] Would modify: {record.path}")
+        elif record.action == "would_modify":
+            print(f"[DRY-RUN] Would modify: {record.path}")
+            print(record.diff)
+        else:
+            print(f"Modified: {record.path}")
+
+    def finish(self, summary) -> None:
+        opts = self.opts
+        total, changed = summary.total, summary.changed
+        print(
+            f"Processed {total} file(s). {'Changed ' + str(changed) if changed else 'No changes.'}"
+        )
+        if summary.resumed:
+            print(f"Skipped {summary.resumed} file(s) done by the interrupted run.")
+        if summary.backups_made and opts.backup:
+            print(f"Backups saved under: {opts.backup_dir}")
+        if summary.run_id:
+            print(f"Undo with: --undo {summary.run_id}")
+        if summary.plan_count is not None:
+            print(
+                f"Plan with {summary.plan_count} change(s) written to: {opts.plan_file}"
+            )
+
+
+class SummaryReport(TextReport):
+    """Aggregate counts per tag and per directory instead of per-file lines."""
+
+    def __init__(self, opts):
+        super().__init__(opts)
+        self.by_tag: Counter = Counter()
+        self.by_dir: Counter = Counter()
+
+    def file(self, record) -> None:
+        before = set(record.tags_before)
+        after = set(record.tags_after)
+        for tag in after - before:
+            self.by_tag["+" + tag] += 1
+        for tag in before - after:
+            self.by_tag["-" + tag] += 1
+        self.by_dir[_rel_dir(record.path, self.opts.path)] += 1
+
+    def finish(self, summary) -> None:
+        if self.by_tag:
+            print("Changes by tag:")
+            for tag, n in sorted(self.by_tag.items(), key=lambda kv: kv[0][1:]):
+                print(f"  {tag}: {n}")
+        if self.by_dir:
+            print("Changed files by directory:")
+            for d, n in sorted(self.by_dir.items()):
+                print(f"  {d}: {n}")
+        super().finish(summary)
+
+
+class JsonReport(TextReport):
+    """One JSON object per changed file, then one closing totals object."""
+
+    def file(self, record) -> None:
+        before = list(record.tags_before)
+        after = list(record.tags_after)
+        out = {
+            "path": record.path,
+            "action": record.action,
+            "tags_before": before,
+            "tags_after": after,
+            "added": [t for t in after if t not in before],
+            "removed": [t for t in before if t not in after],
+        }
+        if record.backup_path:
+            out["backup_path"] = record.backup_path
+        if record.diff is not None:
+            out["diff"] = record.diff
+        print(json.dumps(out, ensure_ascii=False))
+
+    def finish(self, summary) -> None:
+        out = {"processed": summary.total, "changed": summary.changed}
+        if summary.resumed:
+            out["resumed"] = summary.resumed
+        if summary.backups_made and self.opts.backup:
+            out["backup_dir"] = self.opts.backup_dir
+        if summary.run_id:
+            out["backup_run"] = summary.run_id
+        if summary.plan_count is not None:
+            out["plan_file"] = self.opts.plan_file
+        print(json.dumps(out, ensure_ascii=False))
+
+
+REPORTS = {"diff": TextReport, "summary": SummaryReport, "json": JsonReport}
+
+
+def make_report(opts, kind: Optional[str] = None):
+    kind = kind or getattr(opts, "report", "diff")
+    try:
+        return REPORTS[kind](opts)
+    except KeyError:
+        raise ValueError(f"report must be one of {', '.join(REPORTS)}") from None
+
+
+def _rel_dir(path: str, root: str) -> str:
+    rel = os.path.relpath(os.path.dirname(path), start=root)
+    return rel.replace(os.sep, "/")
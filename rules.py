@@ -0,0 +1,182 @@
+from __future__ import annotations
+
+import os
+import re
+from dataclasses import dataclass
+from typing import List, Optional, Sequence, Tuple
+
+from where import compile_where
+
+# A rules file lists 'match -> add/remove tags' entries that one run applies
+# together: each note is read, parsed and written once for all the rules that
+# cover it, instead of once per rule and run.
+#
+#   rules:                          # YAML; in TOML, use [[rules]] tables
+#     - match: "Meetings/**"        # vault-relative globs (str or list);
+#       where: ["type=meeting"]     #   omit to match every note
+#       add: [meeting]              # --where conditions, see where.py
+#       remove: [inbox]
+#     - match: "*.excalidraw.md"    # no '/': matches the name in any folder
+#       remove: [draft]
+#
+# In globs, '*' and '?' stay within one folder and '**' spans folders. For
+# each note, the removals of all matching rules are applied first, then the
+# additions, so a tag one rule adds is kept even if another removes it.
+
+_KEYS = {"match", "where", "add", "remove"}
+
+
+@dataclass(frozen=True)
+class Rule:
+    match: Tuple[str, ...] = ()  # globs; empty matches every note
+    add: Tuple[str, ...] = ()
+    remove: Tuple[str, ...] = ()
+    where: Tuple[str, ...] = ()
+
+
+def glob_regex(pattern: str) -> str:
+    """Regex source for a vault-relative glob ('*', '?', '[..]', '**')."""
+    pattern = pattern.strip()
+    anywhere = "/" not in pattern.rstrip("/")  # a leading '/' anchors too
+    pattern = pattern.lstrip("/")
+    if pattern.endswith("/"):
+        pattern += "**"
+    out = ["(?:.*/)?"] if anywhere else []
+    i = 0
+    while i < len(pattern):
+        c = pattern[i]
+        if pattern.startswith("**/", i):
+            out.append("(?:.*/)?")
+            i += 3
+            continue
+        if pattern.startswith("**", i):
+            out.append(".*")
+            i += 2
+            continue
+        if c == "*":
+            out.append("[^/]*")
+        elif c == "?":
+            out.append("[^/]")
+        elif c == "[" and pattern.find("]", i + 2) > 0:
+            end = pattern.find("]", i + 2)
+            body = pattern[i + 1 : end]
+            if body.startswith("!"):
+                body = "^" + body[1:]
+            out.append("[" + body.replace("\\", "\\\\") + "]")
+            i = end + 1
+            continue
+        else:
+            out.append(re.escape(c))
+        i += 1
+    return "".join(out)
+
+
+class RuleSet:
+    """Rules in file order, with all of their globs in one combined regex."""
+
+    def __init__(self, rules: Sequence[Rule]):
+        self.rules = tuple(rules)
+        self._always = [i for i, r in enumerate(self.rules) if not r.match]
+        self._globs = [
+            (re.compile(glob_regex(g)), i)
+            for i, r in enumerate(self.rules)
+            for g in r.match
+        ]
+        # One match rejects notes no glob covers; only hits are tested
+        # glob by glob to find every rule that applies.
+        self._any = (
+            re.compile("|".join(f"(?:{rx.pattern})" for rx, _ in self._globs))
+            if self._globs
+            else None
+        )
+
+    def for_path(self, rel: str) -> List[Rule]:
+        """The rules whose globs match a vault-relative '/' path."""
+        hits = set(self._always)
+        if self._any is not None and self._any.fullmatch(rel):
+            hits.update(i for rx, i in self._globs if rx.fullmatch(rel))
+        return [self.rules[i] for i in sorted(hits)]
+
+    def changes(
+        self, rel: str, head: Optional[str] = None
+    ) -> Tuple[List[str], List[str]]:
+        """
+        (add, remove) for the note at 'rel'. Rules with 'where' conditions
+        count only if 'head' matches them; without a head they all count,
+        which gives an upper bound for the index no-op check.
+        """
+        add: List[str] = []
+        remove: List[str] = []
+        for rule in self.for_path(rel):
+            if rule.where and head is not None:
+                if not compile_where(rule.where).matches(head):
+                    continue
+            add.extend(t for t in rule.add if t not in add)
+            remove.extend(t for t in rule.remove if t not in remove)
+        return add, remove
+
+
+def _strings(value, what: str) -> Tuple[str, ...]:
+    if value is None:
+        return ()
+    items = value if isinstance(value, list) else [value]
+    if not all(isinstance(v, (str, int)) and str(v).strip() for v in items):
+        raise ValueError(f"{what} must be a string or a list of strings")
+    return tuple(str(v).strip() for v in items)
+
+
+def parse_rules(data) -> RuleSet:
+    """RuleSet from loaded YAML/TOML: a list of rules, or {'rules': [...]}."""
+    if isinstance(data, dict) and set(data) == {"rules"}:
+        data = data["rules"]
+    if not isinstance(data, list):
+        raise ValueError("rules: expected a list of rules")
+    rules = []
+    for n, item in enumerate(data, 1):
+        if not isinstance(item, dict):
+            raise ValueError(f"rules: rule {n} is not a mapping")
+        unknown = set(item) - _KEYS
+        if unknown:
+            raise ValueError(f"rules: rule {n}: unknown key {sorted(unknown)[0]!r}")
+        try:
+            rule = Rule(
+                match=_strings(item.get("match"), "match"),
+                add=tuple(t.lstrip("#") for t in _strings(item.get("add"), "add")),
+                remove=tuple(
+                    t.lstrip("#") for t in _strings(item.get("remove"), "remove")
+                ),
+                where=_strings(item.get("where"), "where"),
+            )
+            if rule.where:
+                compile_where(rule.where)  # fail now, not on the first note
+        except ValueError as e:
+            raise ValueError(f"rules: rule {n}: {e}") from None
+        if not rule.add and not rule.remove:
+            raise ValueError(f"rules: rule {n} neither adds nor removes a tag")
+        rules.append(rule)
+    return RuleSet(rules)
+
+
+def load_rules(path: str) -> RuleSet:
+    """Read a rules file: TOML for a .toml path, YAML otherwise."""
+    with open(path, "rb") as f:
+        raw = f.read()
+    if os.path.splitext(path)[1].lower() == ".toml":
+        try:
+            import tomllib
+        except ImportError:  # Python < 3.11
+            try:
+                import tomli as tomllib
+            except ImportError:
+                raise RuntimeError(
+                    "reading TOML rules needs Python 3.11+ or tomli"
+                ) from None
+        data = tomllib.loads(raw.decode("utf-8"))
+    else:
+        from fm_yaml import safe_load, yaml_error
+
+        try:
+            data = safe_load(raw.decode("utf-8"))
+        except yaml_error() as e:
+            raise ValueError(f"rules: {path}: {e}") from None
+    return parse_rules(data)
@@ -0,0 +1,191 @@
+from __future__ import annotations
+
+import io
+import json
+import os
+import socketserver
+import sys
+from dataclasses import replace
+from typing import IO, Any, Dict, List, Optional
+
+from backup_store import BackupStore
+from fm_yaml import yaml_error
+from fs import read_head
+from main import Options, process_one
+from vault_index import tag_state
+
+# Server mode keeps one warm process (YAML instances, compiled patterns,
+# imports) for editor plugins and scripts that would otherwise start Python
+# per note. The protocol is JSON lines, one request per line, one response
+# per request, over stdin/stdout or a Unix socket:
+#
+#   {"id": 1, "op": "add", "paths": ["a.md"], "tags": ["x"], "dry_run": false}
+#   {"id": 1, "ok": true, "results": [{"path": ..., "changed": true, ...}]}
+#
+# ops: add, remove, query, ping, shutdown. Relative paths are resolved
+# against the vault path. "path" may be given instead of "paths", "tag"
+# instead of "tags". dry_run, backup and order default to the options the
+# server was started with.
+
+OPS = ("add", "remove", "query", "ping", "shutdown")
+
+
+class RequestError(ValueError):
+    pass
+
+
+class _Shutdown(Exception):
+    pass
+
+
+def handle(opts: Options, request: Dict[str, Any]) -> Dict[str, Any]:
+    """Run one decoded request and return its response object."""
+    op = request.get("op")
+    if op not in OPS:
+        raise RequestError(f"op must be one of {', '.join(OPS)}")
+    if op == "ping":
+        return {"ok": True}
+    if op == "shutdown":
+        raise _Shutdown
+
+    paths = request.get("paths")
+    if paths is None:
+        paths = [request["path"]] if "path" in request else []
+    if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+        raise RequestError("paths must be a list of strings")
+    paths = [os.path.join(opts.path, p) for p in paths]
+
+    if op == "query":
+        results = []
+        for path in paths:
+            try:
+                tags = tag_state(read_head(path)[0])[0]
+            except (OSError, yaml_error()) as e:
+                results.append({"path": path, "error": str(e)})
+                continue
+            results.append({"path": path, "tags": list(tags)})
+        return {"ok": True, "results": results}
+
+    tags = request.get("tags")
+    if tags is None:
+        tags = [request["tag"]] if "tag" in request else []
+    if isinstance(tags, str):
+        tags = [tags]
+    if not tags or not all(isinstance(t, str) and t for t in tags):
+        raise RequestError("tags must be a non-empty list of strings")
+    run_opts = replace(
+        opts,
+        tags=tags,
+        mode=op,
+        rename=None,  # the request's op and tags replace the server's
+        rules=None,
+        dry_run=bool(request.get("dry_run", opts.dry_run)),
+        backup=bool(request.get("backup", opts.backup)),
+        order=request.get("order", opts.order),
+        index=False,
+        plan_file=None,
+    )
+    if run_opts.order not in ("preserve", "alpha"):
+        raise RequestError("order must be 'preserve' or 'alpha'")
+
+    run = None
+    if run_opts.backup and run_opts.backup_format == "store" and not run_opts.dry_run:
+        fsync = run_opts.durability != "none"
+        run = BackupStore(run_opts.backup_dir).begin_run(run_opts.path, fsync)
+    results: List[Dict[str, Any]] = []
+    try:
+        for path in paths:
+            try:
+                result = process_one(path, run_opts)
+            except (OSError, yaml_error()) as e:
+                results.append({"path": path, "error": str(e)})
+                continue
+            record: Dict[str, Any] = {"path": path, "changed": result.changed}
+            if result.changed:
+                record["tags_before"] = list(result.tags_before or ())
+                record["tags_after"] = list(result.tags_after or ())
+            if result.diff is not None:
+                record["diff"] = result.diff
+            if result.backup_path:
+                record["backup_path"] = result.backup_path
+            if result.backup_entry is not None:
+                run.add(result.backup_entry)
+            results.append(record)
+    finally:
+        if run is not None:
+            run.close()
+    response: Dict[str, Any] = {"ok": True, "results": results}
+    if run is not None and run.count:
+        response["backup_run"] = run.run_id
+    return response
+
+
+def serve_stream(opts: Options, rfile: IO, wfile: IO) -> bool:
+    """
+    Answer requests read from rfile until EOF. Returns False if a client
+    asked the server to shut down. Works on text or binary file objects.
+    """
+    for line in rfile:
+        if isinstance(line, bytes):
+            line = line.decode("utf-8")
+        if not line.strip():
+            continue
+        request_id = None
+        stop = False
+        try:
+            request = json.loads(line)
+            if not isinstance(request, dict):
+                raise RequestError("request must be a JSON object")
+            request_id = request.get("id")
+            response = handle(opts, request)
+        except _Shutdown:
+            response, stop = {"ok": True}, True
+        except (RequestError, ValueError, KeyError, TypeError) as e:
+            response = {"ok": False, "error": str(e) or type(e).__name__}
+        except Exception as e:
+            # One bad request must not take the warm server down
+            response = {"ok": False, "error": f"{type(e).__name__}: {e}"}
+        if request_id is not None:
+            response = {"id": request_id, **response}
+        out = json.dumps(response, ensure_ascii=False) + "\n"
+        wfile.write(out if isinstance(wfile, io.TextIOBase) else out.encode("utf-8"))
+        wfile.flush()
+        if stop:
+            return False
+    return True
+
+
+def serve_stdio(opts: Options) -> None:
+    serve_stream(opts, sys.stdin, sys.stdout)
+
+
+def serve_unix(opts: Options, socket_path: str) -> None:
+    """Serve connections on a Unix socket, one at a time, so two clients
+    never write the same note concurrently.
+    """
+
+    running = [True]
+
+    class Handler(socketserver.StreamRequestHandler):
+        def handle(self) -> None:
+            if not serve_stream(opts, self.rfile, self.wfile):
+                running[0] = False
+
+    if os.path.exists(socket_path):
+        os.unlink(socket_path)  # stale socket from a previous run
+    with socketserver.UnixStreamServer(socket_path, Handler) as server:
+        os.chmod(socket_path, 0o600)
+        try:
+            while running[0]:
+                server.handle_request()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            os.unlink(socket_path)
+
+
+def serve(opts: Options, socket_path: Optional[str] = None) -> None:
+    if socket_path:
+        serve_unix(opts, socket_path)
+    else:
+        serve_stdio(opts)
@@ -0,0 +1,176 @@
+from __future__ import annotations
+
+import functools
+import time
+from typing import Dict, Iterable, Iterator, List, Optional, Tuple
+
+# Timing and counter registry for --stats.
+#
+# Stage functions in fs, fm_patch, fm_yaml, tag_ops and main are wrapped with
+# @timed(stage). While disabled (the default) a wrapper costs one flag test.
+# Each process keeps its own registry; process_path drains it after every
+# file (in the worker, when running with --jobs) and merges the snapshots
+# into a StatsReport.
+
+_enabled = False
+_times: Dict[str, List[float]] = {}  # stage -> [seconds, calls]
+_counters: Dict[str, int] = {}
+
+
+def enable(on: bool = True) -> None:
+    global _enabled
+    _enabled = on
+
+
+def enabled() -> bool:
+    return _enabled
+
+
+def add_time(stage: str, seconds: float) -> None:
+    slot = _times.get(stage)
+    if slot is None:
+        _times[stage] = [seconds, 1]
+    else:
+        slot[0] += seconds
+        slot[1] += 1
+
+
+def count(name: str, n: int = 1) -> None:
+    if _enabled:
+        _counters[name] = _counters.get(name, 0) + n
+
+
+def timed(stage: str):
+    """Decorator: add the wall time of each call to 'stage' while enabled."""
+
+    def wrap(fn):
+        @functools.wraps(fn)
+        def wrapper(*args, **kwargs):
+            if not _enabled:
+                return fn(*args, **kwargs)
+            start = time.perf_counter()
+            try:
+                return fn(*args, **kwargs)
+            finally:
+                add_time(stage, time.perf_counter() - start)
+
+        return wrapper
+
+    return wrap
+
+
+def timed_iter(stage: str, it: Iterable) -> Iterator:
+    """Yield from it, adding the time spent producing each item to 'stage'."""
+    it = iter(it)
+    while True:
+        start = time.perf_counter()
+        try:
+            item = next(it)
+        except StopIteration:
+            add_time(stage, time.perf_counter() - start)
+            return
+        add_time(stage, time.perf_counter() - start)
+        yield item
+
+
+def drain() -> dict:
+    """Return and reset this process's timings and counters (picklable)."""
+    global _times, _counters
+    snapshot = {"times": _times, "counters": _counters}
+    _times, _counters = {}, {}
+    return snapshot
+
+
+class StatsReport:
+    """Aggregates drained snapshots and per-file latencies for one run."""
+
+    def __init__(self, slowest: int = 10):
+        self.slowest = slowest
+        self.times: Dict[str, List[float]] = {}
+        self.counters: Dict[str, int] = {}
+        self.latencies: List[Tuple[float, str]] = []
+
+    def merge(self, snapshot: Optional[dict]) -> None:
+        if not snapshot:
+            return
+        for stage, (seconds, calls) in snapshot["times"].items():
+            slot = self.times.setdefault(stage, [0.0, 0])
+            slot[0] += seconds
+            slot[1] += calls
+        for name, n in snapshot["counters"].items():
+            self.counters[name] = self.counters.get(name, 0) + n
+
+    def file(self, path: str, seconds: float) -> None:
+        self.latencies.append((seconds, path))
+
+    def format(self, wall: float) -> str:
+        lines = [f"Stats: {wall * 1000:.1f} ms wall"]
+        if self.times:
+            lines.append("Stage            total ms    calls   mean us")
+            for stage, (seconds, calls) in sorted(
+                self.times.items(), key=lambda kv: -kv[1][0]
+            ):
+                lines.append(
+                    f"  {stage:14s} {seconds * 1000:9.1f} {calls:8d} "
+                    f"{seconds / calls * 1e6:9.1f}"
+                )
+        if self.latencies:
+            ordered = sorted(s for s, _ in self.latencies)
+            lines.append(
+                f"Per-file latency: p50 {_pct(ordered, 50) * 1000:.3f} ms, "
+                f"p95 {_pct(ordered, 95) * 1000:.3f} ms, "
+                f"max {ordered[-1] * 1000:.3f} ms over {len(ordered)} file(s)"
+            )
+        for name, n in sorted(self.counters.items()):
+            lines.append(f"{name}: {n}")
+        if self.latencies and self.slowest:
+            lines.append(f"Slowest {min(self.slowest, len(self.latencies))} file(s):")
+            for seconds, path in sorted(self.latencies, reverse=True)[: self.slowest]:
+                lines.append(f"  {seconds * 1000:9.3f} ms  {path}")
+        return "\n".join(lines)
+
+
+def _pct(ordered: List[float], p: int) -> float:
+    # nearest-rank percentile
+    k = max(0, min(len(ordered) - 1, -(-p * len(ordered) // 100) - 1))
+    return ordered[k]
+
+
+def check_profiler(out_path: str) -> None:
+    """Raise RuntimeError if run_profiled could not profile to out_path, so
+    the CLI can say so before the run rather than after it."""
+    if out_path.endswith(".html"):
+        try:
+            import pyinstrument  # noqa: F401
+        except ImportError:
+            raise RuntimeError(
+                "profile: pyinstrument is not installed; "
+                "use a .prof path for cProfile"
+            ) from None
+
+
+def run_profiled(fn, out_path: str):
+    """
+    Call fn() under a profiler and save the profile to out_path: an HTML
+    report via pyinstrument (optional dependency) if out_path ends in .html,
+    else cProfile data for pstats/snakeviz. Only this process is profiled.
+    """
+    if out_path.endswith(".html"):
+        check_profiler(out_path)
+        from pyinstrument import Profiler
+
+        profiler = Profiler()
+        profiler.start()
+        try:
+            return fn()
+        finally:
+            profiler.stop()
+            with open(out_path, "w", encoding="utf-8") as f:
+                f.write(profiler.output_html())
+    import cProfile
+
+    profile = cProfile.Profile()
+    try:
+        return profile.runcall(fn)
+    finally:
+        profile.dump_stats(out_path)
@@ -1,11 +1,28 @@
 from __future__ import annotations
 
-from typing import Tuple
+from typing import (
+    TYPE_CHECKING,
+    Dict,
+    Iterable,
+    List,
+    Mapping,
+    Optional,
+    Sequence,
+    Tuple,
+)
 
-from ruamel.yaml.comments import CommentedMap, CommentedSeq
+from stats import timed
+
+if TYPE_CHECKING:
+    from ruamel.yaml.comments import CommentedMap
+
+# ruamel.yaml is only imported by the functions that edit a loaded mapping;
+# the read-only checks (clean_tags, would_apply_change) never need it.
 
 
 def _ensure_list(value):
+    from ruamel.yaml.comments import CommentedSeq
+
     if value is None:
         return CommentedSeq()
     if isinstance(value, CommentedSeq):
@@ -20,41 +37,157 @@ def _ensure_list(value):
     return seq
 
 
+def clean_tags(value) -> Tuple[List[str], bool]:
+    """
+    Return the 'tags' value as bare strings (no leading '#'), deduplicated in
+    original order, and whether that differs from the value as loaded.
+    """
+    cleaned = []
+    seen = set()
+    if value is None:
+        items = []
+    elif isinstance(value, (list, tuple, set)):
+        items = list(value)
+    else:
+        items = [value]
+    for t in items:
+        if t is None:
+            continue
+        s = str(t)
+        if s.startswith("#"):
+            s = s[1:]
+        if s not in seen:
+            cleaned.append(s)
+            seen.add(s)
+
+    # Detect changes: scalar->list, content change, or length change
+    if not isinstance(value, list):
+        changed = True
+    else:
+        changed = len(value) != len(cleaned) or any(
+            str(a) != b for a, b in zip(value, cleaned)
+        )
+    return cleaned, changed
+
+
+class _Node:
+    __slots__ = ("children", "exact", "subtree")
+
+    def __init__(self):
+        self.children: Dict[str, _Node] = {}
+        self.exact: Optional[str] = None  # new name for this tag
+        self.subtree: Optional[str] = None  # new prefix for this tag and below
+
+
+class TagRenamer:
+    """
+    Many tag renames, looked up in one walk of a prefix trie over the
+    '/'-separated parts of a tag. 'old' -> 'new' renames exactly old;
+    'old/*' -> 'new/*' renames old and every tag below it (old/x ->
+    new/x). The most specific rule wins, and each tag is renamed at most
+    once, so 'a' -> 'b' and 'b' -> 'c' do not chain.
+    """
+
+    def __init__(self, mapping: Mapping[str, str] = ()):
+        self._root = _Node()
+        self.count = 0
+        self.rules: Dict[str, str] = {}  # as given, e.g. 'proj/*' -> 'p/*'
+        for old, new in dict(mapping).items():
+            self.add(old, new)
+
+    def add(self, old: str, new: str) -> None:
+        old, new = str(old).strip().lstrip("#"), str(new).strip().lstrip("#")
+        subtree = old.endswith("/*")
+        if subtree != new.endswith("/*"):
+            raise ValueError(f"rename: {old!r} -> {new!r}: use '/*' on both sides")
+        if subtree:
+            old, new = old[:-2], new[:-2]
+        if not old or not new or "*" in old or "*" in new:
+            raise ValueError(f"rename: bad rule {old!r} -> {new!r}")
+        star = "/*" if subtree else ""
+        self.rules[old + star] = new + star
+        node = self._root
+        for part in old.split("/"):
+            node = node.children.setdefault(part, _Node())
+        if subtree:
+            node.subtree = new
+        else:
+            node.exact = new
+        self.count += 1
+
+    def rename(self, tag: str) -> str:
+        parts = tag.split("/")
+        node = self._root
+        best = None
+        for depth, part in enumerate(parts, 1):
+            node = node.children.get(part)
+            if node is None:
+                break
+            if node.subtree is not None:
+                best = node.subtree, depth
+        else:
+            if node.exact is not None:
+                return node.exact
+        if best is None:
+            return tag
+        prefix, depth = best
+        return "/".join([prefix, *parts[depth:]])
+
+    def apply(self, tags: Sequence[str]) -> Tuple[List[str], bool]:
+        """Rename cleaned tags in place in the list, dropping the duplicates
+        a merge creates. Returns (tags, changed)."""
+        out: List[str] = []
+        seen = set()
+        changed = False
+        for tag in tags:
+            new = self.rename(tag)
+            if new != tag:
+                changed = True
+            if new not in seen:
+                seen.add(new)
+                out.append(new)
+        return out, changed
+
+
 def normalize_tags(meta: CommentedMap) -> bool:
     """
     Ensure 'tags' is a CommentedSeq of bare strings (no leading '#'),
     deduplicated in original order. Return True if anything changed.
     """
+    from ruamel.yaml.comments import CommentedSeq
+
     changed = False
     if "tags" in meta:
-        original = meta["tags"]
-        seq = _ensure_list(original)
-
-        cleaned = []
-        seen = set()
-        for t in list(seq):
-            if t is None:
-                continue
-            s = str(t)
-            if s.startswith("#"):
-                s = s[1:]
-            if s not in seen:
-                cleaned.append(s)
-                seen.add(s)
-
-        # Detect changes: scalar->list, content change, or length change
-        if not isinstance(original, CommentedSeq):
-            changed = True
-        else:
-            if len(original) != len(cleaned) or any(
-                str(a) != b for a, b in zip(original, cleaned)
-            ):
-                changed = True
-
+        cleaned, changed = clean_tags(meta["tags"])
         meta["tags"] = CommentedSeq(cleaned)
     return changed
 
 
+def would_apply_change(
+    current: Sequence[str],
+    normalized: bool,
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+    rename: Optional[TagRenamer] = None,
+) -> bool:
+    """
+    Decide from a note's cleaned tags alone whether apply_tag_changes would
+    report a change. 'normalized' is False if normalize_tags would rewrite
+    the existing 'tags' value.
+    """
+    if rename is not None:
+        current, renamed = rename.apply(current)
+        if renamed:
+            return True
+    add = [t.lstrip("#") for t in add]
+    drop = {t.lstrip("#") for t in remove}
+    present = set(current)
+    if present & drop:
+        return True
+    present -= drop
+    return bool(add) and (not normalized or any(t not in present for t in add))
+
+
 def normalize_aliases(meta: CommentedMap):
     if "aliases" in meta:
         meta["aliases"] = _ensure_list(meta["aliases"])
@@ -66,6 +199,8 @@ def sort_everything(meta: CommentedMap, order: str):
         - sort the top-level keys alphabetically
     Otherwise, preserve order.
     """
+    from ruamel.yaml.comments import CommentedMap, CommentedSeq
+
     if order == "alpha":
         # sort lists
         for key in ("tags", "aliases"):
@@ -87,24 +222,62 @@ def sort_everything(meta: CommentedMap, order: str):
             meta.update(new_map)
 
 
-def add_tag(meta: CommentedMap, tag: str, order: str) -> Tuple[CommentedMap, bool]:
+@timed("mutate")
+def apply_tag_changes(
+    meta: CommentedMap,
+    add: Iterable[str] = (),
+    remove: Iterable[str] = (),
+    order: str = "preserve",
+    rename: Optional[TagRenamer] = None,
+) -> Tuple[CommentedMap, bool, bool]:
+    """Apply any number of tag renames, then removals, then additions, in
+    one pass: normalize once, test membership against a set and sort once.
+    Returns (meta, changed, frontmatter_empty_after). As with add_tag, a
+    normalization rewrite counts as a change only when something is added
+    or renamed.
+    """
+    from ruamel.yaml.comments import CommentedSeq
+
+    add = [t.lstrip("#") for t in add]
+    drop = {t.lstrip("#") for t in remove}
+
     normalize_aliases(meta)
     norm_changed = normalize_tags(meta)
-
-    if "tags" not in meta:
+    if add and "tags" not in meta:
         meta["tags"] = CommentedSeq()
         norm_changed = True  # we created the key
+    changed = bool(add) and norm_changed
 
-    tag = tag.lstrip("#")
-    tags = meta["tags"]
-
-    added = False
-    if not any(str(t) == tag for t in tags):
-        tags.append(tag)
-        added = True
+    if rename is not None and "tags" in meta:
+        renamed, hit = rename.apply(meta["tags"])
+        if hit:
+            changed = True
+            meta["tags"] = CommentedSeq(renamed)
+    if "tags" in meta:
+        tags = meta["tags"]
+        if drop:
+            kept = [t for t in tags if t not in drop]
+            if len(kept) != len(tags):
+                changed = True
+                tags = meta["tags"] = CommentedSeq(kept)
+        present = set(tags)
+        for tag in add:
+            if tag not in present:
+                tags.append(tag)
+                present.add(tag)
+                changed = True
+        if drop and not tags:
+            # remove 'tags' key entirely
+            del meta["tags"]
 
     sort_everything(meta, order)
-    changed = norm_changed or added
+    # Determine if FM is empty
+    empty = len(meta.keys()) == 0
+    return meta, changed, empty
+
+
+def add_tag(meta: CommentedMap, tag: str, order: str) -> Tuple[CommentedMap, bool]:
+    meta, changed, _ = apply_tag_changes(meta, add=[tag], order=order)
     return meta, changed
 
 
@@ -114,23 +287,4 @@ def remove_tag(
     """Remove tag from meta['tags'] if present.
     Returns (meta, changed, frontmatter_empty_after).
     """
-    normalize_aliases(meta)
-    normalize_tags(meta)
-
-    changed = False
-    tag = tag.lstrip("#")
-
-    if "tags" in meta:
-        seq = [t for t in meta["tags"] if str(t) != tag]
-        if len(seq) != len(meta["tags"]):
-            changed = True
-        if seq:
-            meta["tags"] = CommentedSeq(seq)
-        else:
-            # remove 'tags' key entirely
-            del meta["tags"]
-
-    sort_everything(meta, order)
-    # Determine if FM is empty
-    empty = len(meta.keys()) == 0
-    return meta, changed, empty
+    return apply_tag_changes(meta, remove=[tag], order=order)
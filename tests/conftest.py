@@ -42,3 +42,59 @@ def options(tmp_path):
         order="preserve",
         include_glob="*.md",
     )
+
+
+@pytest.fixture
+def make_options(tmp_path):
+    """Build main.Options for a vault (default: tmp_path): add tag 'new' to
+    every *.md note, no backups, backup_dir under tmp_path. Keyword
+    arguments override any field."""
+    from main import Options
+
+    def _make(vault=None, **kw):
+        base = dict(
+            path=str(tmp_path if vault is None else vault),
+            tag="new",
+            tags=None,
+            mode="add",
+            recursive=True,
+            dry_run=False,
+            backup=False,
+            order="preserve",
+            include_glob="*.md",
+            backup_dir=str(tmp_path / "Backups"),
+        )
+        base.update(kw)
+        return Options(**base)
+
+    return _make
+
+
+@pytest.fixture
+def run_cli(monkeypatch, tmp_path):
+    """Run main.main() with the given arguments over default settings, in
+    place of the user's config.py. Returns the exit code (0 if none)."""
+    import main
+
+    def _run(*argv):
+        settings = SimpleNamespace(
+            path=str(tmp_path),
+            tag=None,
+            tags=None,
+            mode="add",
+            recursive=True,
+            dry_run=False,
+            backup=False,
+            order="preserve",
+            include_glob="*.md",
+            backup_dir=str(tmp_path / "Backups"),
+        )
+        monkeypatch.setitem(sys.modules, "config", SimpleNamespace(settings=settings))
+        monkeypatch.setattr(sys, "argv", ["main.py", *argv])
+        try:
+            main.main()
+        except SystemExit as e:
+            return e.code
+        return 0
+
+    return _run
@@ -0,0 +1,78 @@
+import os
+
+from backup_store import BackupStore, RunEntry
+from main import process_path
+from plan import apply_plan
+
+STORE = dict(backup=True, backup_format="store")
+
+
+def test_store_deduplicates_and_undo_restores_a_run(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for name in ("a.md", "b.md"):
+        (vault / name).write_text("same body\n", encoding="utf-8")
+    (vault / "c.md").write_text("---\ntags: [x]\n---\nother\n", encoding="utf-8")
+
+    store = BackupStore(str(tmp_path / "Backups"))
+    process_path(make_options(vault, tag="t", **STORE))
+    first = store.runs()
+    assert len(first) == 1
+    blobs = [f for _, _, fs in os.walk(store.objects) for f in fs]
+    assert len(blobs) == 2  # a.md and b.md share one blob
+    assert not list((tmp_path / "Backups").rglob("*.bak"))
+
+    process_path(make_options(vault, **STORE, tag="u"))
+    second = store.runs()[-1]
+    (vault / "c.md").write_text("edited by hand\n", encoding="utf-8")
+
+    restored, refused = store.undo(second)
+    assert (restored, refused) == (2, 1)  # c.md changed since the run
+    restored_a = (vault / "a.md").read_text(encoding="utf-8")
+    assert restored_a == "---\ntags:\n  - t\n---\nsame body\n"
+
+    assert store.undo(first[0]) == (2, 1)
+    assert (vault / "a.md").read_text(encoding="utf-8") == "same body\n"
+    assert store.undo(second, force=True)[0] == 3
+
+
+def test_manifest_lines_are_on_disk_as_each_note_is_added(tmp_path):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("body\n", encoding="utf-8")
+    store = BackupStore(str(tmp_path / "Backups"))
+    run = store.begin_run(str(vault), fsync=True)
+    digest = store.put(str(vault / "a.md"))
+    st = os.stat(vault / "a.md")
+    run.add(RunEntry("a.md", digest, st.st_mtime_ns, st.st_size, st.st_mtime_ns))
+    # as a killed process would leave it: never closed
+    _, entries = store.read_run(run.run_id)
+    assert [e.path for e in entries] == ["a.md"]
+    run.close()
+
+
+def test_applied_plan_backs_up_to_the_store(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("body\n", encoding="utf-8")
+    plan_file = str(tmp_path / "changes.plan")
+    process_path(make_options(vault, **STORE, plan_file=plan_file))
+    backups = str(tmp_path / "Backups")
+    applied = apply_plan(plan_file, True, backups, backup_format="store")
+    assert applied == (1, 0)
+    assert not list((tmp_path / "Backups").rglob("*.bak"))
+    store = BackupStore(str(tmp_path / "Backups"))
+    assert store.undo(store.runs()[-1]) == (1, 0)
+    assert (vault / "a.md").read_text(encoding="utf-8") == "body\n"
+
+
+def test_cli_undo_rejects_unknown_runs(tmp_path, run_cli, capsys, make_options):
+    assert run_cli("--undo", "last") == 2
+    assert "no backup runs" in capsys.readouterr().err
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("body\n", encoding="utf-8")
+    process_path(make_options(vault, **STORE))
+    assert run_cli("--undo", "nope") == 2
+    assert "no run 'nope'" in capsys.readouterr().err
+    assert run_cli("--undo", "last") == 0
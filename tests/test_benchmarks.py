@@ -0,0 +1,45 @@
+import os
+import sys
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")
+)
+
+from bench_suite import compare, run_benchmark  # noqa: E402
+from vaultgen import VaultSpec, generate_vault  # noqa: E402
+
+
+def snapshot(root):
+    out = {}
+    for dirpath, _, names in os.walk(root):
+        for name in names:
+            path = os.path.join(dirpath, name)
+            with open(path, "rb") as f:
+                out[os.path.relpath(path, root)] = f.read()
+    return out
+
+
+def test_vault_generator_is_reproducible(tmp_path):
+    spec = VaultSpec(files=60, seed=7, depth=2, fanout=2)
+    generate_vault(str(tmp_path / "a"), spec)
+    generate_vault(str(tmp_path / "b"), spec)
+    a = snapshot(tmp_path / "a")
+    assert len(a) == 60 and a == snapshot(tmp_path / "b")
+    assert any(b"\r\n" in data for data in a.values())
+    assert any(data.startswith(b"\xef\xbb\xbf") for data in a.values())
+    assert any(b"---" not in data[:8] for data in a.values())
+    generate_vault(str(tmp_path / "c"), VaultSpec(files=60, seed=8, fanout=2))
+    assert snapshot(tmp_path / "c") != a
+
+
+def test_benchmark_runs_and_compares_against_a_baseline(tmp_path):
+    generate_vault(str(tmp_path / "v"), VaultSpec(files=20, seed=1))
+    res = run_benchmark("e2e_dry_run", str(tmp_path / "v"), 20, repeat=1)
+    assert res["files_per_sec"] > 0
+    baseline = {"results": {"e2e_dry_run": {"files_per_sec": 2 * res["files_per_sec"]}}}
+    lines, regressed = compare({"e2e_dry_run": res}, baseline, tolerance=0.1)
+    assert regressed and "REGRESSION" in lines[0]
+    assert compare({"e2e_dry_run": res}, {"results": {}}, 0.1) == (
+        ["e2e_dry_run          (no baseline)"],
+        False,
+    )
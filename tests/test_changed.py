@@ -0,0 +1,114 @@
+import shutil
+import subprocess
+import time
+
+import pytest
+
+import changed
+import main
+from changed import git_changed_paths, parse_time, read_marker, verify_rev
+from main import process_path
+
+
+def test_parse_time():
+    assert parse_time("1700000000") == 1700000000.0
+    assert parse_time("2025-06-01T08:00:00Z") == 1748764800.0
+    assert parse_time("2025-06-01T10:00:00+02:00") == 1748764800.0
+    with pytest.raises(ValueError, match="since:"):
+        parse_time("yesterday")
+
+
+def record_reads(monkeypatch):
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    return opened
+
+
+def test_since_time_skips_older_notes_unopened(tmp_path, monkeypatch, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "old.md").write_text("body\n")
+    time.sleep(0.05)
+    cutoff = time.time()
+    time.sleep(0.05)
+    (vault / "new.md").write_text("body\n")
+    opened = record_reads(monkeypatch)
+    assert process_path(make_options(vault, since=str(cutoff))) == 1
+    assert opened == [str(vault / "new.md")]
+    assert (vault / "old.md").read_text() == "body\n"
+
+
+def test_last_run_marker(tmp_path, monkeypatch, make_options):
+    monkeypatch.setattr(changed, "MARKER_SLACK", 0.0)
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [x]\n---\n")
+    (vault / "b.md").write_text("body\n")
+    time.sleep(0.05)
+
+    # no marker yet: the whole vault; dry runs do not record one
+    dry = make_options(vault, tag="x", since="last-run", dry_run=True)
+    assert process_path(dry) == 1
+    assert read_marker(str(vault)) is None
+    opts = make_options(vault, tag="x", since="last-run", index=True)
+    assert process_path(opts) == 1
+    assert read_marker(str(vault)) is not None
+
+    time.sleep(0.05)
+    (vault / "c.md").write_text("body\n")
+    opened = record_reads(monkeypatch)
+    assert process_path(opts) == 1
+    # b.md was written after the first run started, but the index proves
+    # it needs nothing, so only the new note is read
+    assert opened == [str(vault / "c.md")]
+
+
+def git(cwd, *args):
+    subprocess.run(
+        ["git", "-c", "user.name=t", "-c", "user.email=t@t", *args],
+        cwd=cwd,
+        check=True,
+        capture_output=True,
+    )
+
+
+@pytest.mark.skipif(shutil.which("git") is None, reason="needs git")
+def test_git_changed(tmp_path, monkeypatch, make_options):
+    repo = tmp_path / "repo"
+    vault = repo / "vault"
+    (vault / "sub").mkdir(parents=True)
+    (vault / ".obsidian").mkdir()
+    for name in ["a.md", "b.md", "sub/c.md", ".obsidian/o.md", "img.png"]:
+        (vault / name).write_text("body\n")
+    (repo / "outside.md").write_text("body\n")
+    git(repo, "init", "-q")
+    git(repo, "add", "-A")
+    git(repo, "commit", "-q", "-m", "init")
+
+    (vault / "a.md").write_text("edited\n")
+    (vault / "sub" / "c.md").write_text("edited\n")
+    (vault / ".obsidian" / "o.md").write_text("edited\n")
+    (vault / "img.png").write_text("edited\n")
+    (vault / "b.md").unlink()
+    (vault / "new.md").write_text("body\n")
+    (repo / "outside.md").write_text("edited\n")
+
+    opts = make_options(vault, git_changed="HEAD")
+    assert git_changed_paths(opts) == [
+        str(vault / "a.md"),
+        str(vault / "new.md"),
+        str(vault / "sub" / "c.md"),
+    ]
+    opts.recursive = False
+    assert git_changed_paths(opts) == [str(vault / "a.md"), str(vault / "new.md")]
+
+    opts.recursive = True
+    opened = record_reads(monkeypatch)
+    assert process_path(opts) == 3
+    assert opened == git_changed_paths(opts)
+
+    with pytest.raises(RuntimeError, match="git-changed:"):
+        verify_rev(str(vault), "no-such-rev")
+    with pytest.raises(RuntimeError, match="git-changed:"):
+        verify_rev(str(tmp_path), "HEAD")
@@ -0,0 +1,76 @@
+import pytest
+
+from fm_patch import patch_tags
+from fm_yaml import load_frontmatter
+from tag_ops import add_tag, remove_tag
+
+
+def roundtrip(yaml_text, tags, mode):
+    meta = load_frontmatter(yaml_text)
+    changed = False
+    for t in tags:
+        if mode == "add":
+            meta, c = add_tag(meta, t, "preserve")
+        else:
+            meta, c, _ = remove_tag(meta, t, "preserve")
+        changed = changed or c
+    return meta, changed
+
+
+def plain(meta):
+    return {k: list(v) if isinstance(v, list) else v for k, v in meta.items()}
+
+
+@pytest.mark.parametrize(
+    "yaml_text,tags,mode",
+    [
+        ("tags:\n  - a\n  - b\n", ["c"], "add"),
+        ("tags:\n- a\n- b\ntitle: x\n", ["a"], "remove"),
+        ("title: x\ntags: [a, '#b', b]\n", ["c"], "add"),
+        ("tags: alpha\n", ["alpha"], "add"),
+        ("tags:\n", ["x"], "add"),
+        ("aliases: [x]\ntitle: keep   spacing\n", ["new"], "add"),
+        ("tags: [a, b]\n", ["zzz"], "remove"),
+        ("tags:\n  - a\n\n# trailing\nother: 1\n", ["a"], "remove"),
+    ],
+)
+def test_patch_matches_roundtrip_semantics(yaml_text, tags, mode):
+    result = patch_tags(yaml_text, tags, mode)
+    assert result is not None
+    out, changed, _ = result
+    expected, expected_changed = roundtrip(yaml_text, tags, mode)
+    assert changed == expected_changed
+    assert plain(load_frontmatter(out)) == plain(expected)
+
+
+def test_patch_leaves_other_lines_untouched():
+    yaml_text = "title:   'Spaced'   # note\ntags:\n  - a\nlist: [1,2]\n"
+    out, changed, empty = patch_tags(yaml_text, ["b"], "add")
+    assert changed is True and empty is False
+    assert out == "title:   'Spaced'   # note\ntags:\n  - a\n  - b\nlist: [1,2]\n"
+
+
+def test_patch_keeps_flow_style_and_crlf():
+    out, changed, _ = patch_tags("tags: [a]\r\nx: 1", ["b"], "add", "\r\n")
+    assert out == "tags: [a, b]\r\nx: 1\r\n"
+
+
+def test_patch_reports_empty_when_last_key_removed():
+    out, changed, empty = patch_tags("# c\ntags: [a]\n", ["a"], "remove")
+    assert changed is True and empty is True
+
+
+@pytest.mark.parametrize(
+    "yaml_text,tag",
+    [
+        ("tags:\n  - a\n  # comment\n  - b\n", "c"),  # comment between items
+        ("tags: [a, [b]]\n", "c"),  # nested flow
+        ("tags:\n  - 2024\n", "c"),  # non-string item
+        ("tags: a\naliases: solo\n", "c"),  # scalar aliases get normalized
+        ("tags: [a]\n", "true"),  # new tag would need quoting
+        ("title: \"multi\nline\"\n", "c"),  # scalar continues at column 0
+        ("tags: [a]\ntags: [b]\n", "c"),  # duplicate key
+    ],
+)
+def test_patch_falls_back_on_unproven_shapes(yaml_text, tag):
+    assert patch_tags(yaml_text, [tag], "add") is None
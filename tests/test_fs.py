@@ -0,0 +1,136 @@
+import os
+
+from fs import (
+    iter_markdown_entries,
+    iter_markdown_files,
+    read_head,
+    write_head,
+    write_text,
+)
+
+
+def touch(root, rel):
+    p = root / rel
+    p.parent.mkdir(parents=True, exist_ok=True)
+    p.write_text("x\n", encoding="utf-8")
+    return str(p)
+
+
+def test_walker_prunes_default_and_extra_dirs(tmp_path):
+    keep = [touch(tmp_path, "a.md"), touch(tmp_path, "sub/b.md"), touch(tmp_path, "sub/z/c.md")]
+    touch(tmp_path, ".obsidian/x.md")
+    touch(tmp_path, ".git/y.md")
+    touch(tmp_path, "Backups/a.md.md")
+    touch(tmp_path, "Attachments/pic.md")
+    touch(tmp_path, "sub/img.png")
+
+    found = list(
+        iter_markdown_files(
+            str(tmp_path),
+            True,
+            "*.md",
+            exclude_dirs=[".*", "Attach*"],
+            exclude_paths=[str(tmp_path / "Backups")],
+        )
+    )
+    assert found == keep  # sorted, top-down
+
+
+def test_walker_multiple_globs_and_non_recursive(tmp_path):
+    touch(tmp_path, "a.md")
+    touch(tmp_path, "b.markdown")
+    touch(tmp_path, "draft-c.md")
+    touch(tmp_path, "sub/d.md")
+    os.makedirs(tmp_path / "dir.md")  # directories never match
+
+    entries = list(
+        iter_markdown_entries(
+            str(tmp_path), False, ["*.md", "*.markdown"], exclude_glob="draft-*"
+        )
+    )
+    assert [e.name for e in entries] == ["a.md", "b.markdown"]
+    assert entries[0].stat().st_size == 2
+
+
+def test_read_head_stops_after_first_body_line(tmp_path):
+    p = tmp_path / "n.md"
+    body_rest = b"rest\n" + b"\xff" * 1000  # never decoded
+    p.write_bytes(b"---\r\ntags: [a]\r\n---\r\n\r\nfirst\r\n" + body_rest)
+    head, offset = read_head(str(p))
+    assert head == "---\r\ntags: [a]\r\n---\r\n\r\nfirst\r\n"
+    assert p.read_bytes()[offset:] == body_rest
+
+
+def test_write_head_passes_body_bytes_through(tmp_path):
+    p = tmp_path / "n.md"
+    p.write_bytes(b"old head\nbody \xff\xfe bytes\n")
+    os.chmod(p, 0o640)
+    backup = write_head(
+        str(p),
+        "---\ntags:\n  - x\n---\n",
+        len(b"old head\n"),
+        True,
+        vault_root=str(tmp_path),
+        backup_root=str(tmp_path / "Backups"),
+    )
+    assert p.read_bytes() == b"---\ntags:\n  - x\n---\nbody \xff\xfe bytes\n"
+    assert os.stat(p).st_mode & 0o777 == 0o640
+    assert open(backup, "rb").read() == b"old head\nbody \xff\xfe bytes\n"
+    assert sorted(os.listdir(tmp_path)) == ["Backups", "n.md"]  # no temp left
+
+
+def test_atomic_write_leaves_original_intact_on_failure(tmp_path, monkeypatch):
+    import fs
+
+    p = tmp_path / "n.md"
+    p.write_bytes(b"original\n")
+
+    def boom(src, dst, offset):
+        dst.write(b"partial")
+        raise OSError("disk full")
+
+    monkeypatch.setattr(fs, "_copy_rest", boom)
+    try:
+        write_head(str(p), "new\n", 0, False)
+    except OSError:
+        pass
+    assert p.read_bytes() == b"original\n"
+    assert os.listdir(tmp_path) == ["n.md"]
+
+
+def test_durability_policies_fsync_where_asked(tmp_path, monkeypatch):
+    import fs
+
+    synced = []
+    real_fsync = os.fsync
+    monkeypatch.setattr(fs.os, "fsync", lambda fd: synced.append(fd) or real_fsync(fd))
+    p = tmp_path / "n.md"
+    p.write_bytes(b"x\n")
+
+    write_text(str(p), "a\n", False)
+    assert synced == []
+    write_text(str(p), "b\n", False, fsync=True)
+    assert len(synced) == 2  # file, then its directory
+    fs.sync_written([str(p)])
+    assert len(synced) == 4  # the file, then its one directory
+    assert p.read_bytes() == b"b\n"
+
+
+def test_writes_go_through_a_symlinked_note(tmp_path, make_options):
+    import pytest
+
+    from main import process_path
+
+    (tmp_path / "real").mkdir()
+    (tmp_path / "vault").mkdir()
+    target = tmp_path / "real" / "n.md"
+    target.write_text("---\ntags: [a]\n---\nbody\n", encoding="utf-8")
+    link = tmp_path / "vault" / "n.md"
+    try:
+        os.symlink(os.path.join("..", "real", "n.md"), link)
+    except (OSError, NotImplementedError):
+        pytest.skip("symlinks not available")
+    assert process_path(make_options(tmp_path / "vault")) == 1
+    assert os.path.islink(link)
+    assert target.read_text(encoding="utf-8") == "---\ntags: [a, new]\n---\nbody\n"
+    assert os.listdir(tmp_path / "real") == ["n.md"]
@@ -0,0 +1,120 @@
+import io
+import os
+import random
+import sys
+import time
+
+import pytest
+
+import query
+from inline_tags import find_inline_tags
+from main import process_path
+from query import run_query
+
+sys.path.insert(
+    0, os.path.join(os.path.dirname(os.path.abspath(__file__)), "..", "benchmarks")
+)
+
+from vaultgen import VaultSpec, note_text  # noqa: E402
+
+
+@pytest.mark.parametrize(
+    "body, expected",
+    [
+        ("#a text #b\n#c", ["a", "b", "c"]),
+        ("# Heading\n## Sub #x\n", ["x"]),
+        ("a#b \\#c https://e.com/#top [[Note#Part]] [l](u#f)", []),
+        ("#2024 #2024/q1 #a-b_c/d", ["2024/q1", "a-b_c/d"]),
+        ("#über, #tag. (#no)", ["über", "tag"]),
+        ("#a #b #a", ["a", "b"]),
+        ("```python\n#code\n```\n#after", ["after"]),
+        ("~~~~\n#c\n~~~\n#still\n~~~~\n#out", ["out"]),
+        ("   ```\n#c\n```\n#d", ["d"]),
+        ("```\nunclosed #x\n", []),
+        ("text `#code` #yes ``x ` #no`` #y2", ["yes", "y2"]),
+        ("stray ` tick\n\n#p", ["p"]),
+        ("<!-- #hidden -->\n#v %% #h %% #w", ["v", "w"]),
+        ("no tags here", []),
+    ],
+)
+def test_find_inline_tags(body, expected):
+    assert find_inline_tags(body) == expected
+
+
+def make_vault(tmp_path):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [a]\n---\nSee #b and `#code`, #a\n")
+    (vault / "b.md").write_text("plain #b\n\n```\n#x\n```\n")
+    return vault
+
+
+def test_queries_include_body_tags_and_cache_them(tmp_path, monkeypatch, make_options):
+    vault = make_vault(tmp_path)
+    out = io.StringIO()
+    run_query(make_options(vault), "tags", out=out)
+    assert out.getvalue() == "       1  a\n"
+
+    opts = make_options(vault, index=True)
+    out = io.StringIO()
+    assert run_query(opts, "count", "b", out=out, inline=True) == 2
+    assert run_query(opts, "count", "x or code", out=out, inline=True) == 0
+
+    # the index now holds the body tags too, so nothing is read again
+    read = []
+    real = query.read_text
+    monkeypatch.setattr(query, "read_text", lambda p: read.append(p) or real(p))
+    out = io.StringIO()
+    run_query(opts, "tags", out=out, inline=True)
+    assert out.getvalue() == "       2  b\n       1  a\n"
+    assert read == []
+
+
+def test_promote_copies_body_tags_into_frontmatter(tmp_path, make_options):
+    vault = make_vault(tmp_path)
+    assert process_path(make_options(vault, mode="promote")) == 2
+    assert (vault / "a.md").read_text() == (
+        "---\ntags: [a, b]\n---\nSee #b and `#code`, #a\n"
+    )
+    assert (vault / "b.md").read_text() == (
+        "---\ntags:\n  - b\n---\nplain #b\n\n```\n#x\n```\n"
+    )
+    assert process_path(make_options(vault, mode="promote")) == 0
+
+
+def test_tokenizer_throughput():
+    # 2 GB in well under a minute needs ~35 MB/s; a plain-Python character
+    # loop manages a few MB/s. TAG_MANAGER_INLINE_MIN_MBPS overrides.
+    floor = float(os.environ.get("TAG_MANAGER_INLINE_MIN_MBPS", "35"))
+    rng = random.Random(0)
+    bodies = [note_text(rng, VaultSpec()).decode("utf-8") for _ in range(500)]
+    size = sum(len(b.encode("utf-8")) for b in bodies)
+    best = float("inf")
+    for _ in range(3):
+        start = time.perf_counter()
+        for body in bodies:
+            find_inline_tags(body)
+        best = min(best, time.perf_counter() - start)
+    assert size / best / 1e6 >= floor
+
+
+def test_body_only_edit_drops_cached_body_tags(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    note = vault / "a.md"
+    note.write_text("---\ntags: [a]\n---\nfirst line\n#zzz\n")
+    opts = make_options(vault, index=True)
+    out = io.StringIO()
+    run_query(opts, "tags", out=out, inline=True)
+    assert "zzz" in out.getvalue()
+
+    # the head (frontmatter + first body line) and its hash stay the same
+    note.write_text("---\ntags: [a]\n---\nfirst line\n#newtag, longer\n")
+    assert process_path(make_options(vault, tag="a", index=True)) == 0
+
+    out = io.StringIO()
+    run_query(opts, "tags", out=out, inline=True)
+    assert out.getvalue() == "       1  a\n       1  newtag\n"
+    promote = make_options(vault, mode="promote", index=True)
+    assert process_path(promote) == 1
+    assert note.read_text().startswith("---\ntags: [a, newtag]\n---\n")
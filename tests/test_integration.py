@@ -167,3 +167,46 @@ body
     process_path(opts)
     out2 = p.read_text(encoding="utf-8")
     assert "tags:\n  - alpha\n  - beta\n" in out2
+
+
+def test_parallel_jobs_match_serial_output(tmp_path, capsys):
+    for i in range(12):
+        sub = tmp_path / f"d{i % 3}"
+        sub.mkdir(exist_ok=True)
+        (sub / f"n{i}.md").write_text(f"---\ntags: [t{i}]\n---\nbody {i}\n", encoding="utf-8")
+
+    opts = Options(
+        path=str(tmp_path),
+        tag="shared",
+        tags=None,
+        mode="add",
+        recursive=True,
+        dry_run=True,
+        backup=False,
+        order="preserve",
+        include_glob="*.md",
+        backup_dir=str(tmp_path / "Backups"),
+    )
+    assert process_path(opts) == 12
+    serial = capsys.readouterr().out
+
+    opts.jobs = 3
+    assert process_path(opts) == 12
+    assert capsys.readouterr().out == serial
+
+    opts.dry_run = False
+    assert process_path(opts) == 12
+    for p in tmp_path.rglob("*.md"):
+        assert ", shared]\n" in p.read_text(encoding="utf-8")
+
+
+def test_noop_files_skip_round_trip_loader(monkeypatch):
+    import main
+
+    def fail(_):
+        raise AssertionError("round-trip loader should not run")
+
+    monkeypatch.setattr(main, "load_frontmatter", fail)
+    text = "---\nz: 1\ntags:\n  - a\n  # keep\n  - b\n---\nbody\n"
+    assert process_file_text(text, "a", "add", "alpha") == text
+    assert process_file_text(text, "c", "remove", "preserve") == text
@@ -0,0 +1,58 @@
+from main import ChangeRecord, RunSummary, iter_changes
+
+
+def make_vault(tmp_path, n=5):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for i in range(n):
+        (vault / f"{i}.md").write_text("---\ntags: [x]\n---\nbody\n", encoding="utf-8")
+    (vault / "done.md").write_text("---\ntags: [new]\n---\n", encoding="utf-8")
+    return vault
+
+
+def test_iter_changes_yields_records_without_printing(tmp_path, capsys, make_options):
+    vault = make_vault(tmp_path)
+    summary = RunSummary()
+    records = list(iter_changes(make_options(vault), summary=summary))
+    assert capsys.readouterr().out == ""
+    assert [r.path for r in records] == [str(vault / f"{i}.md") for i in range(5)]
+    rec = records[0]
+    assert isinstance(rec, ChangeRecord) and not hasattr(rec, "__dict__")
+    assert rec.action == "modified" and rec.diff is None
+    assert rec.tags_before == ("x",) and rec.tags_after == ("x", "new")
+    assert rec.bytes_written == len("---\ntags: [x, new]\n---\nbody\n")
+    assert rec.elapsed > 0
+    assert (summary.total, summary.changed) == (6, 5)
+
+
+def test_stopping_early_leaves_the_rest_untouched(tmp_path, make_options):
+    vault = make_vault(tmp_path)
+    plan_file = tmp_path / "p.plan"
+    summary = RunSummary()
+    changes = iter_changes(
+        make_options(vault, plan_file=str(plan_file)), summary=summary
+    )
+    assert next(changes).action == "planned"
+    changes.close()
+    # the plan is closed with the one change seen so far
+    assert summary.plan_count == 1
+    assert len(plan_file.read_text(encoding="utf-8").splitlines()) == 2
+
+    for i, rec in enumerate(iter_changes(make_options(vault))):
+        if i == 1:
+            break
+    bodies = [(vault / f"{i}.md").read_text(encoding="utf-8") for i in range(5)]
+    assert [b.startswith("---\ntags: [x, new]") for b in bodies] == [
+        True,
+        True,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_parallel_records_arrive_in_walk_order(tmp_path, make_options):
+    vault = make_vault(tmp_path, n=40)
+    opts = make_options(vault, jobs=2, dry_run=True)
+    paths = [r.path for r in iter_changes(opts)]
+    assert paths == sorted(str(vault / f"{i}.md") for i in range(40))
@@ -0,0 +1,84 @@
+import pytest
+
+import main
+from journal import check_resume
+from main import RunSummary, iter_changes, process_path
+from tag_ops import TagRenamer
+
+
+def make_vault(tmp_path, n=6, text="body\n"):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for i in range(n):
+        (vault / f"n{i}.md").write_text(text)
+    return vault
+
+
+def record_reads(monkeypatch):
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    return opened
+
+
+def test_resume_skips_finished_notes(tmp_path, monkeypatch, make_options):
+    vault = make_vault(tmp_path)
+    opts = make_options(vault, backup=True)
+    for _ in zip(range(2), iter_changes(opts)):
+        pass  # interrupted after two notes
+    assert (vault / ".obsidian" / "tag_manager_journal.jsonl").exists()
+
+    opened = record_reads(monkeypatch)
+    summary = RunSummary()
+    opts = make_options(vault, backup=True, resume=True)
+    assert len(list(iter_changes(opts, summary=summary))) == 4
+    assert (summary.total, summary.resumed) == (6, 2)
+    assert sorted(opened) == [str(vault / f"n{i}.md") for i in range(2, 6)]
+    assert len(list((tmp_path / "Backups").rglob("*.bak"))) == 6  # one each
+    # complete: the journal, and the folder made for it, are gone
+    assert not (vault / ".obsidian").exists()
+
+
+@pytest.mark.parametrize("written", [True, False])
+def test_note_written_at_most_once(tmp_path, monkeypatch, written, make_options):
+    # 'a' -> 'b' and 'b' -> 'c' do not chain, but running twice would
+    vault = make_vault(tmp_path, n=3, text="---\ntags: [a]\n---\n")
+    rename = TagRenamer({"a": "b", "b": "c"})
+    opts = make_options(vault, mode="rename", rename=rename)
+    real = main.write_head
+    calls = []
+
+    def crash(path, *args, **kwargs):
+        # killed on the second note, after or before writing it; the
+        # journal's batched 'done' lines are lost with the process
+        calls.append(path)
+        if len(calls) == 2:
+            if written:
+                real(path, *args, **kwargs)
+            raise SystemExit
+        return real(path, *args, **kwargs)
+
+    monkeypatch.setattr(main, "write_head", crash)
+    monkeypatch.setattr("journal.BATCH", 10**6)
+    with pytest.raises(SystemExit):
+        process_path(opts)
+
+    opts = make_options(vault, mode="rename", rename=rename, resume=True)
+    process_path(opts)
+    for i in range(3):
+        assert (vault / f"n{i}.md").read_text() == "---\ntags: [b]\n---\n"
+
+
+def test_resume_refuses_a_journal_from_another_run(tmp_path, make_options):
+    vault = make_vault(tmp_path)
+    for _ in zip(range(1), iter_changes(make_options(vault))):
+        pass
+    check_resume(make_options(vault, resume=True))
+    other = make_options(vault, tag="y", resume=True)
+    with pytest.raises(ValueError, match="resume:"):
+        check_resume(other)
+    with pytest.raises(ValueError, match="resume:"):
+        process_path(other)
+    # without --resume the old journal is simply replaced
+    assert process_path(make_options(vault, tag="y")) == 6
+    assert not (vault / ".obsidian").exists()
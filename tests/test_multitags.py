@@ -60,3 +60,14 @@ def test_process_file_text_accepts_list_or_str():
     # single str still works
     out2 = process_file_text(original, "z", "add", "preserve")
     assert "tags:\n  - z\n" in out2
+
+
+def test_apply_text_changes_matches_round_trip_for_both_orders():
+    from main import apply_text_changes
+
+    text = "---\ntags:\n  - a\n  - b\n---\nBODY\n"
+    for order in ("preserve", "alpha"):
+        out = apply_text_changes(text, add=["c"], remove=["a"], order=order)
+        assert "tags:\n  - b\n  - c\n" in out
+        assert out.endswith("---\nBODY\n")
+    assert apply_text_changes(text, add=["a"], remove=["zzz"]) is text
@@ -0,0 +1,40 @@
+from main import process_path
+from plan import apply_plan, read_plan
+
+
+def test_plan_then_apply_refuses_files_changed_since_planning(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    a = vault / "a.md"
+    b = vault / "b.md"
+    a.write_text("---\ntags: [x]\n---\nA body\n" + "line\n" * 100, encoding="utf-8")
+    b.write_text("B body\n", encoding="utf-8")
+    plan_file = tmp_path / "changes.plan"
+
+    opts = make_options(vault, plan_file=str(plan_file))
+    assert process_path(opts) == 2
+    # planning never touches the vault
+    assert b.read_text(encoding="utf-8") == "B body\n"
+    root, entries = read_plan(str(plan_file))
+    assert root == str(vault)
+    assert [e.path for e in entries] == ["a.md", "b.md"]
+
+    b.write_text("B edited\n", encoding="utf-8")
+    applied, refused = apply_plan(str(plan_file))
+    assert (applied, refused) == (1, 1)
+    assert a.read_text(encoding="utf-8") == (
+        "---\ntags: [x, new]\n---\nA body\n" + "line\n" * 100
+    )
+    assert b.read_text(encoding="utf-8") == "B edited\n"
+
+    # Applying again is refused everywhere: a.md no longer matches its pre-image
+    assert apply_plan(str(plan_file)) == (0, 2)
+
+
+def test_cli_reports_a_missing_or_invalid_plan(tmp_path, run_cli, capsys):
+    assert run_cli("--apply-plan", str(tmp_path / "missing.plan")) == 2
+    assert "missing.plan" in capsys.readouterr().err
+    bogus = tmp_path / "notes.md"
+    bogus.write_text("not a plan\n", encoding="utf-8")
+    assert run_cli("--apply-plan", str(bogus)) == 2
+    assert "not a version" in capsys.readouterr().err
@@ -0,0 +1,125 @@
+import io
+import json
+
+import pytest
+
+import query
+from query import compile_query, run_query
+from vault_index import VaultIndex
+
+
+def make_vault(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / "sub").mkdir(parents=True)
+    notes = {
+        "a.md": "---\ntags: [project, todo]\n---\nbody\n",
+        "b.md": "---\ntags:\n  - '#project'\n  - area/home\n---\n",
+        "c.md": "---\ntags: todo\n---\n",
+        "d.md": "no frontmatter\n",
+        "sub/e.md": "---\ntags: [area/work, archive]\n---\n",
+    }
+    for name, text in notes.items():
+        (vault / name).write_text(text, encoding="utf-8")
+    return vault
+
+
+@pytest.mark.parametrize(
+    "expr, tags, expected",
+    [
+        ("a", {"a"}, True),
+        ("a b", {"a"}, False),
+        ("a and b", {"a", "b"}, True),
+        ("a or b", {"b"}, True),
+        ("a | b & c", {"a"}, True),
+        ("(a | b) & c", {"a"}, False),
+        ("not a", {"b"}, True),
+        ("!a !b", {"c"}, True),
+        ("#a", {"a"}, True),
+        ("area/*", {"area/home"}, True),
+        ("area/*", {"area"}, False),
+        ('"and"', {"and"}, True),
+        ("A AND NOT b", {"A"}, True),
+    ],
+)
+def test_compile_query(expr, tags, expected):
+    assert compile_query(expr)(frozenset(tags)) is expected
+
+
+@pytest.mark.parametrize("expr", ["", "a and", "(a", "a)", "not", "#", "a & | b"])
+def test_compile_query_rejects_bad_expressions(expr):
+    with pytest.raises(ValueError, match="query:"):
+        compile_query(expr)
+
+
+def test_list_and_count(tmp_path, make_options):
+    vault = make_vault(tmp_path)
+    opts = make_options(vault)
+    out = io.StringIO()
+    assert run_query(opts, "list", "project or area/*", out=out) == 3
+    assert out.getvalue().splitlines() == [
+        str(vault / "a.md"),
+        str(vault / "b.md"),
+        str(vault / "sub" / "e.md"),
+    ]
+
+    out = io.StringIO()
+    assert run_query(opts, "count", "todo !project", fmt="json", out=out) == 1
+    assert json.loads(out.getvalue()) == {"count": 1}
+
+    out = io.StringIO()
+    run_query(opts, "list", "archive", fmt="csv", out=out)
+    assert out.getvalue() == f"path,tags\n{vault / 'sub' / 'e.md'},area/work archive\n"
+
+
+def test_tag_inventory(tmp_path, make_options):
+    vault = make_vault(tmp_path)
+    opts = make_options(vault)
+    out = io.StringIO()
+    assert run_query(opts, "tags", out=out) == 5
+    assert out.getvalue().splitlines()[:2] == ["       2  project", "       2  todo"]
+
+    out = io.StringIO()
+    run_query(opts, "tags", "area/*", fmt="json", out=out)
+    rows = [json.loads(line) for line in out.getvalue().splitlines()]
+    assert rows == [
+        {"tag": "archive", "notes": 1},
+        {"tag": "area/home", "notes": 1},
+        {"tag": "area/work", "notes": 1},
+        {"tag": "project", "notes": 1},
+    ]
+
+
+def test_fresh_index_entries_are_not_reread(tmp_path, monkeypatch, make_options):
+    vault = make_vault(tmp_path)
+    opts = make_options(vault, index=True)
+    first = io.StringIO()
+    run_query(opts, "list", "todo", fmt="json", out=first)
+    assert VaultIndex.exists(str(vault))
+
+    (vault / "c.md").write_text("---\ntags: [todo, later]\n---\n", encoding="utf-8")
+    read = []
+    real = query.read_head
+    monkeypatch.setattr(query, "read_head", lambda p: read.append(p) or real(p))
+    # the index is picked up without --index once it exists
+    second = io.StringIO()
+    run_query(make_options(vault), "list", "todo", fmt="json", out=second)
+    assert read == [str(vault / "c.md")]
+    assert json.loads(second.getvalue().splitlines()[1])["tags"] == ["todo", "later"]
+
+
+def test_parallel_scan_keeps_walk_order(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for i in range(40):
+        (vault / f"{i:02d}.md").write_text(f"---\ntags: [t{i % 3}]\n---\n")
+    serial, parallel = io.StringIO(), io.StringIO()
+    run_query(make_options(vault), "list", "t0 or t1", out=serial)
+    run_query(make_options(vault, jobs=2), "list", "t0 or t1", out=parallel)
+    assert parallel.getvalue() == serial.getvalue()
+    assert len(serial.getvalue().splitlines()) == 27
+
+
+def test_cli_rejects_a_malformed_query(run_cli, capsys):
+    assert run_cli("--query", "a and") == 2
+    assert "query:" in capsys.readouterr().err
+    assert run_cli("--count", "a") == 0
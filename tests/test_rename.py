@@ -0,0 +1,113 @@
+import pytest
+
+import main
+from fm_patch import patch_tag_changes
+from fm_yaml import load_frontmatter, split_frontmatter
+from main import _read_renames, process_path
+from tag_ops import TagRenamer, apply_tag_changes
+
+RENAMER = TagRenamer(
+    {
+        "todo": "task",
+        "proj/*": "projects/*",
+        "proj/alpha": "alpha",
+        "a": "b",
+        "b": "c",
+    }
+)
+
+
+@pytest.mark.parametrize(
+    "tag, expected",
+    [
+        ("todo", "task"),
+        ("todo/urgent", "todo/urgent"),  # exact rules do not cover children
+        ("proj", "projects"),
+        ("proj/beta/x", "projects/beta/x"),
+        ("proj/alpha", "alpha"),  # the most specific rule wins
+        ("proj/alpha/x", "projects/alpha/x"),
+        ("projx", "projx"),
+        ("a", "b"),  # renames do not chain
+        ("other", "other"),
+    ],
+)
+def test_rename_lookup(tag, expected):
+    assert RENAMER.rename(tag) == expected
+
+
+def test_apply_keeps_position_and_merges():
+    assert RENAMER.apply(["x", "todo", "y", "task", "b"]) == (
+        ["x", "task", "y", "c"],
+        True,
+    )
+    assert RENAMER.apply(["x", "y"]) == (["x", "y"], False)
+
+
+@pytest.mark.parametrize("old, new", [("a/*", "b"), ("", "b"), ("a", " "), ("*", "*")])
+def test_bad_rules(old, new):
+    with pytest.raises(ValueError, match="rename:"):
+        TagRenamer({old: new})
+
+
+def plain(meta):
+    return {k: list(v) if isinstance(v, list) else v for k, v in meta.items()}
+
+
+@pytest.mark.parametrize(
+    "text",
+    [
+        "---\ntags: [x, '#todo', proj/a, task]\n---\nbody\n",
+        "---\ntitle: t\ntags:\n  - todo\n  - keep\n---\n",
+        "---\ntags: proj\n---\n",
+        "---\ntags: [x]\n---\n",
+        "no frontmatter\n",
+    ],
+)
+def test_text_path_matches_round_trip(text):
+    yaml_text, _, nl = split_frontmatter(text)
+    meta, changed, _ = apply_tag_changes(load_frontmatter(yaml_text), rename=RENAMER)
+    patched = patch_tag_changes(yaml_text, nl=nl, rename=RENAMER)
+    assert patched is not None
+    out, patched_changed, _ = patched
+    assert patched_changed == changed
+    assert plain(load_frontmatter(out)) == plain(meta)
+
+
+def test_one_pass_rename_with_index(tmp_path, monkeypatch, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [todo, proj/x]\n---\n")
+    (vault / "b.md").write_text("---\ntags: [other]\n---\n")
+    opts = make_options(vault, mode="rename", index=True, rename=RENAMER)
+    assert process_path(opts) == 1
+    assert (vault / "a.md").read_text() == "---\ntags: [task, projects/x]\n---\n"
+
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    assert process_path(opts) == 0
+    assert opened == []  # the index proves neither note needs a rename
+
+
+def test_read_renames(tmp_path):
+    path = tmp_path / "map.yaml"
+    path.write_text("# taxonomy\nold: new\nproj/*: projects/*\n")
+    assert _read_renames(["old=newer", "x = y"], str(path)) == {
+        "old": "newer",
+        "proj/*": "projects/*",
+        "x": "y",
+    }
+    with pytest.raises(ValueError):
+        _read_renames(["nothing"], None)
+
+
+def test_cli_reports_a_malformed_rename_file(tmp_path, run_cli, capsys):
+    path = tmp_path / "map.yaml"
+    path.write_text("old: [new\n")
+    assert run_cli("--rename-file", str(path)) == 2
+    assert "map.yaml" in capsys.readouterr().err
+
+
+def test_cli_rename_mode_needs_renames(run_cli, capsys):
+    assert run_cli("--mode", "rename") == 2
+    assert "--mode rename needs --rename" in capsys.readouterr().err
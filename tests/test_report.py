@@ -0,0 +1,47 @@
+import json
+
+from main import process_path
+
+
+def make_vault(tmp_path, make_options):
+    (tmp_path / "sub").mkdir()
+    (tmp_path / "a.md").write_text(
+        "---\ntags: [old]\n---\nfirst\n" + "long body line\n" * 50, encoding="utf-8"
+    )
+    (tmp_path / "sub" / "b.md").write_text("just body\n", encoding="utf-8")
+    return make_options(dry_run=True)
+
+
+def test_dry_run_diff_covers_frontmatter_only(tmp_path, capsys, make_options):
+    process_path(make_vault(tmp_path, make_options))
+    out = capsys.readouterr().out
+    assert "+tags: [old, new]" in out
+    assert "long body line" not in out
+    assert "@@ rest of body unchanged @@" in out
+
+
+def test_summary_report_counts_by_tag_and_directory(tmp_path, capsys, make_options):
+    opts = make_vault(tmp_path, make_options)
+    opts.report = "summary"
+    process_path(opts)
+    out = capsys.readouterr().out
+    assert "Would modify" not in out
+    assert "  +new: 2\n" in out
+    assert "  .: 1\n" in out and "  sub: 1\n" in out
+    assert "Processed 2 file(s). Changed 2" in out
+
+
+def test_json_report_streams_one_object_per_file(tmp_path, capsys, make_options):
+    opts = make_vault(tmp_path, make_options)
+    opts.report = "json"
+    opts.dry_run = False
+    process_path(opts)
+    lines = [json.loads(line) for line in capsys.readouterr().out.splitlines()]
+    assert [r.get("path") for r in lines[:2]] == [
+        str(tmp_path / "a.md"),
+        str(tmp_path / "sub" / "b.md"),
+    ]
+    assert lines[0]["action"] == "modified"
+    assert lines[0]["tags_before"] == ["old"]
+    assert lines[0]["added"] == ["new"] and lines[0]["removed"] == []
+    assert lines[-1] == {"processed": 2, "changed": 2}
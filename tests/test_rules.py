@@ -0,0 +1,124 @@
+import re
+
+import pytest
+
+import main
+from main import process_path
+from rules import Rule, RuleSet, glob_regex, load_rules, parse_rules
+
+
+@pytest.mark.parametrize(
+    "glob, path, expected",
+    [
+        ("Daily/*.md", "Daily/a.md", True),
+        ("Daily/*.md", "Daily/2025/a.md", False),
+        ("Daily/**", "Daily/2025/a.md", True),
+        ("Daily/", "Daily/2025/a.md", True),
+        ("**/draft.md", "draft.md", True),
+        ("**/draft.md", "a/b/draft.md", True),
+        ("*.excalidraw.md", "x/y.excalidraw.md", True),  # no '/': any folder
+        ("/top.md", "top.md", True),
+        ("/top.md", "a/top.md", False),
+        ("note_?.md", "note_1.md", True),
+        ("note_[!0-4].md", "note_7.md", True),
+        ("note_[!0-4].md", "note_3.md", False),
+        ("a+b.md", "a+b.md", True),
+    ],
+)
+def test_glob_regex(glob, path, expected):
+    assert bool(re.fullmatch(glob_regex(glob), path)) is expected
+
+
+def test_for_path_returns_every_matching_rule_in_order():
+    rules = RuleSet(
+        [
+            Rule(match=("Daily/**",), add=("daily",)),
+            Rule(add=("all",)),
+            Rule(match=("x/*", "*.md"), remove=("old",)),
+        ]
+    )
+    assert [r.add or r.remove for r in rules.for_path("Daily/a.md")] == [
+        ("daily",),
+        ("all",),
+        ("old",),
+    ]
+    assert rules.for_path("x/a.txt") == [rules.rules[1], rules.rules[2]]
+    assert rules.changes("Daily/a.md") == (["daily", "all"], ["old"])
+
+
+@pytest.mark.parametrize(
+    "data, message",
+    [
+        ({"rules": {"add": "x"}}, "expected a list"),
+        ([["x"]], "rule 1 is not a mapping"),
+        ([{"add": "x", "tags": "y"}], "unknown key 'tags'"),
+        ([{"match": "a/*"}], "neither adds nor removes"),
+        ([{"add": {"x": 1}}], "rule 1: add must be"),
+        ([{"add": "x"}, {"add": "y", "where": "=z"}], "rule 2: where:"),
+    ],
+)
+def test_parse_rules_errors(data, message):
+    with pytest.raises(ValueError, match=message):
+        parse_rules(data)
+
+
+def test_yaml_and_toml_files(tmp_path):
+    yaml_file = tmp_path / "rules.yaml"
+    yaml_file.write_text("rules:\n  - match: 'Daily/**'\n    add: ['#daily']\n")
+    toml_file = tmp_path / "rules.toml"
+    toml_file.write_text('[[rules]]\nmatch = "Daily/**"\nadd = ["daily"]\n')
+    assert load_rules(str(yaml_file)).rules == load_rules(str(toml_file)).rules
+
+
+def test_all_rules_applied_in_one_read_per_note(tmp_path, monkeypatch, make_options):
+    vault = tmp_path / "vault"
+    (vault / "Meetings" / "2025").mkdir(parents=True)
+    (vault / "Other").mkdir()
+    (vault / "Daily").mkdir()
+    (vault / "Daily" / "d.md").write_text("body\n")
+    (vault / "Meetings" / "2025" / "m.md").write_text(
+        "---\ntype: meeting\ntags: [inbox, x]\n---\n"
+    )
+    (vault / "Meetings" / "n.md").write_text("---\ntype: note\n---\n")
+    (vault / "Other" / "o.md").write_text("body\n")
+    rules = parse_rules(
+        [
+            {"match": "Meetings/**", "where": "type=meeting", "add": "meeting"},
+            {"match": "Meetings/**", "remove": "inbox"},
+            {"match": "**/2025/*", "add": ["y2025", "meeting"]},
+            {"match": "Meetings/**", "where": "type=note", "add": "note"},
+            {"match": "Daily/*", "add": "daily"},
+        ]
+    )
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    assert process_path(make_options(vault, rules=rules)) == 3
+    assert (vault / "Meetings" / "2025" / "m.md").read_text() == (
+        "---\ntype: meeting\ntags: [x, meeting, y2025]\n---\n"
+    )
+    assert (vault / "Meetings" / "n.md").read_text() == (
+        "---\ntype: note\ntags:\n  - note\n---\n"
+    )
+    # one read per covered note; Other/o.md matches no rule and is never opened
+    meetings = [
+        str(vault / "Meetings" / "2025" / "m.md"),
+        str(vault / "Meetings" / "n.md"),
+    ]
+    assert sorted(opened) == sorted(meetings + [str(vault / "Daily" / "d.md")])
+
+    # With the index, a note is skipped unopened when even the union of the
+    # rules that could apply changes nothing. Conditions on 'type' need the
+    # note itself, so the meeting notes are still read.
+    opts = make_options(vault, rules=rules, index=True)
+    process_path(opts)
+    opened.clear()
+    assert process_path(opts) == 0
+    assert sorted(opened) == sorted(meetings)
+
+
+def test_cli_reports_a_malformed_rules_file(tmp_path, run_cli, capsys):
+    path = tmp_path / "rules.yaml"
+    path.write_text("rules:\n  - match: [a\n")
+    assert run_cli("--rules", str(path)) == 2
+    assert "rules: " in capsys.readouterr().err
@@ -0,0 +1,109 @@
+import io
+import json
+import socket
+import threading
+import time
+
+import pytest
+
+from server import serve_stream, serve_unix
+
+
+def run_lines(opts, *requests):
+    rfile = io.StringIO("".join(json.dumps(r) + "\n" for r in requests))
+    wfile = io.StringIO()
+    serve_stream(opts, rfile, wfile)
+    return [json.loads(line) for line in wfile.getvalue().splitlines()]
+
+
+def test_stream_protocol_add_query_and_errors(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    note = vault / "a.md"
+    note.write_text("---\ntags: [x]\n---\nbody\n", encoding="utf-8")
+
+    responses = run_lines(
+        make_options(vault),
+        {"id": 1, "op": "add", "paths": ["a.md"], "tags": ["new"], "dry_run": True},
+        {"id": 2, "op": "add", "path": "a.md", "tag": "new"},
+        {"id": 3, "op": "add", "path": "a.md", "tag": "new"},
+        {"id": 4, "op": "query", "paths": ["a.md", "missing.md"]},
+        {"id": 5, "op": "rename"},
+        {"id": 6, "op": "remove", "path": "a.md"},
+    )
+    assert [r["id"] for r in responses] == [1, 2, 3, 4, 5, 6]
+    assert "+tags: [x, new]" in responses[0]["results"][0]["diff"]
+    assert responses[1]["results"][0]["tags_after"] == ["x", "new"]
+    assert responses[2]["results"][0]["changed"] is False
+    assert responses[3]["results"][0]["tags"] == ["x", "new"]
+    assert "error" in responses[3]["results"][1]
+    assert responses[4]["ok"] is False and responses[5]["ok"] is False
+    assert note.read_text(encoding="utf-8") == "---\ntags: [x, new]\n---\nbody\n"
+
+
+@pytest.mark.skipif(not hasattr(socket, "AF_UNIX"), reason="needs Unix sockets")
+def test_unix_socket_serves_until_shutdown(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("body\n", encoding="utf-8")
+    sock_path = str(tmp_path / "tm.sock")
+    server = threading.Thread(
+        target=serve_unix, args=(make_options(vault), sock_path)
+    )
+    server.start()
+
+    def call(*requests):
+        deadline = time.monotonic() + 5
+        while True:
+            try:
+                client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+                client.connect(sock_path)
+                break
+            except OSError:
+                client.close()
+                if time.monotonic() > deadline:
+                    raise
+                time.sleep(0.01)
+        with client, client.makefile("rwb") as f:
+            for r in requests:
+                f.write(json.dumps(r).encode() + b"\n")
+            f.flush()
+            client.shutdown(socket.SHUT_WR)
+            return [json.loads(line) for line in f]
+
+    assert call({"op": "ping"}) == [{"ok": True}]
+    out = call({"op": "add", "path": "a.md", "tag": "t"}, {"op": "shutdown"})
+    assert out[0]["results"][0]["changed"] is True
+    server.join(5)
+    assert not server.is_alive()
+    assert (vault / "a.md").read_text(encoding="utf-8").startswith("---\ntags:")
+
+
+def test_malformed_frontmatter_does_not_stop_the_server(tmp_path, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "bad.md").write_text("---\ntags: [a\nx: {\n---\nbody\n")
+    (vault / "ok.md").write_text("body\n")
+    responses = run_lines(
+        make_options(vault),
+        {"id": 1, "op": "add", "paths": ["bad.md", "ok.md"], "tag": "t"},
+        {"id": 2, "op": "query", "path": "bad.md"},
+        {"id": 3, "op": "ping"},
+    )
+    assert [r["id"] for r in responses] == [1, 2, 3]
+    bad, ok = responses[0]["results"]
+    assert "error" in bad and ok["changed"] is True
+    assert "error" in responses[1]["results"][0]
+    assert responses[2]["ok"] is True
+
+
+def test_requests_ignore_the_servers_rules(tmp_path, make_options):
+    from rules import parse_rules
+
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [a]\n---\n")
+    opts = make_options(vault)
+    opts.rules = parse_rules([{"add": "nightly"}])
+    (response,) = run_lines(opts, {"op": "remove", "path": "a.md", "tag": "a"})
+    assert response["results"][0]["tags_after"] == []
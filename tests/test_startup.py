@@ -0,0 +1,84 @@
+import os
+import subprocess
+import sys
+import textwrap
+
+ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), ".."))
+
+# Cumulative import time of main.py, as reported by `python -X importtime`.
+# Generous enough for slow CI machines; override with the environment
+# variable when profiling locally.
+BUDGET_MS = float(os.environ.get("TAG_MANAGER_IMPORT_BUDGET_MS", "100"))
+
+HEAVY = ("ruamel.yaml", "difflib", "sqlite3", "concurrent.futures", "config")
+
+
+def run_python(*args, cwd=ROOT):
+    env = dict(os.environ, PYTHONPATH=ROOT)
+    env.pop("PYTHONDONTWRITEBYTECODE", None)
+    return subprocess.run(
+        [sys.executable, *args], cwd=cwd, env=env, capture_output=True, text=True
+    )
+
+
+def imported_modules(importtime_output):
+    # lines look like "import time:   self |   cumulative | <indent>name"
+    mods = {}
+    for line in importtime_output.splitlines():
+        if not line.startswith("import time:") or "cumulative" in line:
+            continue
+        _, cumulative, name = line[len("import time:") :].split("|")
+        mods[name.strip()] = int(cumulative)
+    return mods
+
+
+def test_help_stays_within_import_budget():
+    run_python("-c", "import main")  # make sure bytecode is cached
+    script = textwrap.dedent(
+        """
+        import sys
+        import main
+
+        sys.argv = ["main.py", "--help"]
+        try:
+            main.main()
+        except SystemExit:
+            pass
+        """
+    )
+    proc = run_python("-X", "importtime", "-c", script)
+    assert proc.returncode == 0, proc.stderr
+    mods = imported_modules(proc.stderr)
+    assert not [m for m in HEAVY if m in mods]
+    main_ms = mods["main"] / 1000
+    assert main_ms < BUDGET_MS, f"importing main took {main_ms:.1f} ms"
+
+
+def test_cheap_runs_never_load_the_yaml_parser(tmp_path):
+    (tmp_path / "empty").mkdir()
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [x]\n---\nbody\n", encoding="utf-8")
+    script = textwrap.dedent(
+        f"""
+        import sys
+        from main import Options, process_path
+
+        def opts(path, **kw):
+            return Options(path=path, tag="new", tags=None, mode="add",
+                           recursive=True, dry_run=False, backup=False,
+                           order="preserve", include_glob="*.md",
+                           backup_dir="", **kw)
+
+        process_path(opts({str(tmp_path / "empty")!r}))
+        process_path(opts({str(vault)!r}, index=True))  # fast-path write
+        process_path(opts({str(vault)!r}, index=True))  # index hit
+        print(sorted(m for m in sys.modules if m.startswith("ruamel")))
+        """
+    )
+    proc = run_python("-c", script)
+    assert proc.returncode == 0, proc.stderr
+    assert proc.stdout.splitlines()[-1] == "[]"
+    assert (vault / "a.md").read_text(encoding="utf-8").startswith(
+        "---\ntags: [x, new]\n"
+    )
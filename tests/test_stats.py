@@ -0,0 +1,65 @@
+import pstats
+
+import stats
+from main import process_path
+
+
+def make_vault(tmp_path):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("---\ntags: [x]\n---\nbody\n", encoding="utf-8")
+    (vault / "b.md").write_text("---\ntags: [new]\n---\nbody\n", encoding="utf-8")
+    (vault / "c.md").write_text("---\ntags: &t [x]\n---\n", encoding="utf-8")
+    return vault
+
+
+def test_stats_report_stages_latency_and_bytes(tmp_path, capsys, make_options):
+    vault = make_vault(tmp_path)
+    assert process_path(make_options(vault, stats=True)) == 2
+    err = capsys.readouterr().err
+    stages = {
+        line.split()[0]: int(line.split()[2])
+        for line in err.splitlines()
+        if line.startswith("  ") and len(line.split()) == 4
+    }
+    assert stages["read"] == 3 and stages["write"] == 2
+    assert stages["patch"] == 3  # anchors fall back to ruamel
+    assert stages["yaml_load"] == 1 and stages["yaml_dump"] == 1
+    assert "walk" in stages and "mutate" in stages
+    assert "Per-file latency: p50" in err and "over 3 file(s)" in err
+    written = sum(len(p.read_bytes()) for p in vault.iterdir() if p.name != "b.md")
+    assert f"bytes_written: {written}\n" in err
+    assert "Slowest 3 file(s):" in err
+    # the registry is switched off again after the run
+    assert not stats.enabled()
+
+
+def test_stats_are_collected_from_worker_processes(tmp_path, capsys, make_options):
+    vault = make_vault(tmp_path)
+    process_path(make_options(vault, stats=True, jobs=2, dry_run=True))
+    err = capsys.readouterr().err
+    assert "  diff " in err and "over 3 file(s)" in err
+
+
+def test_percentile_is_nearest_rank():
+    ordered = [float(i) for i in range(1, 21)]
+    assert stats._pct(ordered, 50) == 10.0
+    assert stats._pct(ordered, 95) == 19.0
+    assert stats._pct([3.0], 95) == 3.0
+
+
+def test_run_profiled_writes_cprofile_data(tmp_path):
+    out = tmp_path / "run.prof"
+    assert stats.run_profiled(lambda: sum(range(10)), str(out)) == 45
+    assert pstats.Stats(str(out)).total_calls > 0
+
+
+def test_cli_html_profile_needs_pyinstrument(tmp_path, run_cli, capsys, monkeypatch):
+    import sys
+
+    monkeypatch.setitem(sys.modules, "pyinstrument", None)  # not installed
+    note = tmp_path / "a.md"
+    note.write_text("body\n", encoding="utf-8")
+    assert run_cli("--tag", "new", "--profile", str(tmp_path / "run.html")) == 2
+    assert "pyinstrument is not installed" in capsys.readouterr().err
+    assert note.read_text(encoding="utf-8") == "body\n"  # checked before the run
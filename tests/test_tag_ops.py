@@ -83,3 +83,63 @@ def test_remove_nonexistent_tag_no_change():
     meta, changed, empty = remove_tag(meta, "zzz", "preserve")
     assert changed is False
     assert empty is False
+
+
+# ---------- No-op detection
+
+
+def test_detect_tags_matches_normalize_tags():
+    from fm_yaml import detect_tags
+
+    # scanner-friendly and scanner-hostile (comment inside list) shapes
+    assert detect_tags("tags: [a, '#b']\n") == (["a", "b"], False)
+    assert detect_tags("tags:\n  - a\n  # c\n  - b\n") == (["a", "b"], True)
+    assert detect_tags(None) == ([], True)
+    assert detect_tags("tags: [2024-01-01]\nx: [[1]]\n") is None
+
+
+def test_would_apply_change_mirrors_add_and_remove():
+    from tag_ops import would_apply_change
+
+    assert would_apply_change(["a"], True, add=["#a"]) is False
+    assert would_apply_change(["a"], False, add=["a"]) is True
+    assert would_apply_change(["a"], True, remove=["b"]) is False
+    assert would_apply_change(["a", "b"], True, remove=["b"]) is True
+
+
+def test_yaml_instances_are_reused_per_thread():
+    import threading
+
+    import fm_yaml
+
+    assert fm_yaml._yaml_loader() is fm_yaml._yaml_loader()
+    assert fm_yaml._yaml_loader() is not fm_yaml._yaml_dumper()
+    other = []
+    t = threading.Thread(target=lambda: other.append(fm_yaml._yaml_loader()))
+    t.start()
+    t.join()
+    assert other[0] is not fm_yaml._yaml_loader()
+
+
+# ---------- Batch changes
+
+
+def test_apply_tag_changes_removes_then_adds_in_one_pass():
+    from tag_ops import apply_tag_changes
+
+    meta, body, nl = fm("zzz: 1\ntags: [old1, '#keep', old2]\naliases: [b, a]\n")
+    meta, changed, empty = apply_tag_changes(
+        meta, add=["new1", "#keep", "new1"], remove={"old1", "old2"}, order="alpha"
+    )
+    assert changed is True and empty is False
+    out = full(meta, body, nl)
+    assert "tags:\n  - keep\n  - new1\n" in out
+    assert out.index("aliases:") < out.index("tags:") < out.index("zzz:")
+
+
+def test_apply_tag_changes_empties_frontmatter():
+    from tag_ops import apply_tag_changes
+
+    meta, _, _ = fm("tags: [a, b]\n")
+    meta, changed, empty = apply_tag_changes(meta, remove=["a", "b"])
+    assert changed is True and empty is True
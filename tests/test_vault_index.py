@@ -0,0 +1,45 @@
+import os
+
+import main
+from main import process_path
+from vault_index import INDEX_DIR, INDEX_NAME, VaultIndex, tag_state
+
+
+def test_tag_state_reports_normalization():
+    assert tag_state("---\ntags: [a, b]\n---\nB\n") == (("a", "b"), True)
+    assert tag_state("---\ntags: '#a'\n---\nB\n") == (("a",), False)
+    assert tag_state("no frontmatter\n") == ((), True)
+
+
+def test_index_skips_unchanged_files_without_reading(
+    tmp_path, monkeypatch, make_options
+):
+    (tmp_path / "a.md").write_text("---\ntags: [alpha]\n---\nA\n", encoding="utf-8")
+    (tmp_path / "b.md").write_text("B\n", encoding="utf-8")
+
+    assert process_path(make_options(tag="alpha", index=True)) == 1
+    assert os.path.exists(tmp_path / INDEX_DIR / INDEX_NAME)
+
+    reads = []
+    real_read = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: reads.append(p) or real_read(p))
+    assert process_path(make_options(tag="alpha", index=True)) == 0
+    assert reads == []
+
+    # Editing a file invalidates its entry
+    (tmp_path / "a.md").write_text("---\ntags: [beta]\n---\nA2\n", encoding="utf-8")
+    assert process_path(make_options(tag="alpha", index=True)) == 1
+    assert reads == [str(tmp_path / "a.md")]
+    assert "alpha" in (tmp_path / "a.md").read_text(encoding="utf-8")
+
+
+def test_rebuild_index_discards_entries(tmp_path, make_options):
+    (tmp_path / "a.md").write_text("A\n", encoding="utf-8")
+    process_path(make_options(tag="alpha", index=True, dry_run=True))
+    index = VaultIndex.open(str(tmp_path))
+    assert index.get(str(tmp_path / "a.md")) is not None
+    index.close()
+
+    index = VaultIndex.open(str(tmp_path), rebuild=True)
+    assert index.get(str(tmp_path / "a.md")) is None
+    index.close()
@@ -0,0 +1,171 @@
+import sys
+import threading
+import time
+
+import pytest
+
+from watch import watch
+
+
+def wait_for(predicate, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while time.monotonic() < deadline:
+        if predicate():
+            return True
+        time.sleep(0.02)
+    return False
+
+
+backends = ["poll"]
+if sys.platform.startswith("linux"):
+    backends.append("inotify")
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_watch_tags_notes_as_they_arrive(tmp_path, capsys, backend, make_options):
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    existing = vault / "old.md"
+    existing.write_text("old body\n", encoding="utf-8")
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=watch,
+        args=(make_options(vault),),
+        kwargs=dict(debounce=0.05, backend=backend, interval=0.1, stop=stop),
+    )
+    worker.start()
+    try:
+        tagged = "---\ntags:\n  - new\n---\n"
+        assert wait_for(lambda: existing.read_text(encoding="utf-8").startswith(tagged))
+
+        (vault / "sub").mkdir()
+        dropped = vault / "sub" / "dropped.md"
+        dropped.write_text("fresh body\n", encoding="utf-8")
+        (vault / "ignored.txt").write_text("not a note\n", encoding="utf-8")
+        assert wait_for(
+            lambda: dropped.read_text(encoding="utf-8") == tagged + "fresh body\n"
+        )
+    finally:
+        stop.set()
+        worker.join(5)
+    assert not worker.is_alive()
+    assert (vault / "ignored.txt").read_text(encoding="utf-8") == "not a note\n"
+    out = capsys.readouterr().out
+    # each note is modified once; the watcher's own writes are not re-processed
+    assert out.count(f"Modified: {existing}") == 1
+    assert out.count(f"Modified: {dropped}") == 1
+
+
+@pytest.mark.parametrize("backend", backends)
+def test_watch_survives_bad_notes_and_skips_its_own_writes(
+    tmp_path, capsys, monkeypatch, backend, make_options
+):
+    import main
+
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    good = vault / "good.md"
+    good.write_text("body\n", encoding="utf-8")
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=watch,
+        args=(make_options(vault),),
+        kwargs=dict(debounce=0.05, backend=backend, interval=0.1, stop=stop),
+    )
+    worker.start()
+    try:
+        assert wait_for(lambda: good.read_text(encoding="utf-8").startswith("---"))
+        time.sleep(0.3)
+        # the sweep's own write of good.md did not bring it back
+        assert opened == [str(good)]
+
+        bad = vault / "bad.md"
+        later = vault / "later.md"
+        bad.write_text("---\ntags: [a\nx: {\n---\n", encoding="utf-8")
+        later.write_text("body\n", encoding="utf-8")
+        assert wait_for(lambda: later.read_text(encoding="utf-8").startswith("---"))
+        assert wait_for(lambda: "bad.md: " in capsys.readouterr().err)
+        more = vault / "more.md"
+        more.write_text("body\n", encoding="utf-8")
+        assert wait_for(lambda: more.read_text(encoding="utf-8").startswith("---"))
+    finally:
+        stop.set()
+        worker.join(5)
+    assert not worker.is_alive()
+
+
+def test_watch_rebuilds_the_index_once(tmp_path, make_options):
+    import sqlite3
+
+    from main import process_path
+    from vault_index import INDEX_DIR, INDEX_NAME
+
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    for name in ("a.md", "b.md", "c.md"):
+        (vault / name).write_text("body\n", encoding="utf-8")
+    process_path(make_options(vault, index=True))
+
+    def rows():
+        db = sqlite3.connect(str(vault / INDEX_DIR / INDEX_NAME))
+        try:
+            return db.execute("SELECT count(*) FROM files").fetchone()[0]
+        finally:
+            db.close()
+
+    opts = make_options(vault, rebuild_index=True)
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=watch,
+        args=(opts,),
+        kwargs=dict(debounce=0.05, backend="poll", interval=0.1, stop=stop),
+    )
+    worker.start()
+    try:
+        swept = [vault / name for name in ("a.md", "b.md", "c.md")]
+        assert wait_for(
+            lambda: all(p.read_text(encoding="utf-8").startswith("---") for p in swept)
+        )
+        time.sleep(0.3)
+        note = vault / "d.md"
+        note.write_text("body\n", encoding="utf-8")
+        assert wait_for(lambda: note.read_text(encoding="utf-8").startswith("---"))
+    finally:
+        stop.set()
+        worker.join(5)
+    assert rows() == 4  # the save added its row; nothing was dropped
+    assert opts.index is False  # the caller's options are left alone
+
+
+def test_saves_do_not_start_a_worker_pool(tmp_path, monkeypatch, make_options):
+    import concurrent.futures
+
+    pools = []
+    real = concurrent.futures.ProcessPoolExecutor
+    monkeypatch.setattr(
+        concurrent.futures,
+        "ProcessPoolExecutor",
+        lambda *a, **kw: pools.append(1) or real(*a, **kw),
+    )
+    vault = tmp_path / "vault"
+    vault.mkdir()
+    (vault / "a.md").write_text("body\n", encoding="utf-8")
+    stop = threading.Event()
+    worker = threading.Thread(
+        target=watch,
+        args=(make_options(vault, jobs=2),),
+        kwargs=dict(debounce=0.05, backend="poll", interval=0.1, stop=stop),
+    )
+    worker.start()
+    try:
+        assert wait_for(lambda: pools == [1])
+        note = vault / "b.md"
+        note.write_text("body\n", encoding="utf-8")
+        assert wait_for(lambda: note.read_text(encoding="utf-8").startswith("---"))
+    finally:
+        stop.set()
+        worker.join(5)
+    assert pools == [1]  # the first sweep's only
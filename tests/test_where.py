@@ -0,0 +1,82 @@
+import pytest
+
+import fm_yaml
+import main
+from main import process_path
+from where import compile_where, parse_condition
+
+
+HEAD = "---\ntype: meeting\ntags: ['#work', todo]\ndate: 2025-03-01\ndone: true\n---\n"
+
+
+@pytest.mark.parametrize(
+    "conds, expected",
+    [
+        (["type=meeting"], True),
+        (["type=idea"], False),
+        (["type!=idea"], True),
+        (["type=idea|meeting"], True),
+        (["type"], True),
+        (["!type"], False),
+        (["!status"], True),
+        (["tags=work"], True),
+        (["tags=#todo"], True),
+        (["tags!=work"], False),
+        (["tags=w*"], True),
+        (["date=2025-*"], True),
+        (["done=true"], True),
+        (["type=meeting", "tags=archive"], False),
+    ],
+)
+def test_conditions(conds, expected):
+    assert compile_where(tuple(conds)).matches(HEAD) is expected
+
+
+def test_no_frontmatter_and_unparsable_yaml():
+    where = compile_where(("!type",))
+    assert where.matches("just a body\n")
+    assert not where.matches("---\ntype: [unclosed\n---\n")
+
+
+@pytest.mark.parametrize("spec", ["", "=x", "type=", "type=a|"])
+def test_bad_conditions(spec):
+    with pytest.raises(ValueError, match="where:"):
+        parse_condition(spec)
+
+
+def make_vault(tmp_path):
+    vault = tmp_path / "vault"
+    (vault / "2025").mkdir(parents=True)
+    (vault / "2025" / "m.md").write_text("---\ntype: meeting\n---\nbody\n")
+    (vault / "2025" / "i.md").write_text("---\ntype: idea\ntags: [x]\n---\n")
+    # anchors and nested maps are beyond the scanner; the safe loader decides
+    (vault / "n.md").write_text("---\nmeta: {a: 1}\ntype: &t idea\n---\n")
+    return vault
+
+
+def test_only_matching_notes_are_parsed_and_written(
+    tmp_path, monkeypatch, make_options
+):
+    vault = make_vault(tmp_path)
+    loads = []
+    real = fm_yaml.load_frontmatter
+    monkeypatch.setattr(main, "load_frontmatter", lambda y: loads.append(y) or real(y))
+    opts = make_options(vault, where=["type=meeting"])
+    assert process_path(opts) == 1
+    assert (vault / "2025" / "m.md").read_text() == (
+        "---\ntype: meeting\ntags:\n  - new\n---\nbody\n"
+    )
+    assert (vault / "2025" / "i.md").read_text() == "---\ntype: idea\ntags: [x]\n---\n"
+    # n.md (an anchor) would need the round-trip loader had it matched
+    assert loads == []
+
+
+def test_tag_conditions_use_fresh_index_entries(tmp_path, monkeypatch, make_options):
+    vault = make_vault(tmp_path)
+    process_path(make_options(vault, index=True, tag="seen"))
+    opened = []
+    real = main.read_head
+    monkeypatch.setattr(main, "read_head", lambda p: opened.append(p) or real(p))
+    opts = make_options(vault, index=True, where=["tags=x"])
+    assert process_path(opts) == 1
+    assert opened == [str(vault / "2025" / "i.md")]
@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import json
+import os
+from dataclasses import dataclass
+from typing import Dict, Optional, Tuple
+
+from fm_yaml import detect_tags, load_frontmatter, split_frontmatter
+from tag_ops import normalize_tags
+
+INDEX_DIR = ".obsidian"
+INDEX_NAME = "tag_manager_index.sqlite3"
+SCHEMA_VERSION = 2
+
+
+@dataclass
+class IndexEntry:
+    path: str  # relative to the vault root, '/'-separated
+    mtime_ns: int
+    size: int
+    digest: str  # of the note's head (frontmatter + first body line)
+    tags: Tuple[str, ...]
+    normalized: bool  # False if tag_ops.normalize_tags would rewrite 'tags'
+    inline: Optional[Tuple[str, ...]] = None  # body '#tags'; None = not scanned
+
+    def matches(self, st: os.stat_result) -> bool:
+        """True if the file still has the stat this entry was recorded with."""
+        return self.mtime_ns == st.st_mtime_ns and self.size == st.st_size
+
+
+def content_digest(text: str) -> str:
+    import hashlib
+
+    return hashlib.blake2b(
+        text.encode("utf-8", errors="surrogatepass"), digest_size=16
+    ).hexdigest()
+
+
+def tag_state(text: str) -> Tuple[Tuple[str, ...], bool]:
+    """Return (tags, normalized) for a note (or its head), scanning first."""
+    yaml_text, _, _ = split_frontmatter(text)
+    detected = detect_tags(yaml_text)
+    if detected is not None:
+        tags, normalized = detected
+        return tuple(tags), normalized
+    meta = load_frontmatter(yaml_text)
+    normalized = not normalize_tags(meta)
+    return tuple(str(t) for t in meta.get("tags", ())), normalized
+
+
+def make_entry(
+    path: str, vault_root: str, text: str, st: Optional[os.stat_result] = None
+) -> IndexEntry:
+    st = st or os.stat(path)
+    tags, normalized = tag_state(text)
+    return IndexEntry(
+        path=_rel(path, vault_root),
+        mtime_ns=st.st_mtime_ns,
+        size=st.st_size,
+        digest=content_digest(text),
+        tags=tags,
+        normalized=normalized,
+    )
+
+
+def _entry(row) -> IndexEntry:
+    rel, mtime_ns, size, digest, tags, normalized, inline = row
+    return IndexEntry(
+        rel,
+        mtime_ns,
+        size,
+        digest,
+        tuple(json.loads(tags)),
+        bool(normalized),
+        None if inline is None else tuple(json.loads(inline)),
+    )
+
+
+def _rel(path: str, vault_root: str) -> str:
+    return os.path.relpath(path, start=vault_root).replace(os.sep, "/")
+
+
+class VaultIndex:
+    """Per-vault SQLite cache of file stat, content hash and parsed tags.
+
+    Entries are trusted while a file's mtime and size are unchanged, so
+    no-op files can be skipped without opening them. Writes are committed in
+    one transaction on close().
+    """
+
+    def __init__(self, db_path: str, vault_root: str):
+        import sqlite3
+
+        self.db_path = db_path
+        self.vault_root = vault_root
+        self.conn = sqlite3.connect(db_path)
+        version = self.conn.execute("PRAGMA user_version").fetchone()[0]
+        if version != SCHEMA_VERSION:
+            self.conn.execute("DROP TABLE IF EXISTS files")
+            self.conn.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
+        self.conn.execute(
+            "CREATE TABLE IF NOT EXISTS files ("
+            " path TEXT PRIMARY KEY,"
+            " mtime_ns INTEGER NOT NULL,"
+            " size INTEGER NOT NULL,"
+            " digest TEXT NOT NULL,"
+            " tags TEXT NOT NULL,"
+            " normalized INTEGER NOT NULL,"
+            " inline TEXT)"
+        )
+
+    @staticmethod
+    def exists(vault_root: str) -> bool:
+        return os.path.exists(os.path.join(vault_root, INDEX_DIR, INDEX_NAME))
+
+    @classmethod
+    def open(cls, vault_root: str, rebuild: bool = False) -> "VaultIndex":
+        index_dir = os.path.join(vault_root, INDEX_DIR)
+        os.makedirs(index_dir, exist_ok=True)
+        index = cls(os.path.join(index_dir, INDEX_NAME), vault_root)
+        if rebuild:
+            index.conn.execute("DELETE FROM files")
+        return index
+
+    def get(self, path: str) -> Optional[IndexEntry]:
+        row = self.conn.execute(
+            "SELECT * FROM files WHERE path = ?", (_rel(path, self.vault_root),)
+        ).fetchone()
+        return None if row is None else _entry(row)
+
+    def all(self) -> Dict[str, IndexEntry]:
+        """Every entry, keyed by absolute path, in a single query."""
+        rows = self.conn.execute("SELECT * FROM files")
+        return {
+            os.path.join(self.vault_root, *row[0].split("/")): _entry(row)
+            for row in rows
+        }
+
+    def put(self, entry: IndexEntry) -> None:
+        self.conn.execute(
+            "INSERT OR REPLACE INTO files VALUES (?, ?, ?, ?, ?, ?, ?)",
+            (
+                entry.path,
+                entry.mtime_ns,
+                entry.size,
+                entry.digest,
+                json.dumps(list(entry.tags)),
+                int(entry.normalized),
+                None if entry.inline is None else json.dumps(list(entry.inline)),
+            ),
+        )
+
+    def close(self) -> None:
+        self.conn.commit()
+        self.conn.close()
@@ -0,0 +1,324 @@
+from __future__ import annotations
+
+import ctypes
+import ctypes.util
+import os
+import select
+import struct
+import sys
+import threading
+import time
+from dataclasses import replace
+from typing import Dict, Iterable, Optional, Set, Tuple
+
+from fs import DEFAULT_EXCLUDE_DIRS, compile_globs, iter_markdown_entries
+from main import RunSummary, iter_changes, iter_entries
+from report import make_report
+
+# Watch mode: after one full sweep, only notes created or saved since are
+# re-processed. Events are collected until the vault has been quiet for
+# 'debounce' seconds (or for at most max_delay), then handed to process_path
+# as one batch. --jobs only applies to sweeps; batches of saves are processed
+# in this process.
+
+BACKENDS = ("auto", "inotify", "poll")
+
+# linux/inotify.h
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE_SELF = 0x00000400
+IN_MOVE_SELF = 0x00000800
+IN_Q_OVERFLOW = 0x00004000
+IN_IGNORED = 0x00008000
+IN_ONLYDIR = 0x01000000
+IN_ISDIR = 0x40000000
+IN_NONBLOCK = 0o4000
+IN_CLOEXEC = 0o2000000
+_EVENT = struct.Struct("iIII")  # wd, mask, cookie, len; then the name
+
+
+class _Filter:
+    """The file and directory rules of iter_markdown_entries, for one path."""
+
+    def __init__(self, opts):
+        self.opts = opts
+        self.root = opts.path
+        self.recursive = opts.recursive
+        self.include = compile_globs(opts.include_glob)
+        self.exclude = compile_globs(opts.exclude_glob)
+        self.exclude_dirs = (
+            DEFAULT_EXCLUDE_DIRS if opts.exclude_dirs is None else opts.exclude_dirs
+        )
+        self.prune = compile_globs(self.exclude_dirs)
+        self.skip = {
+            os.path.normcase(os.path.abspath(p)) for p in [opts.backup_dir] if p
+        }
+
+    def walk(self) -> Iterable[os.DirEntry]:
+        return iter_markdown_entries(
+            self.root,
+            self.recursive,
+            self.opts.include_glob,
+            exclude_glob=self.opts.exclude_glob,
+            exclude_dirs=self.exclude_dirs,
+            exclude_paths=list(self.skip),
+        )
+
+    def wants_dir(self, path: str) -> bool:
+        if os.path.normcase(os.path.abspath(path)) in self.skip:
+            return False
+        return not (self.prune and self.prune.match(os.path.basename(path)))
+
+    def wants_file(self, path: str) -> bool:
+        name = os.path.basename(path)
+        return (self.include is None or self.include.match(name)) and not (
+            self.exclude and self.exclude.match(name)
+        )
+
+
+class PollingWatcher:
+    """Portable fallback: rescan the vault's stat info every 'interval'."""
+
+    def __init__(self, filt: _Filter, interval: float = 1.0):
+        self.filt = filt
+        self.interval = interval
+        self._state = self._snapshot()
+        self._next = time.monotonic() + interval
+
+    def _snapshot(self) -> Dict[str, Tuple[int, int]]:
+        state = {}
+        for entry in self.filt.walk():
+            try:
+                st = entry.stat()
+            except OSError:
+                continue
+            state[entry.path] = (st.st_mtime_ns, st.st_size)
+        return state
+
+    def poll(self, timeout: Optional[float]) -> Tuple[Set[str], bool]:
+        wait = self._next - time.monotonic()
+        if timeout is not None:
+            wait = min(wait, timeout)
+        if wait > 0:
+            time.sleep(wait)
+        if time.monotonic() < self._next:
+            return set(), False
+        self._next = time.monotonic() + self.interval
+        old, self._state = self._state, self._snapshot()
+        return {p for p, sig in self._state.items() if old.get(p) != sig}, False
+
+    def close(self) -> None:
+        pass
+
+
+class InotifyWatcher:
+    """One inotify watch per vault folder; reports notes closed after writing
+    or renamed into place (how editors and atomic writers save).
+    """
+
+    MASK = IN_CLOSE_WRITE | IN_MOVED_TO | IN_CREATE | IN_DELETE_SELF | IN_MOVE_SELF
+
+    def __init__(self, filt: _Filter):
+        self.filt = filt
+        self._libc = _libc()
+        fd = self._libc.inotify_init1(IN_NONBLOCK | IN_CLOEXEC)
+        if fd < 0:
+            raise OSError(ctypes.get_errno(), "inotify_init1 failed")
+        self.fd = fd
+        self._dirs: Dict[int, str] = {}
+        self._add_tree(filt.root, collect=None)
+
+    def _add_tree(self, top: str, collect: Optional[Set[str]]) -> None:
+        stack = [top]
+        while stack:
+            path = stack.pop()
+            wd = self._libc.inotify_add_watch(
+                self.fd, os.fsencode(path), self.MASK | IN_ONLYDIR
+            )
+            if wd < 0:
+                if path == top and top == self.filt.root:
+                    raise OSError(ctypes.get_errno(), f"cannot watch {path}")
+                continue
+            self._dirs[wd] = path
+            try:
+                with os.scandir(path) as it:
+                    entries = list(it)
+            except OSError:
+                continue
+            for entry in entries:
+                if entry.is_dir(follow_symlinks=False):
+                    if self.filt.recursive and self.filt.wants_dir(entry.path):
+                        stack.append(entry.path)
+                elif collect is not None and self.filt.wants_file(entry.path):
+                    # written before its folder's watch existed
+                    collect.add(entry.path)
+
+    def poll(self, timeout: Optional[float]) -> Tuple[Set[str], bool]:
+        changed: Set[str] = set()
+        ready, _, _ = select.select([self.fd], [], [], timeout)
+        if not ready:
+            return changed, False
+        try:
+            data = os.read(self.fd, 1 << 16)
+        except BlockingIOError:
+            return changed, False
+        overflow = False
+        pos = 0
+        while pos < len(data):
+            wd, mask, _cookie, size = _EVENT.unpack_from(data, pos)
+            pos += _EVENT.size
+            name = os.fsdecode(data[pos : pos + size].rstrip(b"\0"))
+            pos += size
+            if mask & IN_Q_OVERFLOW:
+                overflow = True
+                continue
+            folder = self._dirs.get(wd)
+            if folder is None:
+                continue
+            if mask & (IN_IGNORED | IN_DELETE_SELF | IN_MOVE_SELF):
+                self._dirs.pop(wd, None)
+                continue
+            path = os.path.join(folder, name)
+            if mask & IN_ISDIR:
+                if (
+                    mask & (IN_CREATE | IN_MOVED_TO)
+                    and self.filt.recursive
+                    and self.filt.wants_dir(path)
+                ):
+                    self._add_tree(path, collect=changed)
+            elif mask & (IN_CLOSE_WRITE | IN_MOVED_TO) and self.filt.wants_file(path):
+                changed.add(path)
+        return changed, overflow
+
+    def close(self) -> None:
+        os.close(self.fd)
+
+
+def _libc():
+    libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+    libc.inotify_init1.argtypes = [ctypes.c_int]
+    libc.inotify_add_watch.argtypes = [ctypes.c_int, ctypes.c_char_p, ctypes.c_uint32]
+    return libc
+
+
+def make_watcher(opts, backend: str = "auto", interval: float = 1.0):
+    filt = _Filter(opts)
+    if backend not in BACKENDS:
+        raise ValueError(f"watch backend must be one of {', '.join(BACKENDS)}")
+    if backend != "poll" and sys.platform.startswith("linux"):
+        try:
+            return InotifyWatcher(filt)
+        except (OSError, AttributeError):
+            if backend == "inotify":
+                raise
+    elif backend == "inotify":
+        raise OSError("inotify is only available on Linux")
+    return PollingWatcher(filt, interval)
+
+
+def watch(
+    opts,
+    debounce: float = 0.2,
+    backend: str = "auto",
+    interval: float = 1.0,
+    max_delay: float = 5.0,
+    stop: Optional[threading.Event] = None,
+) -> None:
+    """
+    Process the whole vault once, then keep processing notes as they are
+    created or saved until 'stop' is set (or KeyboardInterrupt).
+    A steady stream of saves is still flushed at least every max_delay
+    seconds, so continuous ingestion never starves.
+    """
+    if opts.plan_file:
+        raise ValueError("watch mode cannot write a change plan")
+    stop = stop or threading.Event()
+    # Start watching before the sweep so nothing saved during it is missed
+    watcher = make_watcher(opts, backend, interval)
+    # (mtime_ns, size) of each note as last processed, so our own writes and
+    # repeated events for the same save are not processed twice
+    seen: Dict[str, Tuple[int, int]] = {}
+    # Only the first sweep rebuilds the index. Saves are handled in this
+    # process: starting a pool of --jobs workers for a note or two costs
+    # far more than the work itself.
+    sweep_opts = opts
+    rest = replace(opts, index=opts.index or opts.rebuild_index, rebuild_index=False)
+    saved_opts = replace(rest, jobs=1)
+
+    def run(paths: Optional[Iterable[str]]) -> None:
+        paths = None if paths is None else sorted(paths)
+        run_opts = sweep_opts if paths is None else saved_opts
+        # A sweep reports back the notes it rewrote; their write events
+        # must not bring them back either
+        done = list(paths) if paths is not None else []
+        summary = RunSummary()
+        report = make_report(run_opts)
+        try:
+            for record in iter_changes(run_opts, paths, summary):
+                report.file(record)
+                if paths is None:
+                    done.append(record.path)
+            report.finish(summary)
+        except Exception as e:
+            # e.g. a note saved with broken YAML. Retry in halves so the
+            # other notes still get done, then report the bad note and
+            # keep watching.
+            if paths is None:
+                paths = [entry.path for entry in iter_entries(run_opts)]
+            if len(paths) > 1:
+                mid = len(paths) // 2
+                run(paths[:mid])
+                run(paths[mid:])
+                return
+            where = f"{paths[0]}: " if paths else ""
+            print(f"Error: {where}{type(e).__name__}: {e}", file=sys.stderr)
+        for path in done:
+            try:
+                st = os.stat(path)
+            except OSError:
+                seen.pop(path, None)
+                continue
+            seen[path] = (st.st_mtime_ns, st.st_size)
+
+    def fresh(path: str) -> bool:
+        try:
+            st = os.stat(path)
+        except OSError:
+            return False
+        return seen.get(path) != (st.st_mtime_ns, st.st_size)
+
+    try:
+        run(None)
+        sweep_opts = rest  # for rescans
+        pending: Set[str] = set()
+        rescan = False
+        first = last = 0.0
+        while not stop.is_set():
+            timeout = debounce if (pending or rescan) else min(interval, 0.5)
+            events, overflow = watcher.poll(timeout)
+            now = time.monotonic()
+            if events or overflow:
+                if not (pending or rescan):
+                    first = now
+                last = now
+                pending |= events
+                rescan = rescan or overflow
+                if now - first < max_delay:
+                    continue
+            if not (pending or rescan) or (
+                now - last < debounce and now - first < max_delay
+            ):
+                continue
+            if rescan:
+                # The kernel dropped events: fall back to a full sweep
+                run(None)
+            else:
+                batch = {p for p in pending if fresh(p)}
+                if batch:
+                    run(batch)
+            pending, rescan = set(), False
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
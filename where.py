@@ -0,0 +1,155 @@
+from __future__ import annotations
+
+import datetime
+import fnmatch
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Dict, List, Optional, Sequence, Tuple
+
+from fm_patch import read_fields
+from fm_yaml import detect_tags, safe_load, split_frontmatter
+from stats import timed
+from vault_index import tag_state
+
+# --where conditions on a note's frontmatter. All conditions must hold:
+#
+#   key            the key is set (not missing, null, "" or [])
+#   !key           the key is not set
+#   key=value      the value equals 'value', or is a list containing it
+#   key!=value     the opposite of key=value
+#   key=a|b        any of the alternatives
+#   key=2025-*     values with * ? [ are fnmatch globs
+#
+# 'tags' is compared against the note's tags as tag_ops sees them (no
+# leading '#', deduplicated). Other values are compared as text; YAML
+# booleans read as true/false. Conditions are checked on the head of the
+# note with the fm_patch scanner, or the safe loader when it is unsure, so
+# notes that do not match are never round-trip parsed or rewritten.
+
+_COND_RE = re.compile(r"^(?P<key>[^=]*?)\s*(?P<op>!=|=)\s*(?P<value>.*)$")
+
+
+@dataclass(frozen=True)
+class Condition:
+    key: str
+    op: str  # 'set', 'unset', 'eq' or 'ne'
+    values: Tuple[str, ...] = ()
+
+    def test(self, fields: Dict[str, List[str]]) -> bool:
+        have = fields.get(self.key)
+        if self.op == "set":
+            return bool(have)
+        if self.op == "unset":
+            return not have
+        hit = any(_match(v, p) for p in self.values for v in have or ())
+        return hit if self.op == "eq" else not hit
+
+
+def _match(value: str, pattern: str) -> bool:
+    if any(c in pattern for c in "*?["):
+        return fnmatch.fnmatchcase(value, pattern)
+    return value == pattern
+
+
+def parse_condition(spec: str) -> Condition:
+    """Parse one --where condition; raises ValueError if it is malformed."""
+    spec = spec.strip()
+    m = _COND_RE.match(spec)
+    if m is None:
+        values: Tuple[str, ...] = ()
+        if spec.startswith("!"):
+            key, op = spec[1:].strip(), "unset"
+        else:
+            key, op = spec, "set"
+    else:
+        key = m.group("key").strip()
+        op = "eq" if m.group("op") == "=" else "ne"
+        values = tuple(v.strip() for v in m.group("value").split("|"))
+        if key == "tags":
+            values = tuple(v[1:] if v.startswith("#") else v for v in values)
+        if not all(values):
+            raise ValueError(f"where: empty value in {spec!r}")
+    if not key:
+        raise ValueError(f"where: missing key in {spec!r}")
+    return Condition(key, op, values)
+
+
+class Where:
+    """A conjunction of conditions, checked against a note's head."""
+
+    def __init__(self, conditions: Sequence[Condition]):
+        self.conditions = tuple(conditions)
+        self.keys = frozenset(c.key for c in self.conditions)
+
+    @property
+    def tags_only(self) -> bool:
+        """True if the tags alone decide a match (so an index entry can)."""
+        return self.keys == {"tags"}
+
+    def match_tags(self, tags: Sequence[str]) -> bool:
+        return self._test({"tags": list(tags)})
+
+    @timed("where")
+    def matches(self, head: str) -> bool:
+        yaml_text, _, _ = split_frontmatter(head)
+        fields = _fields(head, yaml_text, self.keys)
+        return fields is not None and self._test(fields)
+
+    def _test(self, fields: Dict[str, List[str]]) -> bool:
+        return all(c.test(fields) for c in self.conditions)
+
+
+@lru_cache(maxsize=8)
+def compile_where(specs: Tuple[str, ...]) -> Where:
+    """Where for a tuple of --where conditions (cached per process)."""
+    return Where([parse_condition(s) for s in specs])
+
+
+def _fields(
+    head: str, yaml_text: Optional[str], keys: frozenset
+) -> Optional[Dict[str, List[str]]]:
+    # Returns {key: [text values]} for the set keys, or None when the
+    # frontmatter does not parse (such a note never matches).
+    fields: Dict[str, List[str]] = {}
+    if yaml_text is None:
+        return fields
+    other = keys - {"tags"}
+    if other:
+        raw = read_fields(yaml_text, other)
+        if raw is None:
+            try:
+                data = safe_load(yaml_text)
+            except Exception:
+                return None
+            if data is None:
+                data = {}
+            if not isinstance(data, dict):
+                return None
+            raw = {k: data[k] for k in other if k in data}
+        for key, value in raw.items():
+            fields[key] = _texts(value)
+    if "tags" in keys:
+        detected = detect_tags(yaml_text)
+        if detected is None:
+            try:
+                detected = tag_state(head)
+            except Exception:
+                return None
+        fields["tags"] = list(detected[0])
+    return fields
+
+
+def _texts(value) -> List[str]:
+    if value is None:
+        return []
+    if isinstance(value, dict):
+        return [""] if value else []  # set; only a glob like * matches it
+    if isinstance(value, list):
+        return [t for v in value for t in _texts(v)]
+    if isinstance(value, bool):
+        return ["true" if value else "false"]
+    if isinstance(value, (datetime.date, datetime.datetime)):
+        return [value.isoformat()]
+    text = str(value)
+    return [text] if text else []